@@ -1,7 +1,8 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { readFile } from 'fs/promises';
 import { join } from 'path';
-import { redisClient } from '@/lib/upstash';
+import { expandPayload } from '@/lib/dog-transaction-schema';
+import { loadTransactionsCache } from '@/lib/dog-transactions-store';
 
 export const dynamic = 'force-dynamic';
 export const runtime = 'nodejs';
@@ -12,22 +13,8 @@ export async function GET(request: NextRequest) {
     const summaryOnly = request.nextUrl.searchParams.get('summary');
 
     // Tentar ler do Vercel KV primeiro
-    // Upstash Redis armazena JSON stringificado
-    const cacheDataRaw = await redisClient.get('dog:transactions');
-    let cacheData: any = null;
-
-    if (cacheDataRaw) {
-      if (typeof cacheDataRaw === 'string') {
-        try {
-          cacheData = JSON.parse(cacheDataRaw);
-        } catch (parseError) {
-          console.error('⚠️ [KV] Falha ao parsear JSON vindo do KV, retornando string bruta', parseError);
-          cacheData = cacheDataRaw;
-        }
-      } else {
-        cacheData = cacheDataRaw;
-      }
-    }
+    // Índice por txid (dog:tx / dog:tx:index), com fallback para o blob legado
+    let cacheData: any = await loadTransactionsCache();
 
     // Fallback para JSON local se KV não disponível (desenvolvimento)
     if (!cacheData) {
@@ -35,7 +22,7 @@ export async function GET(request: NextRequest) {
       try {
         const filePath = join(process.cwd(), 'public', 'data', 'dog_transactions.json');
         const fileData = await readFile(filePath, 'utf-8');
-        cacheData = JSON.parse(fileData);
+        cacheData = expandPayload(JSON.parse(fileData));
       } catch (fileError) {
         console.error('❌ [KV] Erro ao ler JSON local:', fileError);
         return NextResponse.json(
@@ -1,5 +1,6 @@
 import { NextRequest, NextResponse } from 'next/server';
 import { redisClient } from '@/lib/upstash';
+import { loadTransactionsCache, saveTransactionsCache } from '@/lib/dog-transactions-store';
 
 const UNISAT_API_URL = 'https://open-api.unisat.io/v1/indexer/runes/event';
 const RUNE_NAME = 'DOG•GO•TO•THE•MOON';
@@ -1132,20 +1133,7 @@ export async function GET(request: NextRequest) {
     console.log('🔄 [UPDATE] Iniciando atualização de transações...');
 
     // Buscar cache existente no Upstash
-    const existingRaw = await redisClient.get('dog:transactions');
-    let existingData: any = null;
-
-    if (existingRaw) {
-      if (typeof existingRaw === 'string') {
-        try {
-          existingData = JSON.parse(existingRaw);
-        } catch (err) {
-          console.warn('⚠️ [UPDATE] Falha ao parsear cache existente, sobrescrevendo...', err);
-        }
-      } else {
-        existingData = existingRaw;
-      }
-    }
+    const existingData: any = await loadTransactionsCache();
 
     const existingTransactions: Transaction[] = Array.isArray(existingData?.transactions)
       ? existingData.transactions.map(sanitizeTransaction)
@@ -1349,7 +1337,20 @@ export async function GET(request: NextRequest) {
       await attachHolderRanks(payload.metrics.last24h);
     }
 
-    await redisClient.set('dog:transactions', JSON.stringify(payload));
+    const { written, removed } = await saveTransactionsCache(
+      trimmed,
+      {
+        timestamp: payload.timestamp,
+        total_transactions: payload.total_transactions,
+        last_block: payload.last_block,
+        last_update: payload.last_update,
+        last_updated: payload.last_update,
+        source,
+        metrics: payload.metrics,
+      },
+      existingTxMap,
+    );
+    console.log(`📡 [UPDATE] Upstash: ${written} TXs gravadas, ${removed} removidas`);
     const filterMessage = removedCount > 0 ? `${removedCount} inválidas removidas` : 'todas válidas';
     console.log(`✅ [UPDATE] Cache salvo no Upstash - ${trimmed.length} TXs válidas (${filterMessage}), bloco ${lastBlock}`);
 
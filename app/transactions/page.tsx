@@ -51,6 +51,7 @@ import {
   Zap
 } from "lucide-react"
 import { AddressBadge } from "@/components/address-badge"
+import { expandPayload } from "@/lib/dog-transaction-schema"
 
 interface Sender {
   address: string;
@@ -522,7 +523,7 @@ export default function TransactionsPage() {
             cache: 'no-store'
           })
           if (fallbackResponse.ok) {
-            jsonData = await fallbackResponse.json()
+            jsonData = expandPayload(await fallbackResponse.json())
           } else {
             console.error('❌ Fallback JSON também falhou:', fallbackResponse.status)
           }
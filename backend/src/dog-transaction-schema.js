@@ -0,0 +1,82 @@
+// Expansão do formato compacto de armazenamento (schema_version 3) para o formato
+// da API (schema_version 2). Porte de expandTransaction/expandPayload de
+// lib/dog-transaction-schema.ts (ver scripts/dog_record.py, to_compact/to_dict):
+//   { schema_version: 3, txid, block_height, timestamp,
+//     senders: [[address, amount, input?]], receivers: [[address, amount, vout?]],
+//     fee_sats?, ...extras }
+const COMPACT_SCHEMA_VERSION = 3;
+const API_SCHEMA_VERSION = 2;
+const DOG_FACTOR = 100000;
+
+const toDog = (amount) => Number((amount / DOG_FACTOR).toFixed(5));
+
+const isCompactTransaction = (tx) => Boolean(tx) && tx.schema_version === COMPACT_SCHEMA_VERSION;
+
+// Registro compacto -> formato da API; registros em outros formatos passam direto
+const expandTransaction = (tx) => {
+    if (!isCompactTransaction(tx)) return tx;
+
+    const { schema_version, senders: rawSenders, receivers: rawReceivers, ...rest } = tx;
+
+    const senders = (rawSenders || []).map(([address, amount, input]) => ({
+        address,
+        amount,
+        amount_dog: toDog(amount),
+        has_dog: amount > 0,
+        ...(input ? { input } : {})
+    }));
+    const senderAddresses = new Set(senders.map(sender => sender.address).filter(Boolean));
+
+    let change = 0;
+    const receivers = (rawReceivers || []).map(([address, amount, vout]) => {
+        const isChange = senderAddresses.has(address);
+        if (isChange) change += amount;
+        return {
+            address,
+            amount,
+            amount_dog: toDog(amount),
+            has_dog: amount > 0,
+            is_change: isChange,
+            ...(vout !== undefined && vout !== null ? { vout } : {})
+        };
+    });
+
+    const totalOut = receivers.reduce((sum, receiver) => sum + receiver.amount, 0);
+    const totalIn = senders.reduce((sum, sender) => sum + sender.amount, 0) || totalOut;
+
+    return {
+        txid: rest.txid,
+        block_height: rest.block_height || 0,
+        timestamp: rest.timestamp ?? null,
+        senders,
+        receivers,
+        sender_count: senders.length,
+        receiver_count: receivers.length,
+        total_dog_in: toDog(totalIn),
+        total_dog_out: toDog(totalOut),
+        total_dog_moved: toDog(totalOut),
+        net_transfer: toDog(Math.max(totalOut - change, 0)),
+        change_amount: toDog(change),
+        has_change: change > 0,
+        ...rest,
+        schema_version: API_SCHEMA_VERSION
+    };
+};
+
+const expandTransactions = (transactions) =>
+    Array.isArray(transactions) ? transactions.map(expandTransaction) : [];
+
+// Expande as transações de um payload ({ ..., transactions: [] })
+const expandPayload = (payload) => {
+    if (!payload || !Array.isArray(payload.transactions)) return payload;
+    return { ...payload, transactions: expandTransactions(payload.transactions) };
+};
+
+module.exports = {
+    COMPACT_SCHEMA_VERSION,
+    API_SCHEMA_VERSION,
+    isCompactTransaction,
+    expandTransaction,
+    expandTransactions,
+    expandPayload
+};
@@ -3,6 +3,7 @@ const cors = require('cors');
 const { exec } = require('child_process');
 const fs = require('fs');
 const path = require('path');
+const { expandTransactions } = require('./dog-transaction-schema');
 
 const app = express();
 const PORT = 3001;
@@ -53,8 +54,9 @@ const loadDogTransactions = () => {
         if (fs.existsSync(DOG_TRANSACTIONS_PATH)) {
             const data = fs.readFileSync(DOG_TRANSACTIONS_PATH, 'utf8');
             const parsedData = JSON.parse(data);
-            // O arquivo tem estrutura: { transactions: [...] }
-            dogTransactions = parsedData.transactions || [];
+            // O arquivo tem estrutura: { transactions: [...] }, registros no formato
+            // compacto (schema_version 3): expandidos para o formato da API
+            dogTransactions = expandTransactions(parsedData.transactions);
             console.log(`✅ ${dogTransactions.length} transações DOG carregadas`);
         } else {
             dogTransactions = [];
@@ -0,0 +1,20 @@
+import { createHash } from 'crypto'
+
+// Digest do registro compacto no Upstash (dog:tx:digest), igual a record_digest()
+// em scripts/upstash_store.py. Forma canônica: chaves ordenadas, separadores ', ' e ': ',
+// números no formato do JSON.stringify (3.0 -> 3, 1e-7), undefined omitido.
+// Vetores compartilhados: lib/dog-record-digest-vectors.json (scripts/test_record_digest.py).
+export const canonicalJson = (value: any): string => {
+  if (Array.isArray(value)) return `[${value.map(canonicalJson).join(', ')}]`
+  if (value !== null && typeof value === 'object') {
+    return `{${Object.keys(value)
+      .filter((key) => value[key] !== undefined)
+      .sort()
+      .map((key) => `${JSON.stringify(key)}: ${canonicalJson(value[key])}`)
+      .join(', ')}}`
+  }
+  return JSON.stringify(value ?? null)
+}
+
+export const transactionDigest = (record: any): string =>
+  createHash('sha1').update(canonicalJson(record), 'utf8').digest('hex')
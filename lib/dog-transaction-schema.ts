@@ -0,0 +1,122 @@
+// Formato compacto de armazenamento (ver scripts/dog_record.py, to_compact):
+//   { schema_version: 3, txid, block_height, timestamp,
+//     senders: [[address, amount, input?]], receivers: [[address, amount, vout?]],
+//     fee_sats?, ...extras }
+// Quantias em unidades base; campos derivados e runestone não são armazenados.
+export const COMPACT_SCHEMA_VERSION = 3
+export const API_SCHEMA_VERSION = 2
+
+const DOG_FACTOR = 100_000
+
+const toDog = (amount: number): number => Number((amount / DOG_FACTOR).toFixed(5))
+
+export const isCompactTransaction = (tx: any): boolean => tx?.schema_version === COMPACT_SCHEMA_VERSION
+
+// Campos recalculados na expansão: nunca vão para o armazenamento (DERIVED_FIELDS do Python)
+const DERIVED_FIELDS = new Set([
+  'sender_count', 'receiver_count', 'total_dog_in', 'total_dog_out', 'total_dog_moved',
+  'net_transfer', 'change_amount', 'has_change', 'schema_version',
+])
+const CORE_FIELDS = new Set(['txid', 'block_height', 'timestamp', 'senders', 'receivers', 'fee_sats'])
+const STORAGE_EXCLUDED_FIELDS = new Set(['runestone'])
+
+// Quantia em unidades base a partir de `amount` ou, sem ele, de `amount_dog`
+const parseAmount = (party: any): number => {
+  const amount = party?.amount
+  if (amount !== undefined && amount !== null && amount !== '') return Math.trunc(Number(amount)) || 0
+  return Math.round((Number(party?.amount_dog) || 0) * DOG_FACTOR)
+}
+
+/**
+ * Registro (qualquer versão) -> formato de armazenamento (mesmo resultado de compact_transaction()).
+ */
+export function compactTransaction(tx: any): any {
+  if (isCompactTransaction(tx)) return tx
+
+  const record: Record<string, any> = {
+    schema_version: COMPACT_SCHEMA_VERSION,
+    txid: tx.txid,
+    block_height: tx.block_height || 0,
+    timestamp: tx.timestamp ?? null,
+    senders: (tx.senders || []).map((party: any) => {
+      const input = party?.input || party?.utxo
+      return [party?.address || '', parseAmount(party), ...(input ? [input] : [])]
+    }),
+    receivers: (tx.receivers || []).map((party: any) => [
+      party?.address || '',
+      parseAmount(party),
+      ...(party?.vout !== undefined && party?.vout !== null ? [party.vout] : []),
+    ]),
+  }
+  if (tx.fee_sats !== undefined && tx.fee_sats !== null) {
+    record.fee_sats = Math.trunc(Number(tx.fee_sats))
+  }
+  for (const [key, value] of Object.entries(tx)) {
+    if (CORE_FIELDS.has(key) || DERIVED_FIELDS.has(key) || STORAGE_EXCLUDED_FIELDS.has(key)) continue
+    record[key] = value
+  }
+  return record
+}
+
+/**
+ * Registro compacto -> formato da API (mesmo resultado de DogTransaction.to_dict()).
+ * Registros em outros formatos passam direto.
+ */
+export function expandTransaction(tx: any): any {
+  if (!isCompactTransaction(tx)) return tx
+
+  const { schema_version, senders: rawSenders, receivers: rawReceivers, ...rest } = tx
+
+  const senders = (rawSenders || []).map(([address, amount, input]: [string, number, string?]) => ({
+    address,
+    amount,
+    amount_dog: toDog(amount),
+    has_dog: amount > 0,
+    ...(input ? { input } : {}),
+  }))
+  const senderAddresses = new Set(senders.map((sender: any) => sender.address).filter(Boolean))
+
+  let change = 0
+  const receivers = (rawReceivers || []).map(([address, amount, vout]: [string, number, number?]) => {
+    const isChange = senderAddresses.has(address)
+    if (isChange) change += amount
+    return {
+      address,
+      amount,
+      amount_dog: toDog(amount),
+      has_dog: amount > 0,
+      is_change: isChange,
+      ...(vout !== undefined && vout !== null ? { vout } : {}),
+    }
+  })
+
+  const totalOut = receivers.reduce((sum: number, receiver: any) => sum + receiver.amount, 0)
+  const totalIn = senders.reduce((sum: number, sender: any) => sum + sender.amount, 0) || totalOut
+
+  return {
+    txid: rest.txid,
+    block_height: rest.block_height || 0,
+    timestamp: rest.timestamp ?? null,
+    senders,
+    receivers,
+    sender_count: senders.length,
+    receiver_count: receivers.length,
+    total_dog_in: toDog(totalIn),
+    total_dog_out: toDog(totalOut),
+    total_dog_moved: toDog(totalOut),
+    net_transfer: toDog(Math.max(totalOut - change, 0)),
+    change_amount: toDog(change),
+    has_change: change > 0,
+    ...rest,
+    schema_version: API_SCHEMA_VERSION,
+  }
+}
+
+export const expandTransactions = (transactions: any[] | undefined): any[] =>
+  Array.isArray(transactions) ? transactions.map(expandTransaction) : []
+
+/** Expande as transações de um payload ({ ..., transactions: [] }) */
+export function expandPayload<T extends { transactions?: any[] } | null>(payload: T): T {
+  if (!payload || !Array.isArray(payload.transactions)) return payload
+  return { ...payload, transactions: expandTransactions(payload.transactions) }
+}
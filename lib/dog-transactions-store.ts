@@ -0,0 +1,119 @@
+import { transactionDigest } from '@/lib/dog-record-digest'
+import { compactTransaction, expandPayload, expandTransaction } from '@/lib/dog-transaction-schema'
+import { redisClient } from '@/lib/upstash'
+
+// Modelo por txid (ver scripts/upstash_store.py):
+//   dog:tx        hash  txid -> transação
+//   dog:tx:index  zset  txid com score = block_height
+//   dog:tx:meta   hash  last_block, last_updated, source, metrics...
+//   dog:tx:digest hash  txid -> sha1 do registro compacto gravado
+// Registros sempre no formato compacto; todo writer grava/apaga o digest junto com o registro.
+export const TX_HASH_KEY = 'dog:tx'
+export const TX_INDEX_KEY = 'dog:tx:index'
+export const TX_META_KEY = 'dog:tx:meta'
+export const TX_DIGEST_KEY = 'dog:tx:digest'
+export const LEGACY_CACHE_KEY = 'dog:transactions'
+
+const parseValue = (value: unknown): any => {
+  if (typeof value !== 'string') return value
+  try {
+    return JSON.parse(value)
+  } catch {
+    return value
+  }
+}
+
+/**
+ * Lê o cache de transações no formato antigo ({ ..., transactions: [] }).
+ * Usa o índice por txid; cai para o blob legado enquanto o índice estiver vazio.
+ * Registros compactos (schema_version 3) são expandidos para o formato da API.
+ */
+export async function loadTransactionsCache(limit?: number): Promise<any | null> {
+  const txids = await redisClient.zrange<string[]>(TX_INDEX_KEY, 0, limit ? limit - 1 : -1, { rev: true })
+
+  if (!txids || txids.length === 0) {
+    const legacy = await redisClient.get(LEGACY_CACHE_KEY)
+    return legacy ? expandPayload(parseValue(legacy)) : null
+  }
+
+  const [records, meta] = await Promise.all([
+    redisClient.hmget<Record<string, unknown>>(TX_HASH_KEY, ...txids),
+    redisClient.hgetall<Record<string, unknown>>(TX_META_KEY),
+  ])
+
+  const transactions = txids
+    .map((txid) => records?.[txid])
+    .filter((record) => record !== null && record !== undefined)
+    .map(parseValue)
+    .map(expandTransaction)
+
+  return {
+    total_transactions: transactions.length,
+    last_block: Number(meta?.last_block) || transactions[0]?.block_height || 0,
+    last_updated: meta?.last_updated ?? null,
+    last_update: meta?.last_update ?? meta?.last_updated ?? null,
+    source: meta?.source ?? null,
+    metrics: meta?.metrics ? parseValue(meta.metrics) : null,
+    transactions,
+  }
+}
+
+/**
+ * Grava (no formato compacto) só as transações novas/alteradas e remove as que saíram da janela.
+ * A comparação usa os digests do servidor, compartilhados com scripts/upstash_store.py.
+ */
+export async function saveTransactionsCache(
+  transactions: any[],
+  meta: Record<string, unknown>,
+  previous: Map<string, any> = new Map(),
+): Promise<{ written: number; removed: number }> {
+  const pipeline = redisClient.pipeline()
+  const keep = new Set<string>()
+  const digests: Record<string, string> = {}
+  let written = 0
+
+  const txids = transactions.map((tx) => tx.txid).filter(Boolean)
+  const [indexed, stored] = await Promise.all([
+    redisClient.zrange<string[]>(TX_INDEX_KEY, 0, -1),
+    txids.length > 0 ? redisClient.hmget<Record<string, unknown>>(TX_DIGEST_KEY, ...txids) : null,
+  ])
+
+  for (const tx of transactions) {
+    if (!tx.txid) continue
+    keep.add(tx.txid)
+    const record = compactTransaction(tx)
+    const digest = transactionDigest(record)
+    if (stored?.[tx.txid] !== undefined && String(stored?.[tx.txid]) === digest) continue
+    // Inalterada desde a leitura: não sobrescreve o registro (possivelmente mais completo) de outro writer
+    const before = previous.get(tx.txid)
+    if (stored?.[tx.txid] && before && transactionDigest(compactTransaction(before)) === digest) continue
+    pipeline.hset(TX_HASH_KEY, { [tx.txid]: JSON.stringify(record) })
+    pipeline.zadd(TX_INDEX_KEY, { score: record.block_height || 0, member: tx.txid })
+    digests[tx.txid] = digest
+    written += 1
+  }
+  if (written > 0) {
+    pipeline.hset(TX_DIGEST_KEY, digests)
+  }
+
+  const removed = (indexed || []).filter((txid) => !keep.has(txid))
+  if (removed.length > 0) {
+    pipeline.hdel(TX_HASH_KEY, ...removed)
+    pipeline.hdel(TX_DIGEST_KEY, ...removed)
+    pipeline.zrem(TX_INDEX_KEY, ...removed)
+  }
+
+  const metaFields: Record<string, string> = {}
+  for (const [key, value] of Object.entries(meta)) {
+    if (value === null || value === undefined) continue
+    metaFields[key] = typeof value === 'string' ? value : JSON.stringify(value)
+  }
+  if (Object.keys(metaFields).length > 0) {
+    pipeline.hset(TX_META_KEY, metaFields)
+  }
+
+  if (written > 0 || removed.length > 0 || Object.keys(metaFields).length > 0) {
+    await pipeline.exec()
+  }
+  return { written, removed: removed.length }
+}
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Índice local de histórico por endereço (scripthash), construído a partir
+dos blocos do Bitcoin Core
+
+MODELO (SQLite, data/address_index.db):
+    outputs  (scripthash, height, txid, vout, value, from_distributor)
+             scripthash = sha256(scriptPubKey), como no Electrum
+    blocks   alturas já indexadas (a construção é retomável)
+    distributor_blocks  alturas indexadas só com as TXs do distribuidor
+
+- A construção usa os mesmos shards/process pool do airdrop_scanner; cada
+  bloco vem com prevouts (verbosity 3) para marcar as TXs do distribuidor
+- `distributor_only=True` guarda só os outputs das TXs do distribuidor:
+  é o que as contagens do airdrop consultam, e evita indexar (e devolver
+  pelo pool) todos os outputs de cada bloco
+- `outputs_for()` responde, para todos os endereços de uma vez, "quais
+  outputs o endereço X recebeu entre os blocos A e B (do distribuidor)"
+  com uma única consulta (endereço -> scriptPubKey via validateaddress
+  em batch)
+
+Substitui as consultas por endereço em blockstream.info/api/address/{addr}/txs,
+que além de lentas só devolviam a primeira página.
+
+Uso:
+    python3 address_index.py 840654 858370              # indexa a faixa
+    python3 address_index.py 840654 858370 --distributor-only
+    python3 address_index.py 840654 858370 bc1q...      # consulta um endereço
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from airdrop_scanner import (
+    AIRDROP_SHARD_SIZE,
+    AIRDROP_WORKERS,
+    SATS_PER_BTC,
+    distributor_script,
+    is_distributor_tx,
+    shard_ranges,
+)
+from bitcoin_rpc import BitcoinRPC
+
+BASE_DIR = Path(__file__).parent.parent
+ADDRESS_INDEX_DB = Path(os.environ.get('ADDRESS_INDEX_DB', str(BASE_DIR / 'data' / 'address_index.db')))
+VALIDATE_BATCH_SIZE = 1000
+
+# Output recebido: (altura, txid, vout, valor em sats)
+Received = Tuple[int, str, int, int]
+
+# Estado por worker (preenchido pelo initializer)
+_DISTRIBUTOR_SCRIPT: Optional[str] = None
+_RPC: Optional[BitcoinRPC] = None
+
+
+def scripthash(script_hex: str) -> bytes:
+    return hashlib.sha256(bytes.fromhex(script_hex)).digest()
+
+
+def _init_worker(script: str) -> None:
+    global _DISTRIBUTOR_SCRIPT, _RPC
+    _DISTRIBUTOR_SCRIPT = script
+    _RPC = BitcoinRPC()
+
+
+def index_shard(start: int, end: int, distributor_only: bool = False) -> Tuple[List[Tuple], List[int], List[int]]:
+    """Linhas de outputs do shard (no worker). Retorna (linhas, alturas ok, alturas com falha)
+
+    `distributor_only`: só os outputs das TXs do distribuidor.
+    """
+    rpc = _RPC or BitcoinRPC()
+    heights = list(range(start, end + 1))
+    hashes = rpc.batch([('getblockhash', height) for height in heights])
+
+    rows, done, failed = [], [], []
+    for height, block_hash in zip(heights, hashes):
+        block = rpc.call('getblock', block_hash, 3, timeout=120) if block_hash else None
+        if not block:
+            failed.append(height)
+            continue
+        for tx in block.get('tx', []):
+            from_distributor = int(is_distributor_tx(rpc, tx, _DISTRIBUTOR_SCRIPT))
+            if distributor_only and not from_distributor:
+                continue
+            for vout in tx.get('vout', []):
+                script_hex = vout.get('scriptPubKey', {}).get('hex')
+                if not script_hex or script_hex.startswith('6a'):  # OP_RETURN não é endereço
+                    continue
+                rows.append((
+                    scripthash(script_hex), height, tx['txid'], vout.get('n'),
+                    round(vout.get('value', 0) * SATS_PER_BTC), from_distributor,
+                ))
+        done.append(height)
+    return rows, done, failed
+
+
+class AddressIndex:
+    def __init__(self, db_path: Path = ADDRESS_INDEX_DB):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(db_path))
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript('''
+            CREATE TABLE IF NOT EXISTS outputs (
+                scripthash BLOB NOT NULL,
+                height INTEGER NOT NULL,
+                txid TEXT NOT NULL,
+                vout INTEGER NOT NULL,
+                value INTEGER NOT NULL,
+                from_distributor INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (txid, vout)
+            );
+            CREATE INDEX IF NOT EXISTS idx_outputs_scripthash ON outputs (scripthash, height);
+            CREATE TABLE IF NOT EXISTS blocks (height INTEGER PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS distributor_blocks (height INTEGER PRIMARY KEY);
+        ''')
+        self.db.commit()
+
+    # === Construção =========================================================
+
+    def missing(self, start: int, end: int, distributor_only: bool = False) -> List[int]:
+        """Alturas sem índice (bloco completo também cobre a consulta só do distribuidor)"""
+        tables = ['blocks', 'distributor_blocks'] if distributor_only else ['blocks']
+        indexed = {
+            row[0]
+            for table in tables
+            for row in self.db.execute(f'SELECT height FROM {table} WHERE height BETWEEN ? AND ?', (start, end))
+        }
+        return [height for height in range(start, end + 1) if height not in indexed]
+
+    def build(self, start: int, end: int, workers: int = AIRDROP_WORKERS, shard_size: int = AIRDROP_SHARD_SIZE,
+              distributor_only: bool = False) -> Dict:
+        """Indexa os blocos de [start, end] que ainda faltam"""
+        return self.build_heights(range(start, end + 1), workers=workers, shard_size=shard_size,
+                                  distributor_only=distributor_only)
+
+    def build_heights(self, heights: Iterable[int], workers: int = AIRDROP_WORKERS, shard_size: int = AIRDROP_SHARD_SIZE,
+                      distributor_only: bool = False) -> Dict:
+        """Indexa as alturas (não necessariamente contíguas) que ainda faltam, num único pool
+
+        Alturas consecutivas viram faixas, cortadas em shards de `shard_size`.
+        `distributor_only`: só as TXs do distribuidor (serve a outputs_for com
+        distributor_only=True, não à consulta de todos os outputs).
+        """
+        heights = sorted(set(heights))
+        if not heights:
+            return {'blocks': 0, 'indexed': 0, 'outputs': 0, 'failed_blocks': []}
+        absent = set(self.missing(heights[0], heights[-1], distributor_only))
+        missing = [height for height in heights if height in absent]
+        runs: List[List[int]] = []
+        for height in missing:
+            if runs and height == runs[-1][1] + 1:
+                runs[-1][1] = height
+            else:
+                runs.append([height, height])
+        ranges = [shard for low, high in runs for shard in shard_ranges(low, high, shard_size)]
+        stats = {'blocks': len(missing), 'indexed': 0, 'outputs': 0, 'failed_blocks': []}
+        if not ranges:
+            return stats
+
+        script = distributor_script(BitcoinRPC())
+        blocks_table = 'distributor_blocks' if distributor_only else 'blocks'
+        print(f"🗂️ Indexando {len(missing):,} blocos em {len(ranges)} shards ({workers} workers)")
+        started = time.monotonic()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(script,)) as executor:
+            futures = {executor.submit(index_shard, low, high, distributor_only): (low, high) for low, high in ranges}
+            for future in as_completed(futures):
+                low, high = futures[future]
+                try:
+                    rows, done, failed = future.result()
+                except Exception as exc:  # pylint: disable=broad-except
+                    print(f"   ⚠️ Shard {low}-{high} falhou: {exc}")
+                    stats['failed_blocks'].extend(range(low, high + 1))
+                    continue
+                self.db.executemany('INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?, ?)', rows)
+                self.db.executemany(f'INSERT OR IGNORE INTO {blocks_table} (height) VALUES (?)', [(h,) for h in done])
+                self.db.commit()
+                stats['indexed'] += len(done)
+                stats['outputs'] += len(rows)
+                stats['failed_blocks'].extend(failed)
+                elapsed = time.monotonic() - started
+                print(f"   📦 {low}-{high}: {len(rows):,} outputs | {stats['indexed']:,}/{len(missing):,} blocos | "
+                      f"{stats['indexed'] / elapsed:.1f} blocos/s", flush=True)
+        return stats
+
+    # === Consulta ===========================================================
+
+    def outputs_for(
+        self,
+        addresses: Iterable[str],
+        start: int,
+        end: int,
+        distributor_only: bool = True,
+        rpc: Optional[BitcoinRPC] = None,
+    ) -> Dict[str, List[Received]]:
+        """Outputs recebidos por cada endereço em [start, end], numa única consulta"""
+        addresses = list(addresses)
+        rpc = rpc or BitcoinRPC()
+        infos = []
+        for offset in range(0, len(addresses), VALIDATE_BATCH_SIZE):
+            chunk = addresses[offset:offset + VALIDATE_BATCH_SIZE]
+            infos.extend(rpc.batch([('validateaddress', address) for address in chunk]))
+        by_hash = {
+            scripthash(info['scriptPubKey']): address
+            for address, info in zip(addresses, infos)
+            if info and info.get('isvalid') and info.get('scriptPubKey')
+        }
+
+        self.db.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (scripthash BLOB PRIMARY KEY)')
+        self.db.execute('DELETE FROM wanted')
+        self.db.executemany('INSERT OR IGNORE INTO wanted VALUES (?)', [(h,) for h in by_hash])
+        rows = self.db.execute(
+            'SELECT o.scripthash, o.height, o.txid, o.vout, o.value FROM outputs o '
+            'JOIN wanted w ON w.scripthash = o.scripthash '
+            'WHERE o.height BETWEEN ? AND ? AND (? = 0 OR o.from_distributor = 1) '
+            'ORDER BY o.height, o.txid, o.vout',
+            (start, end, int(distributor_only)),
+        )
+        received: Dict[str, List[Received]] = defaultdict(list)
+        for hash_, height, txid, vout, value in rows:
+            received[by_hash[hash_]].append((height, txid, vout, value))
+        return received
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Índice local scripthash -> outputs recebidos')
+    parser.add_argument('start', type=int)
+    parser.add_argument('end', type=int)
+    parser.add_argument('address', nargs='?')
+    parser.add_argument('--workers', type=int, default=AIRDROP_WORKERS)
+    parser.add_argument('--all-senders', action='store_true', help='na consulta, inclui outputs que não vieram do distribuidor')
+    parser.add_argument('--distributor-only', action='store_true', help='indexa só as TXs do distribuidor')
+    args = parser.parse_args()
+
+    index = AddressIndex()
+    stats = index.build(args.start, args.end, workers=args.workers, distributor_only=args.distributor_only)
+    print(f"✅ Índice cobre {args.start}-{args.end} | {stats['indexed']:,} blocos novos, {stats['outputs']:,} outputs")
+    if stats['failed_blocks']:
+        print(f"   ⚠️ {len(stats['failed_blocks'])} blocos com falha (rode de novo para completar)")
+
+    if args.address:
+        received = index.outputs_for([args.address], args.start, args.end, distributor_only=not args.all_senders)
+        for height, txid, vout, value in received.get(args.address, []):
+            print(f"   {height} {txid}:{vout} {value:,} sats")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Scanner paralelo de airdrop DOG por faixa de blocos (Bitcoin Core local)
+
+- A faixa [início, fim] é dividida em shards de AIRDROP_SHARD_SIZE blocos,
+  distribuídos num ProcessPoolExecutor (um BitcoinRPC keep-alive por worker)
+- O conjunto de recipients é um frozenset carregado uma vez por worker
+  (initializer); cada output é casado por endereço em O(1)
+- Cada shard grava contagens parciais em data/airdrop_shards/<início>-<fim>.json;
+  shards completos são reaproveitados em uma nova execução (retomada) e a
+  junção final é só a soma das parciais
+- Progresso em blocos/s
+- --distributor-only: conta só outputs de TXs do distribuidor. O bloco vem
+  com prevouts (getblock verbosity 3) e cada TX é checada contra o
+  scriptPubKey do distribuidor (calculado uma vez via validateaddress),
+  sem getrawtransaction por input. O runestone dessas TXs é decodificado
+  (runestone_decoder) e os edicts dão o DOG exato de cada output
+
+Uso:
+    python3 airdrop_scanner.py                          # janela completa do airdrop
+    python3 airdrop_scanner.py 840650 841000 --workers 8
+    python3 airdrop_scanner.py --force                  # ignora shards já gravados
+    python3 airdrop_scanner.py --distributor-only       # só TXs do distribuidor
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from bitcoin_rpc import BitcoinRPC
+from dog_record import to_dog
+from runestone_decoder import allocate, find_runestone
+
+BASE_DIR = Path(__file__).parent.parent
+AIRDROP_RECIPIENTS_FILE = BASE_DIR / 'data' / 'airdrop_recipients.json'
+OUTPUT_FILE = BASE_DIR / 'data' / 'airdrop_recipients_complete.json'
+SHARDS_DIR = BASE_DIR / 'data' / 'airdrop_shards'
+DISTRIBUTOR_ADDRESS = 'bc1pry0ne0yf5pkgqsszmytmqkpzs4aflhr8tfptz9sydqrhxexgujcqqler2t'
+AIRDROP_START_BLOCK = 840654
+AIRDROP_END_BLOCK = 858370
+AIRDROP_AMOUNT = 889806
+AIRDROP_SHARD_SIZE = int(os.environ.get('AIRDROP_SHARD_SIZE', '100'))
+AIRDROP_WORKERS = int(os.environ.get('AIRDROP_WORKERS', str(os.cpu_count() or 4)))
+SATS_PER_BTC = 100_000_000
+
+# Match: (txid, altura, vout, valor em sats, DOG em unidades base ou None)
+Match = Tuple[str, int, int, int, Optional[int]]
+
+# Estado por worker (preenchido pelo initializer)
+_RECIPIENTS: FrozenSet[str] = frozenset()
+_DISTRIBUTOR_SCRIPT: Optional[str] = None
+_RPC: Optional[BitcoinRPC] = None
+
+
+def load_recipients(path: Path = AIRDROP_RECIPIENTS_FILE) -> FrozenSet[str]:
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return frozenset(r['address'] for r in data['recipients'] if r.get('address'))
+
+
+def output_address(vout: Dict) -> Optional[str]:
+    script_pub_key = vout.get('scriptPubKey', {})
+    addresses = script_pub_key.get('addresses') or [None]
+    return script_pub_key.get('address') or addresses[0]
+
+
+def distributor_script(rpc: BitcoinRPC, address: str = DISTRIBUTOR_ADDRESS) -> str:
+    """scriptPubKey (hex) do distribuidor, calculado uma vez pelo node"""
+    info = rpc.call('validateaddress', address) or {}
+    if not info.get('isvalid') or not info.get('scriptPubKey'):
+        raise RuntimeError(f'não foi possível obter o scriptPubKey de {address}')
+    return info['scriptPubKey']
+
+
+def prevout_scripts(rpc: BitcoinRPC, tx: Dict) -> List[Optional[str]]:
+    """scriptPubKey dos outputs gastos pela TX.
+
+    Vem do próprio bloco (verbosity 3); só em nodes sem prevout (< v23)
+    cai para getrawtransaction, num único batch por TX.
+    """
+    inputs = [vin for vin in tx.get('vin', []) if 'coinbase' not in vin]
+    if all('prevout' in vin for vin in inputs):
+        return [vin['prevout'].get('scriptPubKey', {}).get('hex') for vin in inputs]
+    previous = rpc.batch([('getrawtransaction', vin['txid'], 1) for vin in inputs])
+    return [
+        prev['vout'][vin['vout']].get('scriptPubKey', {}).get('hex') if prev else None
+        for vin, prev in zip(inputs, previous)
+    ]
+
+
+def is_distributor_tx(rpc: BitcoinRPC, tx: Dict, script: str) -> bool:
+    return script in prevout_scripts(rpc, tx)
+
+
+def _init_worker(recipients: FrozenSet[str], script: Optional[str] = None) -> None:
+    global _RECIPIENTS, _DISTRIBUTOR_SCRIPT, _RPC
+    _RECIPIENTS = recipients
+    _DISTRIBUTOR_SCRIPT = script
+    _RPC = BitcoinRPC()
+
+
+# === Shards ==================================================================
+
+def shard_ranges(start: int, end: int, size: int = AIRDROP_SHARD_SIZE) -> List[Tuple[int, int]]:
+    """Faixas [início, fim] (inclusivas) de até `size` blocos"""
+    return [(low, min(low + size - 1, end)) for low in range(start, end + 1, size)]
+
+
+def shard_path(start: int, end: int, distributor_only: bool = False) -> Path:
+    return SHARDS_DIR / f"{start}-{end}{'-distributor' if distributor_only else ''}.json"
+
+
+def scan_block(
+    rpc: BitcoinRPC,
+    height: int,
+    block_hash: Optional[str],
+    recipients: FrozenSet[str],
+    script: Optional[str] = None,
+) -> Optional[List[Tuple[str, Match]]]:
+    """Outputs do bloco que pagam algum recipient. None se o bloco não pôde ser lido.
+
+    Com `script`, só TXs que gastam um output do distribuidor contam, e o
+    DOG de cada output sai dos edicts do runestone (entradas cobrindo os
+    edicts explícitos; ver runestone_decoder.allocate).
+    """
+    block = rpc.call('getblock', block_hash, 3 if script else 2, timeout=120) if block_hash else None
+    if not block:
+        return None
+    matches = []
+    for tx in block.get('tx', []):
+        dog = None
+        if script:
+            if not is_distributor_tx(rpc, tx, script):
+                continue
+            scripts = [vout.get('scriptPubKey', {}).get('hex', '') for vout in tx.get('vout', [])]
+            allocation = allocate(find_runestone(scripts), scripts, None)
+            dog = allocation.outputs if allocation.exact else None  # None: airdrop_amount usa o valor padrão
+        for index, vout in enumerate(tx.get('vout', [])):
+            address = output_address(vout)
+            if address in recipients:
+                value = round(vout.get('value', 0) * SATS_PER_BTC)
+                amount = dog.get(index, 0) if dog is not None else None
+                matches.append((address, (tx['txid'], height, index, value, amount)))
+    return matches
+
+
+def scan_shard(start: int, end: int) -> Dict:
+    """Escaneia um shard no worker e grava as contagens parciais"""
+    rpc = _RPC or BitcoinRPC()
+    heights = list(range(start, end + 1))
+    hashes = rpc.batch([('getblockhash', height) for height in heights])
+
+    counts: Dict[str, List[Match]] = defaultdict(list)
+    failed = []
+    for height, block_hash in zip(heights, hashes):
+        matches = scan_block(rpc, height, block_hash, _RECIPIENTS, _DISTRIBUTOR_SCRIPT)
+        if matches is None:
+            failed.append(height)
+            continue
+        for address, match in matches:
+            counts[address].append(match)
+
+    shard = {
+        'start': start,
+        'end': end,
+        'blocks': len(heights) - len(failed),
+        'failed_blocks': failed,
+        'outputs': sum(len(matches) for matches in counts.values()),
+        'counts': counts,
+    }
+    path = shard_path(start, end, _DISTRIBUTOR_SCRIPT is not None)
+    SHARDS_DIR.mkdir(parents=True, exist_ok=True)
+    temp_file = path.with_suffix('.json.tmp')
+    with open(temp_file, 'w') as f:
+        json.dump(shard, f, separators=(',', ':'))
+    os.replace(temp_file, path)
+    return shard
+
+
+def load_shard(start: int, end: int, distributor_only: bool = False) -> Optional[Dict]:
+    """Shard já gravado e completo (sem blocos com falha)"""
+    try:
+        with open(shard_path(start, end, distributor_only), 'r') as f:
+            shard = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return shard if not shard.get('failed_blocks') else None
+
+
+def merge_shards(shards: Iterable[Dict]) -> Dict[str, List[Match]]:
+    """Soma das contagens parciais, outputs em ordem de bloco"""
+    merged: Dict[str, List[Match]] = defaultdict(list)
+    for shard in shards:
+        for address, matches in shard['counts'].items():
+            merged[address].extend(tuple(match) for match in matches)
+    for matches in merged.values():
+        matches.sort(key=lambda match: (match[1], match[0], match[2]))
+    return merged
+
+
+# === Scan ====================================================================
+
+def scan_range(
+    start: int,
+    end: int,
+    recipients: FrozenSet[str],
+    workers: int = AIRDROP_WORKERS,
+    shard_size: int = AIRDROP_SHARD_SIZE,
+    force: bool = False,
+    distributor_only: bool = False,
+) -> Tuple[Dict[str, List[Match]], Dict]:
+    """Escaneia [start, end] em paralelo. Retorna (outputs por recipient, estatísticas)"""
+    script = distributor_script(BitcoinRPC()) if distributor_only else None
+    ranges = shard_ranges(start, end, shard_size)
+    shards = [] if force else [shard for shard in (load_shard(*r, distributor_only) for r in ranges) if shard]
+    done = {(shard['start'], shard['end']) for shard in shards}
+    pending = [r for r in ranges if r not in done]
+    total_blocks = end - start + 1
+    print(f"🧩 {len(ranges)} shards de até {shard_size} blocos | {len(done)} reaproveitados | {len(pending)} a escanear | {workers} workers")
+
+    started = time.monotonic()
+    scanned = 0
+    failed: List[int] = []
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(recipients, script)) as executor:
+            futures = {executor.submit(scan_shard, low, high): (low, high) for low, high in pending}
+            for future in as_completed(futures):
+                low, high = futures[future]
+                try:
+                    shard = future.result()
+                except Exception as exc:  # pylint: disable=broad-except
+                    print(f"   ⚠️ Shard {low}-{high} falhou: {exc}")
+                    failed.extend(range(low, high + 1))
+                    continue
+                shards.append(shard)
+                scanned += shard['blocks']
+                failed.extend(shard['failed_blocks'])
+                elapsed = time.monotonic() - started
+                print(f"   📦 {low}-{high}: {shard['outputs']:,} outputs | "
+                      f"{scanned:,}/{sum(h - l + 1 for l, h in pending):,} blocos | {scanned / elapsed:.1f} blocos/s", flush=True)
+
+    elapsed = time.monotonic() - started
+    merged = merge_shards(shards)
+    stats = {
+        'blocks': total_blocks,
+        'blocks_scanned': scanned,
+        'failed_blocks': sorted(failed),
+        'elapsed_sec': round(elapsed, 1),
+        'blocks_per_sec': round(scanned / elapsed, 1) if elapsed and scanned else None,
+        'outputs': sum(len(matches) for matches in merged.values()),
+    }
+    return merged, stats
+
+
+def airdrop_amount(matches: List[Match]) -> float:
+    """DOG exato (edicts) quando conhecido; senão o valor padrão por output"""
+    amounts = [match[4] if len(match) > 4 else None for match in matches]
+    if amounts and all(amount is not None for amount in amounts):
+        return to_dog(sum(amounts))
+    return len(matches) * AIRDROP_AMOUNT
+
+
+def build_results(recipients: FrozenSet[str], merged: Dict[str, List[Match]]) -> List[Dict]:
+    results = []
+    for address in recipients:
+        matches = merged.get(address, [])
+        txs = []
+        for txid, height, vout, value, *dog in matches:
+            entry = {'tx': txid, 'block': height, 'vout': vout, 'value': value}
+            if dog and dog[0] is not None:
+                entry['dog_amount'] = to_dog(dog[0])
+            txs.append(entry)
+        results.append({
+            'address': address,
+            'receive_count': len(matches),
+            'airdrop_amount': airdrop_amount(matches),
+            'airdrop_txs': txs,
+        })
+    results.sort(key=lambda r: (-r['receive_count'], r['address']))
+    for i, r in enumerate(results, 1):
+        r['rank'] = i
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scanner paralelo de airdrop DOG por faixa de blocos')
+    parser.add_argument('start', type=int, nargs='?', default=AIRDROP_START_BLOCK)
+    parser.add_argument('end', type=int, nargs='?', default=AIRDROP_END_BLOCK)
+    parser.add_argument('--workers', type=int, default=AIRDROP_WORKERS)
+    parser.add_argument('--shard-size', type=int, default=AIRDROP_SHARD_SIZE)
+    parser.add_argument('--recipients', type=Path, default=AIRDROP_RECIPIENTS_FILE)
+    parser.add_argument('--output', type=Path, default=OUTPUT_FILE)
+    parser.add_argument('--force', action='store_true', help='reescaneia shards já gravados')
+    parser.add_argument('--distributor-only', action='store_true', help='só outputs de TXs do distribuidor')
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print(f"🚀 SCANNER PARALELO DE AIRDROP - blocos {args.start} a {args.end}")
+    print("=" * 80)
+
+    recipients = load_recipients(args.recipients)
+    print(f"✅ {len(recipients):,} recipients carregados")
+
+    merged, stats = scan_range(args.start, args.end, recipients, args.workers, args.shard_size, args.force, args.distributor_only)
+    results = build_results(recipients, merged)
+    multi_count = sum(1 for r in results if r['receive_count'] > 1)
+
+    print(f"\n📊 SCAN COMPLETO em {stats['elapsed_sec']}s ({stats['blocks_per_sec'] or '-'} blocos/s)")
+    print(f"   Blocos na faixa: {stats['blocks']:,} | escaneados agora: {stats['blocks_scanned']:,}")
+    print(f"   Outputs encontrados: {stats['outputs']:,}")
+    print(f"   DOG recebido: {sum(r['airdrop_amount'] for r in results):,.5f}")
+    print(f"   Recipients com airdrops: {sum(1 for r in results if r['receive_count'] > 0):,}")
+    print(f"   Recipients com múltiplos: {multi_count:,}")
+    if stats['failed_blocks']:
+        print(f"   ⚠️ {len(stats['failed_blocks'])} blocos com falha (rode de novo para completar)")
+
+    output_data = {
+        'timestamp': datetime.now().isoformat(),
+        'extraction_method': 'bitcoin_core_parallel_scan',
+        'block_range': [args.start, args.end],
+        'distributor_address': DISTRIBUTOR_ADDRESS if args.distributor_only else None,
+        'scan_stats': stats,
+        'airdrop_amount_per_utxo': AIRDROP_AMOUNT,
+        'total_recipients': len(results),
+        'total_airdrops': stats['outputs'],
+        'total_dog_received': round(sum(r['airdrop_amount'] for r in results), 5),
+        'recipients_with_multiple': multi_count,
+        'recipients': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(output_data, f, indent=2)
+    print(f"💾 Salvo em {args.output}")
+
+
+if __name__ == '__main__':
+    main()
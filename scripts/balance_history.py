@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Histórico compacto de saldo DOG por endereço (SQLite, data/balance_history.db)
+
+MODELO:
+    deltas  (txid, address, height, delta)  variação líquida do endereço na
+            TX, em unidades base; só existe linha onde o saldo mudou
+
+- O saldo em qualquer altura é a soma dos deltas até ela (`trajectory()`)
+- Mantido pelo tracker: `apply_transactions()` a cada save de TXs
+  confirmadas. Regravar uma TX substitui os deltas dela, então
+  reprocessar é seguro. TXs `inputs_estimated` só creditam os receivers
+- Os recebimentos do distribuidor (forensic_airdrop_data.json) cobrem o
+  período do airdrop, antes do tracker existir
+- `holding_spans()` dá, para muitos endereços numa consulta, o primeiro
+  recebimento e quantos blocos se passaram até a última mudança de saldo
+  (base do accumulation_rate da análise forense)
+
+Uso:
+    python3 balance_history.py --backfill     # airdrop + dog_transactions.json
+    python3 balance_history.py bc1q...        # trajetória de um endereço
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from dog_record import DOG_FACTOR, TransactionLike, as_record
+
+BASE_DIR = Path(__file__).parent.parent
+BALANCE_HISTORY_DB = Path(os.environ.get('BALANCE_HISTORY_DB', str(BASE_DIR / 'data' / 'balance_history.db')))
+FORENSIC_DATA_FILE = BASE_DIR / 'data' / 'forensic_airdrop_data.json'
+TRANSACTIONS_FILE = BASE_DIR / 'backend' / 'data' / 'dog_transactions.json'
+
+# (primeiro recebimento, blocos até a última mudança de saldo)
+HoldingSpan = Tuple[int, int]
+
+
+def transaction_deltas(tx: TransactionLike) -> Dict[str, int]:
+    """Variação líquida por endereço (unidades base) de uma TX (qualquer formato)
+
+    TX com `inputs_estimated` (saldo dos inputs fora do snapshot) não debita
+    os senders: a quantia deles é estimativa e entraria errada na soma.
+    """
+    deltas: Dict[str, int] = defaultdict(int)
+    record = as_record(tx)
+    if not record.inputs_estimated:
+        for sender in record.senders:
+            deltas[sender.address] -= sender.amount
+    for receiver in record.receivers:
+        deltas[receiver.address] += receiver.amount
+    return {address: delta for address, delta in deltas.items() if delta and address and address != 'UNKNOWN'}
+
+
+class BalanceHistory:
+    def __init__(self, db_path: Path = BALANCE_HISTORY_DB):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(db_path))
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS deltas (
+                txid TEXT NOT NULL,
+                address TEXT NOT NULL,
+                height INTEGER NOT NULL,
+                delta INTEGER NOT NULL,
+                PRIMARY KEY (txid, address)
+            ) WITHOUT ROWID
+        ''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_deltas_address ON deltas (address, height)')
+        self.db.commit()
+
+    # === Escrita ============================================================
+
+    def apply_transactions(self, transactions: Iterable[TransactionLike]) -> int:
+        """Grava os deltas das TXs confirmadas (substitui os que a TX já tinha)"""
+        records = (as_record(tx) for tx in transactions)
+        confirmed = [record for record in records if record.block_height and record.source != 'mempool']
+        rows = [
+            (record.txid, address, record.block_height, delta)
+            for record in confirmed
+            for address, delta in transaction_deltas(record).items()
+        ]
+        self.db.executemany('DELETE FROM deltas WHERE txid = ?', [(record.txid,) for record in confirmed])
+        self.db.executemany('INSERT INTO deltas VALUES (?, ?, ?, ?)', rows)
+        self.db.commit()
+        return len(rows)
+
+    def seed_airdrop(self, recipients: Iterable[Dict[str, Any]]) -> int:
+        """Recebimentos do distribuidor (receive_history do forensic_airdrop_extractor)"""
+        deltas: Dict[Tuple[str, str], List[int]] = {}
+        for recipient in recipients:
+            for receipt in recipient.get('receive_history', []):
+                if receipt.get('tx') and receipt.get('block') and receipt.get('dog_amount'):
+                    key = (receipt['tx'], recipient['address'])
+                    height, amount = deltas.get(key, (receipt['block'], 0))
+                    deltas[key] = [height, amount + int(round(receipt['dog_amount'] * DOG_FACTOR))]
+        self.db.executemany(
+            'INSERT OR REPLACE INTO deltas VALUES (?, ?, ?, ?)',
+            [(txid, address, height, delta) for (txid, address), (height, delta) in deltas.items()],
+        )
+        self.db.commit()
+        return len(deltas)
+
+    # === Consulta ===========================================================
+
+    def tip(self) -> Optional[int]:
+        row = self.db.execute('SELECT MAX(height) FROM deltas').fetchone()
+        return row[0] if row else None
+
+    def trajectory(self, address: str) -> List[Tuple[int, int]]:
+        """[(altura, saldo depois do bloco)] em unidades base"""
+        balance, points = 0, []
+        rows = self.db.execute('SELECT height, SUM(delta) FROM deltas WHERE address = ? GROUP BY height ORDER BY height', (address,))
+        for height, delta in rows:
+            balance += delta
+            points.append((height, balance))
+        return points
+
+    def holding_spans(self, addresses: Iterable[str]) -> Dict[str, HoldingSpan]:
+        """Primeiro recebimento e blocos até a última mudança de saldo, numa consulta.
+
+        Sem mudança depois do primeiro recebimento, a janela vai até a ponta
+        do histórico.
+        """
+        tip = self.tip()
+        self.db.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (address TEXT PRIMARY KEY)')
+        self.db.execute('DELETE FROM wanted')
+        self.db.executemany('INSERT OR IGNORE INTO wanted VALUES (?)', [(address,) for address in addresses])
+        rows = self.db.execute(
+            'SELECT d.address, MIN(CASE WHEN d.delta > 0 THEN d.height END), MAX(d.height) FROM deltas d '
+            'JOIN wanted w ON w.address = d.address GROUP BY d.address'
+        )
+        spans = {}
+        for address, first, last in rows:
+            if first is None:
+                continue
+            spans[address] = (first, (last if last > first else tip) - first)
+        return spans
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Histórico compacto de saldo DOG por endereço')
+    parser.add_argument('address', nargs='?')
+    parser.add_argument('--backfill', action='store_true', help='recebimentos do airdrop + dog_transactions.json')
+    args = parser.parse_args()
+
+    history = BalanceHistory()
+    if args.backfill:
+        if FORENSIC_DATA_FILE.exists():
+            with open(FORENSIC_DATA_FILE, 'r') as f:
+                seeded = history.seed_airdrop(json.load(f).get('recipients', []))
+            print(f"🪂 {seeded:,} recebimentos do airdrop registrados")
+        else:
+            print(f"⚠️ {FORENSIC_DATA_FILE} não encontrado (rode forensic_airdrop_extractor.py)")
+        if TRANSACTIONS_FILE.exists():
+            with open(TRANSACTIONS_FILE, 'r') as f:
+                applied = history.apply_transactions(json.load(f).get('transactions', []))
+            print(f"📜 {applied:,} deltas de transações registrados")
+        print(f"✅ Histórico até o bloco {history.tip()}")
+
+    if args.address:
+        for height, balance in history.trajectory(args.address):
+            print(f"   {height}: {balance / DOG_FACTOR:,.5f} DOG")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Cliente Bitcoin Core compartilhado
+
+Usa JSON-RPC via HTTP com conexão keep-alive quando há credenciais
+(BITCOIN_RPC_USER/BITCOIN_RPC_PASSWORD ou cookie do bitcoind).
+Sem credenciais, cai para `bitcoin-cli` (comportamento antigo dos scripts).
+
+Uso:
+    from bitcoin_rpc import BitcoinRPC
+    rpc = BitcoinRPC()
+    height = rpc.call('getblockcount')
+    tx = rpc.call('getrawtransaction', txid, True)
+"""
+
+import json
+import os
+import subprocess
+import threading
+from pathlib import Path
+from typing import Any, List, Optional, Tuple
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+BITCOIN_CLI = 'bitcoin-cli'
+BITCOIN_RPC_URL = os.environ.get('BITCOIN_RPC_URL', 'http://127.0.0.1:8332')
+BITCOIN_RPC_USER = os.environ.get('BITCOIN_RPC_USER')
+BITCOIN_RPC_PASSWORD = os.environ.get('BITCOIN_RPC_PASSWORD')
+BITCOIN_RPC_COOKIE = os.environ.get('BITCOIN_RPC_COOKIE', str(Path.home() / '.bitcoin' / '.cookie'))
+BITCOIN_RPC_TIMEOUT = float(os.environ.get('BITCOIN_RPC_TIMEOUT', '30'))
+
+
+def _read_credentials() -> Optional[Tuple[str, str]]:
+    """Lê usuário/senha das variáveis de ambiente ou do cookie do bitcoind"""
+    if BITCOIN_RPC_USER and BITCOIN_RPC_PASSWORD:
+        return BITCOIN_RPC_USER, BITCOIN_RPC_PASSWORD
+    try:
+        user, password = Path(BITCOIN_RPC_COOKIE).read_text().strip().split(':', 1)
+        return user, password
+    except (OSError, ValueError):
+        return None
+
+
+def _cli_arg(value: Any) -> str:
+    """Converte parâmetro tipado para o formato aceito pelo bitcoin-cli"""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+class BitcoinRPC:
+    def __init__(self, url: str = BITCOIN_RPC_URL, timeout: float = BITCOIN_RPC_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+        self.credentials = _read_credentials() if requests else None
+        self._local = threading.local()  # uma sessão (pool keep-alive) por thread
+        self.calls = 0
+        self.errors = 0
+
+    @property
+    def uses_http(self) -> bool:
+        return self.credentials is not None
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.auth = self.credentials
+            session.headers.update({'Content-Type': 'application/json'})
+            self._local.session = session
+        return session
+
+    def _call_cli(self, method: str, params: Tuple[Any, ...], timeout: float) -> Any:
+        result = subprocess.run(
+            [BITCOIN_CLI, method] + [_cli_arg(p) for p in params],
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+        if result.returncode != 0:
+            return None
+        output = result.stdout.strip()
+        if not output:
+            return None
+        try:
+            return json.loads(output)
+        except json.JSONDecodeError:
+            return output  # ex: getblockhash retorna string sem aspas
+
+    def call(self, method: str, *params: Any, timeout: Optional[float] = None) -> Any:
+        """Executa um comando RPC. Retorna None em caso de erro (como os scripts antigos)"""
+        timeout = timeout or self.timeout
+        self.calls += 1
+        try:
+            if not self.uses_http:
+                result = self._call_cli(method, params, timeout)
+            else:
+                payload = {'jsonrpc': '1.0', 'id': method, 'method': method, 'params': list(params)}
+                response = self._session().post(self.url, data=json.dumps(payload), timeout=timeout)
+                result = response.json().get('result')
+        except Exception:
+            result = None
+
+        if result is None:
+            self.errors += 1
+        return result
+
+    def batch(self, calls: List[Tuple[Any, ...]], timeout: Optional[float] = None) -> List[Any]:
+        """Executa vários comandos numa única requisição HTTP (JSON-RPC batch)"""
+        if not calls:
+            return []
+        if not self.uses_http:
+            return [self.call(method, *params, timeout=timeout) for method, *params in calls]
+
+        timeout = timeout or self.timeout
+        payload = [
+            {'jsonrpc': '1.0', 'id': index, 'method': method, 'params': list(params)}
+            for index, (method, *params) in enumerate(calls)
+        ]
+        self.calls += len(calls)
+        try:
+            response = self._session().post(self.url, data=json.dumps(payload), timeout=timeout)
+            replies = response.json()
+        except Exception:
+            self.errors += len(calls)
+            return [None] * len(calls)
+
+        results: List[Any] = [None] * len(calls)
+        for reply in replies:
+            results[reply['id']] = reply.get('result')
+        self.errors += sum(1 for r in results if r is None)
+        return results
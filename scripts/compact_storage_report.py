@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Relatório de economia do formato compacto de armazenamento (dog_record)
+
+Compara, para cada arquivo de transações, o tamanho em bytes do formato
+da API (schema_version 2, com runestone embutido) com o formato compacto
+(schema_version 3, sem campos derivados nem runestone).
+
+Uso:
+    python3 compact_storage_report.py              # só o relatório
+    python3 compact_storage_report.py --migrate    # move os runestones para o
+                                                   # runestone_store e regrava compacto
+"""
+
+import json
+import sys
+from pathlib import Path
+
+from dog_record import compact_transaction, expand_transaction
+from runestone_store import RunestoneStore
+
+BASE_DIR = Path(__file__).parent.parent
+TRANSACTION_FILES = [
+    BASE_DIR / 'public' / 'data' / 'dog_transactions.json',
+    BASE_DIR / 'backend' / 'data' / 'dog_transactions.json',
+]
+
+
+def json_size(value, **dump_kwargs) -> int:
+    return len(json.dumps(value, ensure_ascii=False, **dump_kwargs).encode('utf-8'))
+
+
+def report_file(path: Path, store: RunestoneStore, migrate: bool = False):
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    transactions = data.get('transactions', [])
+
+    # Formato da API com o runestone embutido (como era gravado antes)
+    expanded = []
+    for tx in transactions:
+        full = expand_transaction(tx)
+        if 'runestone' not in full:
+            runestone = store.get(full['txid'])
+            if runestone:
+                full = {**full, 'runestone': runestone}
+        expanded.append(full)
+    compact = [compact_transaction(tx) for tx in expanded]
+
+    before = json_size({**data, 'transactions': expanded}, indent=2)
+    after = json_size({**data, 'transactions': compact}, indent=2)
+    runestone_bytes = sum(json_size(tx['runestone']) for tx in expanded if tx.get('runestone'))
+
+    print(f"📄 {path.relative_to(BASE_DIR)} ({len(transactions)} TXs)")
+    print(f"   Formato da API:   {before:>12,} bytes")
+    print(f"   Formato compacto: {after:>12,} bytes ({(1 - after / before) * 100 if before else 0:.1f}% menor)")
+    print(f"   Runestones (store lateral): {runestone_bytes:,} bytes")
+
+    if migrate:
+        stashed = store.put_many({tx['txid']: tx['runestone'] for tx in expanded if tx.get('runestone')})
+        temp_file = path.with_suffix('.json.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump({**data, 'transactions': compact}, f, indent=2, ensure_ascii=False)
+        temp_file.replace(path)
+        print(f"   ✅ Migrado: {stashed} runestones no store, arquivo regravado compacto")
+
+    return before, after
+
+
+def main():
+    migrate = '--migrate' in sys.argv
+    store = RunestoneStore()
+
+    print("=" * 60)
+    print("📦 ECONOMIA DO FORMATO COMPACTO DE TRANSAÇÕES")
+    print("=" * 60)
+
+    total_before = total_after = 0
+    for path in TRANSACTION_FILES:
+        if not path.exists():
+            print(f"⚠️ {path.relative_to(BASE_DIR)} não encontrado")
+            continue
+        before, after = report_file(path, store, migrate)
+        total_before += before
+        total_after += after
+
+    if total_before:
+        print("-" * 60)
+        print(f"📊 Total: {total_before:,} -> {total_after:,} bytes "
+              f"({total_before - total_after:,} bytes economizados, {(1 - total_after / total_before) * 100:.1f}%)")
+
+
+if __name__ == '__main__':
+    main()
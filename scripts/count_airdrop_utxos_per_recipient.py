@@ -1,21 +1,19 @@
 #!/usr/bin/env python3
 """
 Contador EFICIENTE de UTXOs do Airdrop DOG
-Para cada recipient conhecido, busca suas TXs e conta quantos UTXOs recebeu
+Para todos os recipients de uma vez, conta quantos UTXOs cada um recebeu do
+distribuidor, usando o índice local de endereços (address_index.py)
 """
 
 import json
-import requests
-import time
-from collections import defaultdict
 from datetime import datetime
 
+from address_index import AddressIndex
+from airdrop_scanner import AIRDROP_END_BLOCK, AIRDROP_START_BLOCK
+
 # Configurações
 AIRDROP_RECIPIENTS_FILE = "../data/airdrop_recipients.json"
 OUTPUT_FILE = "../data/airdrop_recipients_complete.json"
-DISTRIBUTOR_ADDRESS = "bc1pry0ne0yf5pkgqsszmytmqkpzs4aflhr8tfptz9sydqrhxexgujcqqler2t"
-AIRDROP_START_BLOCK = 840654
-AIRDROP_END_BLOCK = 858370
 
 print("=" * 80)
 print("🔬 CONTADOR COMPLETO DE AIRDROPS POR RECIPIENT")
@@ -30,106 +28,36 @@ with open(AIRDROP_RECIPIENTS_FILE, 'r') as f:
 print(f"✅ {len(recipients_list):,} recipients carregados")
 
 print(f"\n📋 Estratégia:")
-print(f"   1. Para cada recipient, buscar SUAS transações")
-print(f"   2. Filtrar TXs do período do airdrop (blocos {AIRDROP_START_BLOCK}-{AIRDROP_END_BLOCK})")
-print(f"   3. Contar outputs recebidos do distribuidor")
-print(f"   4. Cada output = 1 airdrop de 889,806 DOG")
+print(f"   1. Indexar localmente as TXs do distribuidor nos blocos {AIRDROP_START_BLOCK}-{AIRDROP_END_BLOCK} (só o que faltar)")
+print(f"   2. Consultar, para todos os recipients numa única busca, os outputs recebidos do distribuidor")
+print(f"   3. Cada output = 1 airdrop de 889,806 DOG")
 
-print(f"\n⏱️  Estimativa: ~2-3 horas para processar {len(recipients_list):,} recipients")
-print(f"   (com rate limiting para não sobrecarregar APIs)")
+index = AddressIndex()
+index.build(AIRDROP_START_BLOCK, AIRDROP_END_BLOCK, distributor_only=True)  # Só as TXs do distribuidor
 
-response = input("\nDeseja continuar? (s/n): ")
-if response.lower() != 's':
-    print("❌ Cancelado")
-    exit(0)
+print("\n🔍 Consultando o índice...")
+received = index.outputs_for([r['address'] for r in recipients_list], AIRDROP_START_BLOCK, AIRDROP_END_BLOCK)
 
-# Processar recipients
 updated_recipients = []
 total_airdrops_found = 0
-processed_count = 0
 multi_airdrop_count = 0
 
-print("\n🔍 Processando recipients...")
-print("   (Progresso a cada 100 recipients)\n")
-
 for recipient in recipients_list:
     addr = recipient['address']
+    outputs = received.get(addr, [])
+    receive_count = len(outputs)
     
-    try:
-        # Buscar TXs do recipient via Blockstream API
-        url = f"https://blockstream.info/api/address/{addr}/txs"
-        response = requests.get(url, timeout=30)
-        
-        if response.status_code != 200:
-            # Se falhar, usar dados existentes
-            updated_recipients.append(recipient)
-            processed_count += 1
-            continue
-        
-        txs = response.json()
-        
-        # Contar outputs recebidos do distribuidor no período do airdrop
-        receive_count = 0
-        airdrop_txs = []
-        
-        for tx in txs:
-            # Verificar se TX está no período do airdrop
-            block_height = tx.get('status', {}).get('block_height')
-            if not block_height or block_height < AIRDROP_START_BLOCK or block_height > AIRDROP_END_BLOCK:
-                continue
-            
-            # Verificar se o distribuidor está nos inputs
-            has_distributor = False
-            for vin in tx.get('vin', []):
-                prev_addr = vin.get('prevout', {}).get('scriptpubkey_address')
-                if prev_addr == DISTRIBUTOR_ADDRESS:
-                    has_distributor = True
-                    break
-            
-            if not has_distributor:
-                continue
-            
-            # Contar outputs para este recipient
-            for vout in tx.get('vout', []):
-                if vout.get('scriptpubkey_address') == addr:
-                    receive_count += 1
-                    airdrop_txs.append({
-                        'tx': tx['txid'],
-                        'block': block_height,
-                        'vout': vout.get('n')
-                    })
-        
-        # Atualizar recipient
-        updated_recipient = {
-            'address': addr,
-            'receive_count': receive_count,
-            'rank': recipient.get('rank', 0),
-            'airdrop_txs': airdrop_txs
-        }
-        
-        updated_recipients.append(updated_recipient)
-        total_airdrops_found += receive_count
-        
-        if receive_count > 1:
-            multi_airdrop_count += 1
-        
-        processed_count += 1
-        
-        # Progresso
-        if processed_count % 100 == 0:
-            print(f"   ⏳ {processed_count:,}/{len(recipients_list):,} | "
-                  f"Airdrops: {total_airdrops_found:,} | "
-                  f"Multi: {multi_airdrop_count:,}")
-        
-        # Rate limiting
-        time.sleep(0.2)  # 5 requests/segundo
-        
-    except Exception as e:
-        print(f"   ⚠️  Erro no recipient {addr[:20]}...: {e}")
-        updated_recipients.append(recipient)
-        processed_count += 1
-        time.sleep(1)
-        continue
+    updated_recipients.append({
+        'address': addr,
+        'receive_count': receive_count,
+        'rank': recipient.get('rank', 0),
+        'airdrop_txs': [{'tx': txid, 'block': height, 'vout': vout} for height, txid, vout, _value in outputs]
+    })
+    total_airdrops_found += receive_count
+    if receive_count > 1:
+        multi_airdrop_count += 1
+
+processed_count = len(updated_recipients)
 
 print(f"\n✅ Processamento completo!")
 print(f"\n📊 RESULTADOS:")
@@ -146,7 +74,7 @@ for i, r in enumerate(updated_recipients, 1):
 # Salvar
 output_data = {
     'timestamp': datetime.now().isoformat(),
-    'extraction_method': 'recipient_transaction_scan',
+    'extraction_method': 'local_address_index',
     'total_recipients': len(updated_recipients),
     'total_airdrops': total_airdrops_found,
     'recipients_with_multiple': multi_airdrop_count,
@@ -27,6 +27,10 @@ from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
 
+from dog_record import DogTransaction, Party, as_record, compact_transaction, to_dog
+from publish_manifest import MANIFEST, content_digest
+from runestone_store import stash_runestones
+
 class DogBlockMonitor:
     def __init__(self):
         # Caminhos
@@ -269,12 +273,8 @@ class DogBlockMonitor:
                     sender_address = self.get_sender_address(vin['txid'], vin['vout'])
                     
                     # Se a TX tem outputs com DOG, então inputs tinham DOG
-                    # Vamos marcar e depois calcular
-                    senders.append({
-                        'address': sender_address,
-                        'utxo': input_utxo_key,
-                        'amount': 0  # Será calculado depois
-                    })
+                    # Vamos marcar e depois calcular (quantia em unidades base)
+                    senders.append(Party(sender_address, 0, input=input_utxo_key))
             
             # Verificar outputs (quem RECEBEU)
             receivers = []
@@ -303,15 +303,8 @@ class DogBlockMonitor:
                     else:
                         address = script.get('desc', 'UNKNOWN')
 
-                receivers.append({
-                    'address': address,
-                    'vout': output_index,
-                    'amount': amount_raw,
-                    'amount_dog': amount_raw / 100000,
-                    'has_dog': True
-                })
-
-                total_dog_out += amount_raw
+                receivers.append(Party(address, int(amount_raw), vout=output_index))
+                total_dog_out += int(amount_raw)
  
             # Se tem outputs com DOG, então é uma transação DOG!
             if len(receivers) > 0:
@@ -322,11 +315,10 @@ class DogBlockMonitor:
                 if len(senders) > 0:
                     dog_per_sender = total_dog_in // len(senders)
                     remainder = total_dog_in % len(senders)
-                    for index, sender in enumerate(senders):
-                        amount_raw = dog_per_sender + (remainder if index == 0 else 0)
-                        sender['amount'] = amount_raw
-                        sender['amount_dog'] = amount_raw / 100000
-                        sender['has_dog'] = True
+                    senders = [
+                        sender._replace(amount=dog_per_sender + (remainder if index == 0 else 0))
+                        for index, sender in enumerate(senders)
+                    ]
 
                 # Determinar tipo de transação
                 tx_type = 'transfer'
@@ -335,18 +327,14 @@ class DogBlockMonitor:
                 elif len(receivers) == 0:
                     tx_type = 'burn'  # Queima
                 
-                return {
-                    'txid': txid,
-                    'block_height': block_height,
-                    'timestamp': datetime.fromtimestamp(block_timestamp).isoformat() if block_timestamp else None,
-                    'type': tx_type,
-                    'senders': senders,
-                    'receivers': receivers,
-                    'total_dog_moved': total_dog_out / 100000,  # Em DOG
-                    'sender_count': len(senders),
-                    'receiver_count': len(receivers),
-                    'runestone': runestone
-                }
+                return DogTransaction(
+                    txid,
+                    block_height,
+                    datetime.fromtimestamp(block_timestamp).isoformat() if block_timestamp else None,
+                    senders,
+                    receivers,
+                    extra={'type': tx_type, 'runestone': runestone},
+                )
         
         except Exception as e:
             self.logger.warning(f"⚠️ Erro ao analisar TX {txid}: {e}")
@@ -405,7 +393,7 @@ class DogBlockMonitor:
                 
                 if dog_tx:
                     dog_transactions.append(dog_tx)
-                    self.logger.info(f"🎯 TX DOG: {txid} | {dog_tx['sender_count']} senders → {dog_tx['receiver_count']} receivers | {dog_tx['total_dog_moved']:.2f} DOG")
+                    self.logger.info(f"🎯 TX DOG: {txid} | {len(dog_tx.senders)} senders → {len(dog_tx.receivers)} receivers | {to_dog(dog_tx.total_out):.2f} DOG")
             
             self.logger.info(f"✅ Encontradas {len(dog_transactions)} transações DOG no bloco {block_height}")
             return dog_transactions
@@ -422,37 +410,42 @@ class DogBlockMonitor:
             if self.transactions_file.exists():
                 with open(self.transactions_file, 'r') as f:
                     data = json.load(f)
-                    existing_transactions = data.get('transactions', [])
+                    existing_transactions = [as_record(tx) for tx in data.get('transactions', [])]
             
             # Adicionar novas (evitar duplicatas)
-            existing_txids = {tx['txid'] for tx in existing_transactions}
+            existing_txids = {tx.txid for tx in existing_transactions}
             for tx in new_transactions:
-                if tx['txid'] not in existing_txids:
+                if tx.txid not in existing_txids:
                     existing_transactions.append(tx)
             
             # Ordenar por block_height e timestamp
             existing_transactions.sort(
-                key=lambda x: (x['block_height'], x['timestamp'] or ''),
+                key=lambda tx: tx.sort_key,
                 reverse=True  # Mais recentes primeiro
             )
             
+            # Runestones vão para o store lateral; o arquivo guarda o formato compacto
+            stash_runestones(new_transactions)
+            
             # Salvar
             output_data = {
                 'timestamp': datetime.now().isoformat(),
                 'total_transactions': len(existing_transactions),
                 'last_block': self.last_block_height,
-                'transactions': existing_transactions
+                'transactions': [compact_transaction(tx) for tx in existing_transactions]
             }
             
-            with open(self.transactions_file, 'w') as f:
-                json.dump(output_data, f, indent=2)
+            # Salvar (e copiar para public/, Vercel) pelo manifesto de publicação
+            digest = content_digest(output_data)
+            written = 0
+            for path in (self.transactions_file, self.public_data_dir / 'dog_transactions.json'):
+                if MANIFEST.write_json(path, output_data, digest=digest, indent=2):
+                    written += 1
             
-            # Copiar para public/ (Vercel)
-            public_file = self.public_data_dir / 'dog_transactions.json'
-            with open(public_file, 'w') as f:
-                json.dump(output_data, f, indent=2)
-            
-            self.logger.info(f"💾 Salvas {len(existing_transactions)} transações totais ({len(new_transactions)} novas)")
+            if written:
+                self.logger.info(f"💾 Salvas {len(existing_transactions)} transações totais ({len(new_transactions)} novas)")
+            else:
+                self.logger.info(f"⏭️ Transações inalteradas ({len(existing_transactions)} totais), arquivos não regravados")
             return True
             
         except Exception as e:
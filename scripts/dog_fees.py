@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Cálculo de fee a partir de transações com prevouts
+
+O Bitcoin Core devolve os prevouts (e o campo `fee`) em
+`getblock <hash> 3` e `getrawtransaction <txid> 2`, então a fee sai do
+próprio payload, sem `gettxout`/`getrawtransaction` por input.
+"""
+
+from typing import Any, Dict, Optional
+
+SATS_PER_BTC = 100_000_000
+MAX_REASONABLE_FEE = 10_000_000  # 0.1 BTC, mesmo limite dos scripts de fees
+
+
+def btc_to_sats(value: Any) -> int:
+    """Converte valor em BTC (float do RPC) para sats sem erro de truncamento"""
+    return int(round(float(value) * SATS_PER_BTC))
+
+
+def fee_from_tx(tx_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Retorna {'fee_sats', 'vsize', 'fee_rate'} ou None se faltar prevout
+
+    Usa o campo `fee` quando presente; senão soma prevouts - outputs.
+    """
+    if 'fee' in tx_data:
+        fee_sats = btc_to_sats(tx_data['fee'])
+    else:
+        total_input = 0
+        for vin in tx_data.get('vin', []):
+            if 'coinbase' in vin:
+                return None
+            prevout = vin.get('prevout')
+            if not prevout:
+                return None
+            total_input += btc_to_sats(prevout.get('value', 0))
+
+        total_output = sum(btc_to_sats(vout.get('value', 0)) for vout in tx_data.get('vout', []))
+        fee_sats = total_input - total_output
+
+    if not 1 <= fee_sats <= MAX_REASONABLE_FEE:
+        return None
+
+    vsize = tx_data.get('vsize') or tx_data.get('size')
+    return {
+        'fee_sats': fee_sats,
+        'vsize': vsize,
+        'fee_rate': round(fee_sats / vsize, 2) if vsize else None,
+    }
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Rastreador de fluxo DOG (genealogia) sobre o grafo local de UTXOs
+
+GRAFO (spend_index.py): nós são TXs, arestas são outpoints DOG
+    para frente   TX -> outputs DOG criados (outputs) -> TX que gastou (spends)
+    para trás     TX -> outpoints DOG gastos (spends) -> TX que criou o outpoint
+
+- Início em um outpoint (txid:vout), uma TX (txid) ou um endereço
+- BFS (padrão: nível a nível, duas consultas em lote por nível) ou DFS
+- Podas: profundidade máxima, quantia mínima por aresta e janela de alturas
+- As arestas saem em stream (gerador / JSON lines), sem montar o grafo em
+  memória nem chamar APIs externas. Substitui os traces manuais que
+  geraram os data/merlin_*.json
+
+Uso:
+    python3 dog_flow_tracer.py bc1p... --depth 5 --min-amount 10000
+    python3 dog_flow_tracer.py <txid> --backward --jsonl > trace.jsonl
+    python3 dog_flow_tracer.py <txid>:<vout> --dfs --from-height 840000 --to-height 850000
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set
+
+from dog_record import DOG_FACTOR
+from spend_index import Output, Spend, SpendIndex
+
+DEFAULT_DEPTH = 5
+TXID_PATTERN = re.compile(r'^[0-9a-fA-F]{64}$')
+
+
+class Edge(NamedTuple):
+    depth: int
+    from_txid: str                 # TX que criou o outpoint
+    outpoint: str
+    to_txid: Optional[str]         # TX que gastou (None: ainda não gasto ou fora do índice)
+    address: str                   # Dono do outpoint ('' se o output não está no índice)
+    amount: int                    # DOG (unidades base)
+    created_height: Optional[int]
+    spent_height: Optional[int]
+
+
+class TraceLimits(NamedTuple):
+    max_depth: int = DEFAULT_DEPTH
+    min_amount: int = 0            # unidades base
+    from_height: Optional[int] = None
+    to_height: Optional[int] = None
+
+    def in_window(self, height: Optional[int]) -> bool:
+        """Altura desconhecida não é podada"""
+        if height is None:
+            return True
+        if self.from_height is not None and height < self.from_height:
+            return False
+        return self.to_height is None or height <= self.to_height
+
+
+class FlowTracer:
+    def __init__(self, index: Optional[SpendIndex] = None, limits: TraceLimits = TraceLimits(), forward: bool = True):
+        self.index = index or SpendIndex()
+        self.limits = limits
+        self.forward = forward
+
+    # === Arestas ============================================================
+
+    def _edge(self, depth: int, outpoint: str, output: Optional[Output], spend: Optional[Spend]) -> Edge:
+        return Edge(
+            depth,
+            outpoint.rsplit(':', 1)[0],
+            outpoint,
+            spend.txid if spend else None,
+            output.address if output else '',
+            output.amount if output else spend.amount,
+            output.height if output else None,
+            spend.height if spend else None,
+        )
+
+    def _outpoint_edges(self, depth: int, outpoints: List[str]) -> List[Edge]:
+        outputs = self.index.outputs(outpoints)
+        spends = self.index.spenders(outpoints)
+        return [
+            self._edge(depth, outpoint, outputs.get(outpoint), spends.get(outpoint))
+            for outpoint in outpoints
+            if outpoint in outputs or outpoint in spends
+        ]
+
+    def _step(self, depth: int, txids: List[str]) -> List[Edge]:
+        """Arestas de um nível: outputs criados (frente) ou inputs gastos (trás)"""
+        if self.forward:
+            created = self.index.outputs_of(txids)
+            outpoints = [output.outpoint for txid in txids for output in created.get(txid, [])]
+        else:
+            spent = self.index.inputs_of(txids)
+            outpoints = [outpoint for txid in txids for outpoint in spent.get(txid, {})]
+        return self._outpoint_edges(depth, outpoints)
+
+    def _follow(self, edge: Edge) -> Optional[str]:
+        """Próxima TX a visitar a partir da aresta (None: poda ou fim do grafo)"""
+        if edge.amount < self.limits.min_amount:
+            return None
+        if self.forward:
+            return edge.to_txid if edge.to_txid and self.limits.in_window(edge.spent_height) else None
+        return edge.from_txid if self.limits.in_window(edge.created_height) else None
+
+    def _keep(self, edge: Edge) -> bool:
+        height = edge.created_height if self.forward else edge.spent_height
+        return edge.amount >= self.limits.min_amount and self.limits.in_window(height)
+
+    # === Início =============================================================
+
+    def start_edges(self, start: str) -> List[Edge]:
+        """Outpoints do ponto de partida (outpoint ou endereço) como arestas de profundidade 1"""
+        if ':' in start:
+            return self._outpoint_edges(1, [start])
+        return self._outpoint_edges(1, [output.outpoint for output in self.index.outputs_to(start)])
+
+    def trace(self, start: str, depth_first: bool = False) -> Iterator[Edge]:
+        """Arestas do rastreamento, em stream"""
+        visited: Set[str] = set()
+        if TXID_PATTERN.match(start):
+            frontier, depth = [start], 0
+            visited.add(start)
+        else:
+            frontier, depth = [], 1
+            for edge in self.start_edges(start):
+                if not self._keep(edge):
+                    continue
+                yield edge
+                next_txid = self._follow(edge)
+                if next_txid and next_txid not in visited:
+                    visited.add(next_txid)
+                    frontier.append(next_txid)
+
+        if depth_first:
+            yield from self._dfs(frontier, depth, visited)
+        else:
+            yield from self._bfs(frontier, depth, visited)
+
+    def _bfs(self, frontier: List[str], depth: int, visited: Set[str]) -> Iterator[Edge]:
+        while frontier and depth < self.limits.max_depth:
+            depth += 1
+            next_frontier = []
+            for edge in self._step(depth, frontier):
+                if not self._keep(edge):
+                    continue
+                yield edge
+                next_txid = self._follow(edge)
+                if next_txid and next_txid not in visited:
+                    visited.add(next_txid)
+                    next_frontier.append(next_txid)
+            frontier = next_frontier
+
+    def _dfs(self, frontier: List[str], depth: int, visited: Set[str]) -> Iterator[Edge]:
+        """Profundidade primeiro, guardando a menor profundidade em que cada TX foi alcançada
+
+        Uma TX já expandida é reexpandida se um caminho mais curto a alcança
+        depois (senão a poda de profundidade cortaria ramos que o BFS vê);
+        as arestas dessa subárvore saem de novo, com a profundidade menor.
+        """
+        best: Dict[str, int] = {txid: depth for txid in visited}
+        stack = [(txid, depth) for txid in reversed(frontier)]
+        while stack:
+            txid, depth = stack.pop()
+            if depth >= self.limits.max_depth or best[txid] < depth:
+                continue  # Fora do limite, ou já reenfileirada mais rasa
+            children = []
+            for edge in self._step(depth + 1, [txid]):
+                if not self._keep(edge):
+                    continue
+                yield edge
+                next_txid = self._follow(edge)
+                if next_txid and best.get(next_txid, self.limits.max_depth + 1) > depth + 1:
+                    best[next_txid] = depth + 1
+                    children.append((next_txid, depth + 1))
+            stack.extend(reversed(children))
+
+def main():
+    parser = argparse.ArgumentParser(description='Rastreia o fluxo de DOG a partir de um outpoint, TX ou endereço')
+    parser.add_argument('start', help='txid:vout, txid ou endereço')
+    parser.add_argument('--backward', action='store_true', help='rastreia a origem (padrão: para onde o DOG foi)')
+    parser.add_argument('--dfs', action='store_true', help='busca em profundidade (padrão: BFS)')
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH)
+    parser.add_argument('--min-amount', type=float, default=0, help='DOG mínimo por aresta')
+    parser.add_argument('--from-height', type=int)
+    parser.add_argument('--to-height', type=int)
+    parser.add_argument('--jsonl', action='store_true', help='uma aresta JSON por linha')
+    args = parser.parse_args()
+
+    limits = TraceLimits(args.depth, int(round(args.min_amount * DOG_FACTOR)), args.from_height, args.to_height)
+    tracer = FlowTracer(limits=limits, forward=not args.backward)
+
+    started = time.monotonic()
+    count = 0
+    for edge in tracer.trace(args.start, depth_first=args.dfs):
+        count += 1
+        if args.jsonl:
+            print(json.dumps(edge._asdict()), flush=True)
+        else:
+            print(f"{'  ' * (edge.depth - 1)}[{edge.depth}] {edge.from_txid[:12]}… -> {edge.to_txid[:12] + '…' if edge.to_txid else 'UTXO'} "
+                  f"| {edge.amount / DOG_FACTOR:,.5f} DOG | {edge.address or '?'}")
+
+    print(f"✅ {count:,} arestas em {time.monotonic() - started:.2f}s", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
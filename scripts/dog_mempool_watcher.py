@@ -0,0 +1,379 @@
+#!/usr/bin/env python3
+"""
+⚡ DOG Mempool Watcher - Feed de baixa latência
+Mostra transferências DOG ANTES de serem mineradas
+
+WORKFLOW:
+1. Recebe TXs novas do mempool:
+   - ZMQ `rawtx` (se DOG_ZMQ_RAWTX estiver configurado e pyzmq instalado)
+   - ou diff de `getrawmempool` a cada DOG_MEMPOOL_POLL_SEC segundos
+2. Filtra TXs com output OP_RETURN OP_13 (runestone) e decodifica via ord
+3. Mantém em memória o conjunto de transferências DOG pendentes
+4. Reconciliação periódica:
+   - TX confirmada → move para o store confirmado (dog_transactions.json)
+   - TX substituída (RBF) ou descartada → removida
+   - TX pendente há mais de DOG_MEMPOOL_TTL_HOURS → expirada
+   - Bloco novo → recarrega o snapshot de UTXOs DOG (arquivo passado na linha
+     de comando ou, sem ele, o checkpoint do pipeline daemon)
+5. Publica public/data/dog_mempool.json (pequeno, atualizado a cada poucos segundos;
+   sem mudança, regravado só a cada DOG_MEMPOOL_HEARTBEAT_SEC para renovar o timestamp)
+
+A gravação em dog_transactions.json passa pelo lock de
+DogTxTrackerV3.save_transactions (o pipeline daemon grava o mesmo arquivo).
+
+Uso:
+    python3 scripts/dog_mempool_watcher.py [snapshot_utxos.json]
+
+Autor: DOG Data Team
+"""
+
+import subprocess
+import json
+import os
+import sys
+import time
+import signal
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dog_record import to_dog
+from dog_tx_tracker_v3 import DogTxTrackerV3, has_runestone_output
+from pipeline_checkpoint import PipelineCheckpoint
+from publish_manifest import MANIFEST
+
+try:
+    import zmq
+except ImportError:
+    zmq = None
+
+# Configurações
+ZMQ_RAWTX_ENDPOINT = os.environ.get('DOG_ZMQ_RAWTX')  # ex: tcp://127.0.0.1:28332
+POLL_INTERVAL_SEC = float(os.environ.get('DOG_MEMPOOL_POLL_SEC', '5'))
+RECONCILE_INTERVAL_SEC = float(os.environ.get('DOG_MEMPOOL_RECONCILE_SEC', '30'))
+PUBLISH_INTERVAL_SEC = float(os.environ.get('DOG_MEMPOOL_PUBLISH_SEC', '5'))
+HEARTBEAT_INTERVAL_SEC = float(os.environ.get('DOG_MEMPOOL_HEARTBEAT_SEC', '60'))  # regrava mesmo sem mudança
+PENDING_TTL_SEC = float(os.environ.get('DOG_MEMPOOL_TTL_HOURS', '336')) * 3600  # = -mempoolexpiry padrão
+MAX_NEW_TXS_PER_POLL = int(os.environ.get('DOG_MEMPOOL_MAX_NEW_PER_POLL', '5000'))
+MAX_PUBLISHED = 200
+
+class DogMempoolWatcher:
+    def __init__(self, snapshot_file=None):
+        self.base_dir = Path(__file__).parent.parent
+        self.public_data_dir = self.base_dir / 'public' / 'data'
+        self.output_file = self.public_data_dir / 'dog_mempool.json'
+        self.public_data_dir.mkdir(parents=True, exist_ok=True)
+
+        # Snapshot de UTXOs DOG: arquivo da linha de comando ou checkpoint do daemon
+        self.snapshot_file = Path(snapshot_file) if snapshot_file else None
+        self.checkpoint_file = self.base_dir / 'data' / 'pipeline_checkpoint.bin'
+        self.block_height = None  # bloco em que o snapshot foi carregado
+
+        # Mesma detecção runestone/inputs DOG do tracker de blocos
+        self.tracker = DogTxTrackerV3()
+
+        # Estado em memória
+        self.pending = {}        # txid -> registro DOG pendente
+        self.spent_by = {}       # "txid:vout" gasto -> txid pendente (detecção de RBF)
+        self.checked = set()     # TXs do mempool já inspecionadas (DOG ou não)
+        self.dirty = True
+        self.last_written = 0.0  # time.time() da última gravação de dog_mempool.json
+        self.running = True
+        self.stats = {'seen': 0, 'dog': 0, 'confirmed': 0, 'replaced': 0, 'expired': 0, 'published': 0, 'publish_skipped': 0}
+
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s'
+        )
+        self.logger = logging.getLogger(__name__)
+
+        signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGTERM, self.signal_handler)
+
+    def signal_handler(self, signum, frame):
+        """Handler para parada limpa"""
+        self.logger.info("🛑 Recebido sinal de parada.")
+        self.running = False
+
+    def run_bitcoin_cli(self, *args, timeout=10):
+        """Executa bitcoin-cli e retorna JSON (ou None)"""
+        try:
+            result = subprocess.run(
+                ['bitcoin-cli'] + list(args),
+                capture_output=True,
+                text=True,
+                timeout=timeout
+            )
+            if result.returncode == 0 and result.stdout.strip():
+                return json.loads(result.stdout)
+        except Exception as e:
+            self.logger.debug(f"bitcoin-cli {args[0]} falhou: {e}")
+        return None
+
+    # === Snapshot ===========================================================
+
+    def refresh_snapshot(self):
+        """Recarrega o snapshot de UTXOs DOG quando a chain avança (no lugar)
+
+        O checkpoint do daemon pode ainda estar no bloco anterior: a altura
+        registrada é a do checkpoint, então a próxima reconciliação tenta de novo.
+        """
+        height = self.run_bitcoin_cli('getblockcount')
+        if height is None or height == self.block_height:
+            return False
+
+        address_cache = {}
+        try:
+            if self.snapshot_file:
+                with open(self.snapshot_file, 'r') as f:
+                    dog_utxos = json.load(f)
+            elif self.checkpoint_file.exists():
+                checkpoint = PipelineCheckpoint(self.checkpoint_file)
+                try:
+                    if checkpoint.height == self.block_height:
+                        return False
+                    height = checkpoint.height
+                    dog_utxos, address_cache, _holders = checkpoint.load_state()
+                finally:
+                    checkpoint.close()
+            else:
+                return False
+        except Exception as e:
+            self.logger.warning(f"⚠️ Erro ao recarregar snapshot: {e}")
+            return False
+
+        # Mesmo objeto dict do tracker
+        self.tracker.dog_utxos.clear()
+        self.tracker.dog_utxos.update(dog_utxos)
+        self.tracker.address_cache.update(address_cache)
+        self.block_height = height
+        self.logger.info(f"📸 Snapshot recarregado no bloco {height}: {len(dog_utxos)} UTXOs DOG")
+        return True
+
+    # === Entrada de TXs =====================================================
+
+    def handle_new_tx(self, tx_data):
+        """Aplica a detecção DOG a uma TX recém-chegada ao mempool"""
+        txid = tx_data.get('txid')
+        if not txid or txid in self.checked:
+            return
+        self.checked.add(txid)
+        self.stats['seen'] += 1
+
+        if not has_runestone_output(tx_data):
+            return
+
+        runestone = self.tracker.decode_runestone(txid)
+        if not runestone:
+            return
+
+        record = self.tracker.analyze_dog_transaction(txid, runestone, None, None, tx_data)
+        if not record:
+            return
+
+        now = time.time()
+        record.timestamp = datetime.fromtimestamp(now, tz=timezone.utc).isoformat()
+        record.extra.update(status='pending', source='mempool', first_seen=now)
+
+        # RBF: nova TX gastando os mesmos inputs substitui a pendente anterior
+        for vin in tx_data.get('vin', []):
+            if 'txid' not in vin:
+                continue
+            outpoint = f"{vin['txid']}:{vin['vout']}"
+            previous = self.spent_by.get(outpoint)
+            if previous and previous != txid:
+                self.evict(previous, 'replaced')
+            self.spent_by[outpoint] = txid
+
+        self.pending[txid] = record
+        self.stats['dog'] += 1
+        self.dirty = True
+        self.logger.info(f"⚡ TX DOG no mempool: {txid} | {to_dog(record.total_out):.2f} DOG")
+
+    def poll_mempool(self):
+        """Diff de getrawmempool: inspeciona apenas TXs ainda não vistas"""
+        mempool = self.run_bitcoin_cli('getrawmempool', timeout=30)
+        if mempool is None:
+            return None
+
+        mempool_set = set(mempool)
+        new_txids = [txid for txid in mempool if txid not in self.checked]
+
+        for txid in new_txids[:MAX_NEW_TXS_PER_POLL]:
+            tx_data = self.run_bitcoin_cli('getrawtransaction', txid, 'true')
+            if tx_data:
+                self.handle_new_tx(tx_data)
+
+        # Esquecer TXs que saíram do mempool (mantém `checked` do tamanho do mempool)
+        self.checked &= mempool_set | set(self.pending)
+        return mempool_set
+
+    def handle_zmq_rawtx(self, raw_hex):
+        """Decodifica uma notificação rawtx e aplica a detecção"""
+        tx_data = self.run_bitcoin_cli('decoderawtransaction', raw_hex)
+        if tx_data:
+            self.handle_new_tx(tx_data)
+
+    # === Ciclo de vida das pendentes ========================================
+
+    def evict(self, txid, reason):
+        """Remove uma TX pendente (substituída, descartada ou expirada)"""
+        record = self.pending.pop(txid, None)
+        if not record:
+            return
+        for sender in record.senders:
+            outpoint = sender.input
+            if outpoint and self.spent_by.get(outpoint) == txid:
+                del self.spent_by[outpoint]
+        self.stats[reason] = self.stats.get(reason, 0) + 1
+        self.dirty = True
+        self.logger.info(f"🗑️ TX pendente removida ({reason}): {txid}")
+
+    def confirm(self, txid, tx_data):
+        """Move a TX para o store confirmado com altura/tempo do bloco"""
+        record = self.pending.get(txid)
+        header = self.run_bitcoin_cli('getblockheader', tx_data['blockhash'])
+        if not record or not header:
+            return False
+
+        extra = {k: v for k, v in record.extra.items() if k not in ('status', 'first_seen')}
+        confirmed = record.replace(
+            block_height=header['height'],
+            timestamp=datetime.fromtimestamp(header['time']).isoformat(),
+            extra=extra,
+        )
+
+        if not self.tracker.save_transactions([confirmed], header['height']):
+            return False
+
+        self.evict(txid, 'confirmed')
+        return True
+
+    def reconcile(self, mempool_set=None):
+        """Confirma, remove substituídas/descartadas e expira pendentes"""
+        if mempool_set is None:
+            mempool = self.run_bitcoin_cli('getrawmempool', timeout=30)
+            if mempool is None:
+                return
+            mempool_set = set(mempool)
+            self.checked &= mempool_set | set(self.pending)
+
+        self.refresh_snapshot()
+
+        now = time.time()
+        for txid in list(self.pending):
+            if txid in mempool_set:
+                if now - self.pending[txid].extra['first_seen'] > PENDING_TTL_SEC:
+                    self.evict(txid, 'expired')
+                continue
+
+            tx_data = self.run_bitcoin_cli('getrawtransaction', txid, 'true')
+            if tx_data and tx_data.get('blockhash'):
+                self.confirm(txid, tx_data)
+            else:
+                self.evict(txid, 'replaced')
+
+    # === Publicação =========================================================
+
+    def publish(self):
+        """Grava o conjunto pendente em public/data/dog_mempool.json"""
+        pending = sorted(self.pending.values(), key=lambda tx: tx.extra['first_seen'], reverse=True)
+        transactions = []
+        for record in pending[:MAX_PUBLISHED]:
+            transactions.append({
+                'txid': record.txid,
+                'timestamp': record.timestamp,
+                'senders': [{'address': s.address, 'amount_dog': to_dog(s.amount)} for s in record.senders if s.amount > 0],
+                'receivers': [{'address': r.address, 'amount_dog': to_dog(r.amount)} for r in record.receivers],
+                'total_dog_out': to_dog(record.total_out),
+            })
+
+        output_data = {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'pending_count': len(self.pending),
+            'transactions': transactions,
+        }
+
+        # Escrita atômica (o frontend pode ler a qualquer momento); conjunto
+        # pendente igual ao último publicado não é regravado, exceto no
+        # heartbeat: o timestamp mostra aos consumidores que o feed está vivo
+        heartbeat = time.time() - self.last_written >= HEARTBEAT_INTERVAL_SEC
+        if MANIFEST.write_json(self.output_file, output_data, force=heartbeat):
+            self.last_written = time.time()
+            self.stats['published'] += 1
+        else:
+            self.stats['publish_skipped'] += 1
+        self.dirty = False
+
+    # === Loop principal =====================================================
+
+    def open_zmq_socket(self):
+        """Abre assinatura rawtx se ZMQ estiver disponível"""
+        if not ZMQ_RAWTX_ENDPOINT:
+            return None
+        if zmq is None:
+            self.logger.warning("⚠️ DOG_ZMQ_RAWTX configurado mas pyzmq não instalado. Usando diff de getrawmempool")
+            return None
+
+        context = zmq.Context.instance()
+        socket = context.socket(zmq.SUB)
+        socket.setsockopt(zmq.RCVHWM, 0)
+        socket.setsockopt_string(zmq.SUBSCRIBE, 'rawtx')
+        socket.connect(ZMQ_RAWTX_ENDPOINT)
+        self.logger.info(f"📡 Assinando rawtx em {ZMQ_RAWTX_ENDPOINT}")
+        return socket
+
+    def run(self):
+        """Loop principal"""
+        self.logger.info("⚡ DOG Mempool Watcher iniciado")
+        self.refresh_snapshot()
+        socket = self.open_zmq_socket()
+
+        last_poll = 0
+        last_reconcile = 0
+        last_publish = 0
+
+        while self.running:
+            now = time.time()
+            mempool_set = None
+
+            try:
+                if socket is not None:
+                    # Aguarda notificações até o próximo publish
+                    if socket.poll(timeout=int(PUBLISH_INTERVAL_SEC * 1000)):
+                        while True:
+                            try:
+                                topic, body, _seq = socket.recv_multipart(flags=zmq.NOBLOCK)
+                            except zmq.Again:
+                                break
+                            if topic == b'rawtx':
+                                self.handle_zmq_rawtx(body.hex())
+                elif now - last_poll >= POLL_INTERVAL_SEC:
+                    mempool_set = self.poll_mempool()
+                    last_poll = now
+
+                if now - last_reconcile >= RECONCILE_INTERVAL_SEC:
+                    self.reconcile(mempool_set)
+                    last_reconcile = now
+
+                if self.dirty or now - last_publish >= PUBLISH_INTERVAL_SEC:
+                    self.publish()
+                    last_publish = now
+
+                if socket is None:
+                    time.sleep(1)
+
+            except Exception as e:
+                self.logger.error(f"❌ Erro no loop: {e}")
+                time.sleep(5)
+
+        self.logger.info(f"📊 Estatísticas: {self.stats}")
+
+def main():
+    snapshot_file = sys.argv[1] if len(sys.argv) > 1 else None
+
+    watcher = DogMempoolWatcher(snapshot_file)
+    watcher.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+🧩 DOG Pipeline Daemon - Processo único residente
+Substitui o dog_monitor_24_7.py (que disparava um interpretador Python por
+etapa e passava o snapshot de UTXOs por arquivo JSON temporário)
+
+ETAPAS (todas no mesmo processo, a cada novo bloco):
+1. Tracker  - DogTxTrackerV3 usando o snapshot de UTXOs em memória (bloco N-1)
+2. Fees     - já vêm do tracker (payload do bloco com prevouts); RPC só como fallback
+3. Holders  - novo snapshot `ord balances` (bloco N) + ranking por endereço
+4. Forense  - recalcula só os perfis do airdrop cujo saldo/rank mudou no bloco
+5. Entidades - une os inputs das TXs do bloco (wallet_clusters.py) e grava o
+               ranking por entidade ao lado do ranking por endereço
+
+COMPARTILHADO ENTRE AS ETAPAS:
+- Conexão RPC keep-alive com o Bitcoin Core (bitcoin_rpc.BitcoinRPC)
+- Snapshot de UTXOs DOG (o snapshot pós-bloco N é o pré-bloco N+1)
+- Cache "txid:vout" -> endereço (holders e senders não são resolvidos de novo)
+
+RESTART A QUENTE:
+- A cada bloco o estado (UTXOs, endereços, holders, últimos hashes de bloco)
+  vai para data/pipeline_checkpoint.bin (ver pipeline_checkpoint.py)
+- Bloco cujo snapshot de holders falhou não avança a altura nem o checkpoint
+- No restart o arquivo é mapeado (mmap) e validado contra os hashes do node;
+  só cai no `ord balances` completo se não houver checkpoint válido
+
+Uso:
+    python3 scripts/dog_pipeline_daemon.py
+
+Autor: DOG Data Team
+"""
+
+import subprocess
+import json
+import time
+import signal
+import sys
+import logging
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+import update_holders_and_fees
+from bitcoin_rpc import BitcoinRPC
+from forensic_behavior_analyzer import IncrementalBehaviorAnalysis
+from dog_tx_tracker_v3 import DogTxTrackerV3
+from publish_manifest import MANIFEST
+from pipeline_checkpoint import PipelineCheckpoint, write_checkpoint
+from wallet_clusters import WalletClusters
+
+ORD_DIR = Path("/home/bitmax/Projects/bitcoin-fullstack/ord")
+CHECK_INTERVAL_SEC = 30
+MAX_MISSED_BLOCKS = 10
+CHECKPOINT_BLOCKS = 12  # hashes guardados para detectar reorg no restart
+
+class DogPipelineDaemon:
+    def __init__(self):
+        self.base_dir = Path(__file__).parent.parent
+        self.data_dir = self.base_dir / 'data'
+        self.state_file = self.data_dir / 'monitor_state.json'
+        self.checkpoint_file = self.data_dir / 'pipeline_checkpoint.bin'
+        self.last_block_height = None
+        self.running = True
+
+        # Estado quente compartilhado pelas etapas
+        self.rpc = BitcoinRPC()
+        self.dog_utxos = {}
+        self.address_cache = {}
+        self.holders = []
+        self.forensic = None  # IncrementalBehaviorAnalysis, aberta no primeiro bloco
+        self.clusters = None  # WalletClusters, carregado no primeiro bloco
+        self.block_hashes = deque(maxlen=CHECKPOINT_BLOCKS)
+        self.tracker = DogTxTrackerV3(self.dog_utxos, rpc=self.rpc, address_cache=self.address_cache)
+        update_holders_and_fees.RPC = self.rpc
+
+        (self.data_dir / 'logs').mkdir(parents=True, exist_ok=True)
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler(self.data_dir / 'logs' / 'dog_pipeline_daemon.log'),
+                logging.StreamHandler()
+            ]
+        )
+        self.logger = logging.getLogger(__name__)
+
+        signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGTERM, self.signal_handler)
+
+        self.logger.info("="*80)
+        self.logger.info("🧩 DOG Pipeline Daemon iniciado")
+        self.logger.info(f"   RPC: {'HTTP keep-alive' if self.rpc.uses_http else 'bitcoin-cli'}")
+        self.logger.info("="*80)
+
+        self.load_state()
+
+    def signal_handler(self, signum, frame):
+        """Handler para parada limpa"""
+        self.logger.info("🛑 Recebido sinal de parada. Salvando estado...")
+        self.save_state()
+        self.running = False
+        sys.exit(0)
+
+    def load_state(self):
+        """Carrega estado anterior"""
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r') as f:
+                    state = json.load(f)
+                    self.last_block_height = state.get('last_block_height')
+                    self.logger.info(f"📂 Estado carregado: último bloco processado = {self.last_block_height}")
+            except Exception as e:
+                self.logger.warning(f"⚠️ Erro ao carregar estado: {e}")
+
+    def save_state(self):
+        """Salva estado atual"""
+        try:
+            state = {
+                'last_block_height': self.last_block_height,
+                'last_update': datetime.now().isoformat()
+            }
+            with open(self.state_file, 'w') as f:
+                json.dump(state, f, indent=2)
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao salvar estado: {e}")
+
+    def save_checkpoint(self, block_height):
+        """Checkpoint binário do estado quente na fronteira do bloco"""
+        block_hash = self.rpc.call('getblockhash', block_height, timeout=10)
+        if block_hash:
+            self.block_hashes.append((block_height, block_hash))
+        try:
+            size = write_checkpoint(
+                self.checkpoint_file, block_height, self.dog_utxos,
+                self.address_cache, self.holders, list(self.block_hashes)
+            )
+            self.logger.info(f"💾 Checkpoint gravado: bloco {block_height} ({size / 1024 / 1024:.1f} MB)")
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao gravar checkpoint: {e}")
+
+    def warm_start(self):
+        """Restaura o estado do checkpoint se ele bater com a chain atual"""
+        if not self.checkpoint_file.exists() or self.last_block_height is None:
+            return False
+
+        start_time = time.time()
+        try:
+            checkpoint = PipelineCheckpoint(self.checkpoint_file)
+        except Exception as e:
+            self.logger.warning(f"⚠️ Checkpoint ilegível: {e}")
+            return False
+
+        try:
+            if checkpoint.height != self.last_block_height:
+                self.logger.warning(f"⚠️ Checkpoint no bloco {checkpoint.height}, estado no {self.last_block_height}. Ignorando")
+                return False
+
+            # Reorg: o hash do bloco do checkpoint precisa continuar na chain
+            block_hashes = checkpoint.block_hashes()
+            if block_hashes:
+                height, block_hash = block_hashes[-1]
+                if self.rpc.call('getblockhash', height, timeout=10) != block_hash:
+                    self.logger.warning(f"⚠️ Reorg detectado no bloco {height}. Checkpoint descartado")
+                    return False
+
+            dog_utxos, address_cache, self.holders = checkpoint.load_state()
+            self.dog_utxos.update(dog_utxos)
+            self.address_cache.update(address_cache)
+            self.block_hashes.extend(block_hashes)
+        finally:
+            checkpoint.close()
+
+        elapsed = time.time() - start_time
+        self.logger.info(f"♨️ Restart a quente: {len(self.dog_utxos)} UTXOs, {len(self.address_cache)} endereços, {len(self.holders)} holders em {elapsed:.1f}s")
+        return True
+
+    # === Ord server =========================================================
+
+    def stop_ord_server(self):
+        """Para o ord server (o comando `balances` precisa do índice sem lock)"""
+        subprocess.run(['pkill', '-f', 'ord.*server'], timeout=5)
+        time.sleep(3)
+
+    def start_ord_server(self):
+        """Religa o ord server"""
+        try:
+            subprocess.Popen(
+                ['nohup', 'ord', '--datadir', 'data', '--index-runes', 'server', '--http-port', '8080'],
+                cwd=str(ORD_DIR),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+        except Exception as e:
+            self.logger.error(f"❌ Erro ao religar Ord: {e}")
+
+    # === Etapas =============================================================
+
+    def refresh_snapshot(self):
+        """Troca o snapshot compartilhado pelo estado atual do ord (no lugar)"""
+        self.stop_ord_server()
+        try:
+            dog_runes = update_holders_and_fees.get_dog_runes()
+        finally:
+            self.start_ord_server()
+
+        if not dog_runes:
+            return False
+
+        # Mesmo objeto dict: o tracker enxerga o snapshot novo sem cópia
+        self.dog_utxos.clear()
+        self.dog_utxos.update(dog_runes)
+        self.logger.info(f"📸 Snapshot: {len(self.dog_utxos)} UTXOs DOG")
+        return True
+
+    def stage_track(self, block_height):
+        """Etapa 1: transações DOG do bloco (snapshot em memória = bloco N-1)"""
+        return self.tracker.find_dog_txs_in_block(block_height)
+
+    def stage_fees(self, transactions):
+        """Etapa 2: fees que não vieram do payload do bloco (node sem verbosity 3)"""
+        from_block = sum(1 for tx in transactions if tx.fee_sats)
+        calculated = 0
+        for tx in transactions:
+            if tx.fee_sats:
+                continue
+            fee = update_holders_and_fees.calculate_transaction_fee(tx.txid)
+            if fee:
+                tx.fee_sats = fee
+                calculated += 1
+        self.logger.info(f"💰 Fees: {from_block} do bloco, {calculated} via RPC, {len(transactions) - from_block - calculated} sem fee")
+
+    def stage_holders(self):
+        """Etapa 3: snapshot do bloco N + ranking. Retorna os endereços cujo saldo mudou (None = falha)"""
+        if not self.refresh_snapshot():
+            return None
+        previous = {holder['address']: holder['total_amount'] for holder in self.holders}
+        self.holders = update_holders_and_fees.build_holders(self.dog_utxos, self.address_cache)
+        update_holders_and_fees.save_holders(self.holders, len(self.dog_utxos))
+        self.logger.info(f"👥 {len(self.holders)} holders | cache de endereços: {len(self.address_cache)}")
+
+        # Endereços com saldo diferente do bloco anterior (inclui quem zerou)
+        changed = {holder['address'] for holder in self.holders if previous.pop(holder['address'], None) != holder['total_amount']}
+        changed.update(previous)
+        return changed
+
+    def stage_forensic(self, changed_addresses):
+        """Etapa 4: perfis forenses dos endereços alterados + estatísticas e top lists"""
+        start_time = time.time()
+        try:
+            if self.forensic is None:
+                self.forensic = IncrementalBehaviorAnalysis.open(self.holders)
+                if self.forensic is None:
+                    self.logger.warning("⚠️ Dados do airdrop não encontrados, análise forense desativada")
+                    self.forensic = False
+                    return
+            if not self.forensic:
+                return
+            updated = self.forensic.update(changed_addresses, self.holders)
+            self.logger.info(f"🔬 Forense: {updated} perfis atualizados ({len(changed_addresses)} endereços alterados) em {time.time() - start_time:.1f}s")
+        except Exception as e:
+            self.logger.error(f"❌ Erro na análise forense: {e}")
+
+    def stage_entities(self, transactions, holders_ok=True):
+        """Etapa 5: union-find com os inputs das TXs do bloco + ranking por entidade
+
+        As uniões rodam sempre (senão as TXs do bloco se perdem para o
+        clustering); só a tabela por entidade depende dos holders atualizados.
+        """
+        start_time = time.time()
+        try:
+            if self.clusters is None:
+                self.clusters = WalletClusters()
+            merges = self.clusters.add_transactions(transactions or [])
+            self.clusters.save()
+            if holders_ok:
+                self.clusters.save_entities(self.holders)
+            self.logger.info(f"🔗 Entidades: {merges} uniões ({len(self.clusters.parent)} endereços) em {time.time() - start_time:.1f}s")
+        except Exception as e:
+            self.logger.error(f"❌ Erro na clusterização de carteiras: {e}")
+
+    def process_block(self, block_height):
+        """Processa um bloco completo no mesmo processo"""
+        self.logger.info("="*80)
+        self.logger.info(f"📦 PROCESSANDO BLOCO {block_height}")
+        self.logger.info("="*80)
+
+        start_time = time.time()
+
+        try:
+            transactions = self.stage_track(block_height)
+            if transactions:
+                self.stage_fees(transactions)
+                self.tracker.save_transactions(transactions, block_height)
+
+            changed_addresses = self.stage_holders()
+            if changed_addresses is None:
+                self.logger.warning("⚠️ Falha ao atualizar holders")
+            else:
+                self.stage_forensic(changed_addresses)
+            self.stage_entities(transactions, holders_ok=changed_addresses is not None)
+
+            # Snapshot ainda no bloco N-1: não avança nem grava checkpoint (o
+            # estado ficaria marcado com a altura nova); o bloco é refeito no
+            # próximo ciclo (save de TXs e clusterização são idempotentes)
+            if changed_addresses is None:
+                self.logger.warning(f"⚠️ Bloco {block_height} será reprocessado")
+                return False
+
+            self.last_block_height = block_height
+            self.save_state()
+            self.save_checkpoint(block_height)
+
+            self.logger.info(f"📤 Publicação: {MANIFEST.summary()}")
+            MANIFEST.reset_counts()
+
+            elapsed = time.time() - start_time
+            self.logger.info(f"✅ BLOCO {block_height} PROCESSADO EM {elapsed:.1f}s ({len(transactions)} TXs DOG, {self.rpc.calls} chamadas RPC no total)")
+            return True
+
+        except Exception as e:
+            self.logger.error(f"❌ Erro crítico no bloco {block_height}: {e}")
+            return False
+
+    def run(self):
+        """Loop principal de monitoramento"""
+        current_height = self.rpc.call('getblockcount', timeout=10)
+        if not current_height:
+            self.logger.error("❌ Não foi possível obter altura inicial")
+            return
+
+        # Snapshot inicial: estado antes do próximo bloco a processar
+        if not self.warm_start() and not self.refresh_snapshot():
+            self.logger.error("❌ Falha ao obter snapshot inicial")
+            return
+
+        if self.last_block_height is None:
+            self.last_block_height = current_height
+        elif current_height - self.last_block_height > MAX_MISSED_BLOCKS:
+            self.logger.warning(f"⚠️ Muitos blocos perdidos ({current_height - self.last_block_height}). Pulando para o atual.")
+            self.last_block_height = current_height - 1
+
+        while self.running:
+            try:
+                current_height = self.rpc.call('getblockcount', timeout=10)
+                if current_height and current_height > self.last_block_height:
+                    for block in range(self.last_block_height + 1, current_height + 1):
+                        if not self.process_block(block):
+                            break
+
+                time.sleep(CHECK_INTERVAL_SEC)
+
+            except Exception as e:
+                self.logger.error(f"❌ Erro no loop: {e}")
+                time.sleep(60)
+
+def main():
+    daemon = DogPipelineDaemon()
+    daemon.run()
+
+if __name__ == "__main__":
+    main()
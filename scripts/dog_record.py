@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Registro de transação DOG em ponto fixo (unidades base inteiras)
+
+- Quantias sempre em unidades base (1 DOG = 10^5); totais, troco e
+  net_transfer saem de aritmética inteira, sem arredondamento acumulado
+- amount_dog / total_dog_* (floats) só aparecem em `to_dict()`, na
+  serialização para JSON/Upstash, no mesmo formato de antes
+- Produtores (tracker, monitor, Xverse/Unisat, orquestrador) entregam
+  instâncias de DogTransaction; listas e caches em memória guardam as
+  instâncias e `to_dict()`/`to_compact()` só rodam na gravação.
+  `as_record()` aceita registro, dict da API ou compacto
+- DogTransaction usa __slots__ e as partes são NamedTuples: nenhum
+  __dict__ por registro/parte
+- Formato de armazenamento compacto (schema_version 3), usado em
+  dog_transactions.json e no Upstash: só txid/altura/timestamp, partes
+  como [endereço, quantia, input|vout], fee e campos extras. Sem campos
+  derivados e sem o runestone (fica no runestone_store, por txid).
+  `expand_transaction()` devolve o formato da API (schema_version 2).
+
+Uso:
+    from dog_record import DogTransaction, Party
+    record = DogTransaction(txid, height, timestamp,
+                            senders=[Party(address, 150_000_00000)],
+                            receivers=[Party(address2, 150_000_00000, vout=1)])
+    record.net_transfer   # int
+    record.to_dict()      # dict pronto para JSON (só na gravação)
+    as_record(tx)         # qualquer formato -> DogTransaction
+"""
+
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple, Union
+
+DOG_DIVISIBILITY = 5
+DOG_FACTOR = 10 ** DOG_DIVISIBILITY
+SCHEMA_VERSION = 2  # registros gerados por to_dict(); já normalizados
+COMPACT_VERSION = 3  # formato de armazenamento (to_compact)
+STORAGE_EXCLUDED_FIELDS = {'runestone'}  # decode completo fica no runestone_store
+
+# Campos derivados: recalculados em to_dict(), nunca copiados de `extra`
+DERIVED_FIELDS = {
+    'sender_count', 'receiver_count', 'total_dog_in', 'total_dog_out', 'total_dog_moved',
+    'net_transfer', 'change_amount', 'has_change', 'schema_version',
+}
+
+
+def to_dog(amount: int) -> float:
+    """Unidades base -> DOG (apenas para exibição/serialização)"""
+    return round(amount / DOG_FACTOR, DOG_DIVISIBILITY)
+
+
+def parse_amount(party: Dict[str, Any]) -> int:
+    """Quantia em unidades base a partir de `amount` (int/str) ou `amount_dog` (float)"""
+    amount = party.get('amount')
+    if amount not in (None, ''):
+        try:
+            return int(amount)
+        except (TypeError, ValueError):
+            return int(float(amount))
+    return int(round(float(party.get('amount_dog') or 0) * DOG_FACTOR))
+
+
+class Party(NamedTuple):
+    address: str
+    amount: int
+    input: Optional[str] = None   # 'txid:vout' gasto (senders)
+    vout: Optional[int] = None    # output que recebeu (receivers)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Party':
+        return cls(
+            data.get('address') or '',
+            parse_amount(data),
+            data.get('input') or data.get('utxo'),
+            data.get('vout'),
+        )
+
+
+class DogTransaction:
+    __slots__ = ('txid', 'block_height', 'timestamp', 'senders', 'receivers', 'fee_sats', 'extra')
+
+    def __init__(
+        self,
+        txid: str,
+        block_height: int,
+        timestamp: Optional[str],
+        senders: Iterable[Party] = (),
+        receivers: Iterable[Party] = (),
+        fee_sats: Optional[int] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.txid = txid
+        self.block_height = block_height or 0
+        self.timestamp = timestamp
+        self.senders: Tuple[Party, ...] = tuple(senders)
+        self.receivers: Tuple[Party, ...] = tuple(receivers)
+        self.fee_sats = int(fee_sats) if fee_sats is not None else None
+        self.extra = extra or {}
+
+    # === Totais (inteiros) ==================================================
+
+    @property
+    def source(self) -> Optional[str]:
+        """Origem do registro ('mempool' para TXs ainda não mineradas)"""
+        return self.extra.get('source')
+
+    @property
+    def inputs_estimated(self) -> bool:
+        """Quantias dos senders estimadas (regra Taproot do tracker), não lidas do snapshot"""
+        return bool(self.extra.get('inputs_estimated'))
+
+    @property
+    def sort_key(self) -> Tuple[int, str]:
+        """Ordem cronológica (altura, timestamp)"""
+        return (self.block_height, self.timestamp or '')
+
+    def replace(self, **fields) -> 'DogTransaction':
+        """Cópia com campos trocados (como NamedTuple._replace)"""
+        values = {slot: getattr(self, slot) for slot in self.__slots__}
+        values.update(fields)
+        return DogTransaction(**values)
+
+    @property
+    def sender_addresses(self) -> set:
+        return {party.address for party in self.senders if party.address}
+
+    @property
+    def total_out(self) -> int:
+        return sum(party.amount for party in self.receivers)
+
+    @property
+    def total_in(self) -> int:
+        """Sem quantias nos inputs, vale a regra do protocolo: entrada = saída"""
+        return sum(party.amount for party in self.senders) or self.total_out
+
+    @property
+    def change_amount(self) -> int:
+        senders = self.sender_addresses
+        return sum(party.amount for party in self.receivers if party.address in senders)
+
+    @property
+    def net_transfer(self) -> int:
+        return max(self.total_out - self.change_amount, 0)
+
+    # === Conversão ==========================================================
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DogTransaction':
+        core = {'txid', 'block_height', 'timestamp', 'senders', 'receivers', 'fee_sats'}
+        return cls(
+            data.get('txid'),
+            data.get('block_height') or 0,
+            data.get('timestamp'),
+            [Party.from_dict(item) for item in data.get('senders') or []],
+            [Party.from_dict(item) for item in data.get('receivers') or []],
+            data.get('fee_sats'),
+            {k: v for k, v in data.items() if k not in core and k not in DERIVED_FIELDS},
+        )
+
+    @classmethod
+    def from_compact(cls, data: Dict[str, Any]) -> 'DogTransaction':
+        core = {'txid', 'block_height', 'timestamp', 'senders', 'receivers', 'fee_sats', 'schema_version'}
+        return cls(
+            data.get('txid'),
+            data.get('block_height') or 0,
+            data.get('timestamp'),
+            [Party(item[0], int(item[1]), item[2] if len(item) > 2 else None) for item in data.get('senders') or []],
+            [Party(item[0], int(item[1]), vout=item[2] if len(item) > 2 else None) for item in data.get('receivers') or []],
+            data.get('fee_sats'),
+            {k: v for k, v in data.items() if k not in core},
+        )
+
+    def to_compact(self) -> Dict[str, Any]:
+        """Formato de armazenamento: sem campos derivados, floats nem runestone"""
+        record = {
+            'schema_version': COMPACT_VERSION,
+            'txid': self.txid,
+            'block_height': self.block_height,
+            'timestamp': self.timestamp,
+            'senders': [[p.address, p.amount] + ([p.input] if p.input else []) for p in self.senders],
+            'receivers': [[p.address, p.amount] + ([p.vout] if p.vout is not None else []) for p in self.receivers],
+        }
+        if self.fee_sats is not None:
+            record['fee_sats'] = self.fee_sats
+        record.update((k, v) for k, v in self.extra.items() if k not in STORAGE_EXCLUDED_FIELDS)
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializa no formato da API (floats de exibição calculados aqui)"""
+        sender_addresses = self.sender_addresses
+        senders = []
+        for party in self.senders:
+            item = {'address': party.address, 'amount': party.amount, 'amount_dog': to_dog(party.amount), 'has_dog': party.amount > 0}
+            if party.input:
+                item['input'] = party.input
+            senders.append(item)
+
+        receivers = []
+        change = 0
+        for party in self.receivers:
+            is_change = party.address in sender_addresses
+            if is_change:
+                change += party.amount
+            item = {
+                'address': party.address,
+                'amount': party.amount,
+                'amount_dog': to_dog(party.amount),
+                'has_dog': party.amount > 0,
+                'is_change': is_change,
+            }
+            if party.vout is not None:
+                item['vout'] = party.vout
+            receivers.append(item)
+
+        total_out = self.total_out
+        record = {
+            'txid': self.txid,
+            'block_height': self.block_height,
+            'timestamp': self.timestamp,
+            'senders': senders,
+            'receivers': receivers,
+            'sender_count': len(senders),
+            'receiver_count': len(receivers),
+            'total_dog_in': to_dog(self.total_in),
+            'total_dog_out': to_dog(total_out),
+            'total_dog_moved': to_dog(total_out),
+            'net_transfer': to_dog(max(total_out - change, 0)),
+            'change_amount': to_dog(change),
+            'has_change': change > 0,
+        }
+        if self.fee_sats is not None:
+            record['fee_sats'] = self.fee_sats
+        record.update(self.extra)
+        record['schema_version'] = SCHEMA_VERSION
+        return record
+
+
+# === Armazenamento ===========================================================
+
+TransactionLike = Union[DogTransaction, Dict[str, Any]]
+
+
+def is_compact(tx: Dict[str, Any]) -> bool:
+    return tx.get('schema_version') == COMPACT_VERSION
+
+
+def as_record(tx: TransactionLike) -> DogTransaction:
+    """DogTransaction, dict da API ou compacto -> DogTransaction"""
+    if isinstance(tx, DogTransaction):
+        return tx
+    return DogTransaction.from_compact(tx) if is_compact(tx) else DogTransaction.from_dict(tx)
+
+
+def compact_transaction(tx: TransactionLike) -> Dict[str, Any]:
+    """Registro (qualquer versão) -> formato de armazenamento"""
+    if isinstance(tx, DogTransaction):
+        return tx.to_compact()
+    if is_compact(tx):
+        return tx
+    return DogTransaction.from_dict(tx).to_compact()
+
+
+def expand_transaction(tx: TransactionLike) -> Dict[str, Any]:
+    """Formato de armazenamento (ou registro) -> formato da API; outros dicts passam direto"""
+    if isinstance(tx, DogTransaction):
+        return tx.to_dict()
+    if not is_compact(tx):
+        return tx
+    return DogTransaction.from_compact(tx).to_dict()
+
+
+def expand_payload(payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Expande as transações de um payload ({..., 'transactions': [...]})"""
+    if not payload or not payload.get('transactions'):
+        return payload
+    return {**payload, 'transactions': [expand_transaction(tx) for tx in payload['transactions']]}
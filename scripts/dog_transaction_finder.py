@@ -9,6 +9,17 @@ import sys
 import os
 from datetime import datetime
 
+from spend_index import SpendIndex
+
+_SPEND_INDEX = None
+
+def spend_index():
+    """Índice de gastos compartilhado (aberto na primeira consulta)"""
+    global _SPEND_INDEX
+    if _SPEND_INDEX is None:
+        _SPEND_INDEX = SpendIndex()
+    return _SPEND_INDEX
+
 def get_address_from_utxo(txid, output):
     """Obtém o endereço de um UTXO específico"""
     try:
@@ -75,20 +86,21 @@ def get_input_addresses(tx_data):
     return input_addresses
 
 def check_utxo_had_dog_before_spending(txid, vout):
-    """Verifica se um UTXO tinha DOG antes de ser gasto"""
+    """Verifica se um UTXO tinha DOG antes de ser gasto
+    
+    True se o índice de gastos (spend_index.py) registrou o outpoint como DOG
+    gasto, False se o UTXO ainda não foi gasto, None se não dá para saber
+    (gasto fora da cobertura do índice).
+    """
+    if spend_index().spender(f"{txid}:{vout}"):
+        return True
     try:
-        # Usar ord para verificar se o UTXO tinha DOG
-        # Como o UTXO foi gasto, vamos tentar usar o bitcoin-cli para obter informações
         result = subprocess.run(['bitcoin-cli', 'gettxout', txid, str(vout)], 
                               capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
+        if result.returncode == 0 and result.stdout.strip():
             # Se retornou dados, o UTXO ainda existe (não foi gasto)
             return False
-        
-        # Se não retornou dados, o UTXO foi gasto
-        # Vamos tentar usar o ord para verificar se tinha DOG
-        # Mas como o UTXO foi gasto, isso pode não funcionar
-        return None  # Não conseguimos determinar
+        return None
     except:
         return None
 
@@ -193,22 +205,20 @@ def analyze_transaction(txid, dog_utxos, block_timestamp=None):
     
     for i, vin in enumerate(tx_data['vin']):
         if 'txid' in vin and 'vout' in vin:
-            input_utxo = f"{vin['txid']}:{vin['vout']}"
-            
             # Capturar endereço do input
             input_address = 'unknown'
             if i < len(input_addresses):
                 input_address = input_addresses[i]
             
-            # Verificar se o UTXO tinha DOG antes de ser gasto
-            had_dog_before = check_utxo_had_dog_before_spending(vin['txid'], vin['vout'])
-            has_dog_now = has_dog_utxo(input_utxo, dog_utxos)
-            
-            # Para transações DOG, se há dog_outputs, então alguns inputs devem ter tido DOG
-            # Vamos usar uma lógica mais inteligente: se o UTXO está na lista de dog_utxos,
-            # significa que tinha DOG antes de ser gasto
+            # Se o UTXO está na lista de dog_utxos, tinha DOG antes de ser gasto;
+            # fora do snapshot (bloco antigo reprocessado), o índice de gastos responde
             input_utxo_key = f"{vin['txid']}:{vin['vout']}"
-            had_dog_before = input_utxo_key in dog_utxos
+            dog_amount = dog_utxos[input_utxo_key]['amount'] if has_dog_utxo(input_utxo_key, dog_utxos) else None
+            if dog_amount is None:
+                spend = spend_index().spender(input_utxo_key)
+                if spend and spend.txid == txid:
+                    dog_amount = spend.amount
+            had_dog_before = dog_amount is not None
             
             # Nota: A verificação se a transação tem dog_outputs será feita depois
             
@@ -217,18 +227,18 @@ def analyze_transaction(txid, dog_utxos, block_timestamp=None):
                 'txid': vin['txid'],
                 'vout': vin['vout'],
                 'address': input_address,
-                'has_dog': had_dog_before,  # Usar had_dog_before em vez de has_dog_now
+                'has_dog': had_dog_before,
                 'had_dog_before': had_dog_before,
-                'amount': dog_utxos[input_utxo_key]['amount'] if had_dog_before else 0
+                'amount': dog_amount if had_dog_before else 0
             })
             
             # Se tem DOG, adicionar também ao dog_inputs
-            if has_dog_utxo(input_utxo, dog_utxos):
+            if had_dog_before:
                 dog_inputs.append({
                     'txid': vin['txid'],
                     'vout': vin['vout'],
                     'address': input_address,
-                    'amount': dog_utxos[input_utxo]['amount']
+                    'amount': dog_amount
                 })
     
     # Verificar outputs
@@ -10,7 +10,14 @@ WORKFLOW:
    - Inputs com DOG (valor exato)
    - Inputs SegWit (taxa BTC, 0 DOG)
    - Outputs com DOG
-4. Salva tudo para frontend
+4. Fee, vsize e fee rate saem do próprio bloco (getblock verbosity 3, com prevouts)
+5. Salva tudo para frontend
+6. Atualiza o histórico de saldo por endereço (balance_history.py) e o
+   índice de outpoints DOG gastos (spend_index.py)
+
+Receivers saem de runestone_decoder.allocate() sobre o saldo dos inputs
+(edicts de divisão, pointer e troco incluídos). Sem saldo no snapshot, as
+quantias dos senders são estimadas e a TX fica marcada `inputs_estimated`.
 
 Autor: DOG Data Team
 Data: 01/11/2025
@@ -19,18 +26,57 @@ Data: 01/11/2025
 import subprocess
 import json
 import sys
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
+from balance_history import BalanceHistory
+from bitcoin_rpc import BitcoinRPC
+from dog_fees import fee_from_tx
+from dog_record import DOG_FACTOR, DogTransaction, Party, as_record, compact_transaction, to_dog
+from publish_manifest import MANIFEST, content_digest
+from runestone_decoder import Edict, Runestone, allocate, find_runestone
+from runestone_store import stash_runestones
+from spend_index import SpendIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+DOG_RUNE_ID = '840000:3'
+RUNESTONE_SCRIPT_PREFIX = '6a5d'  # OP_RETURN OP_13
+
+def runestone_from_ord(runestone):
+    """Runestone do `ord decode` (JSON) no formato do runestone_decoder"""
+    edicts = []
+    for edict in runestone.get('edicts', []):
+        block, tx = (int(part) for part in str(edict.get('id', '0:0')).split(':'))
+        edicts.append(Edict((block, tx), int(edict.get('amount', 0)), int(edict.get('output', 0))))
+    return Runestone(edicts, pointer=runestone.get('pointer'))
+
+def has_runestone_output(tx_data):
+    """Indica se a TX tem output OP_RETURN OP_13 (único lugar onde existe runestone)"""
+    for vout in tx_data.get('vout', []):
+        script_hex = vout.get('scriptPubKey', {}).get('hex', '')
+        if script_hex.startswith(RUNESTONE_SCRIPT_PREFIX):
+            return True
+    return False
+
 class DogTxTrackerV3:
-    def __init__(self, dog_utxos_snapshot=None):
+    def __init__(self, dog_utxos_snapshot=None, rpc=None, address_cache=None):
         self.base_dir = Path(__file__).parent.parent
         self.backend_data_dir = self.base_dir / 'backend' / 'data'
         self.public_data_dir = self.base_dir / 'public' / 'data'
         self.transactions_file = self.backend_data_dir / 'dog_transactions.json'
+        self.transactions_lock_file = self.backend_data_dir / 'dog_transactions.json.lock'
         
         # Snapshot de UTXOs DOG (passado pelo monitor)
-        self.dog_utxos = dog_utxos_snapshot or {}
+        self.dog_utxos = dog_utxos_snapshot if dog_utxos_snapshot is not None else {}
+        
+        # Conexão RPC e cache "txid:vout" -> endereço (compartilhados pelo daemon)
+        self.rpc = rpc or BitcoinRPC()
+        self.address_cache = address_cache if address_cache is not None else {}
         
         # Criar diretórios
         self.backend_data_dir.mkdir(parents=True, exist_ok=True)
@@ -38,48 +84,32 @@ class DogTxTrackerV3:
     
     def get_current_block(self):
         """Obtém o bloco atual"""
-        try:
-            result = subprocess.run(
-                ['bitcoin-cli', 'getblockchaininfo'], 
-                capture_output=True, 
-                text=True, 
-                timeout=10
-            )
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
-                return data['blocks']
-        except Exception as e:
-            print(f"❌ Erro ao obter bloco: {e}")
+        data = self.rpc.call('getblockchaininfo', timeout=10)
+        if data:
+            return data['blocks']
+        print("❌ Erro ao obter bloco")
         return None
     
     def get_block_transactions(self, block_height):
-        """Obtém todas as transações de um bloco"""
-        try:
-            result = subprocess.run(
-                ['bitcoin-cli', 'getblockhash', str(block_height)], 
-                capture_output=True, 
-                text=True, 
-                timeout=10
-            )
-            if result.returncode != 0:
-                return [], None
-            
-            block_hash = result.stdout.strip()
-            
-            result = subprocess.run(
-                ['bitcoin-cli', 'getblock', block_hash], 
-                capture_output=True, 
-                text=True, 
-                timeout=30
-            )
-            if result.returncode != 0:
-                return [], None
-            
-            block_data = json.loads(result.stdout)
+        """Obtém todas as transações de um bloco
+        
+        Com verbosity 3 cada TX já vem completa e com prevouts (endereços dos
+        senders e fee sem RPC extra). Node antigo: cai para a lista de txids.
+        """
+        block_hash = self.rpc.call('getblockhash', block_height, timeout=10)
+        if not block_hash:
+            return [], None
+        
+        block_data = self.rpc.call('getblock', block_hash, 3, timeout=60)
+        if block_data:
             return block_data['tx'], block_data['time']
-        except Exception as e:
-            print(f"❌ Erro ao obter TXs: {e}")
+        
+        block_data = self.rpc.call('getblock', block_hash, timeout=30)
+        if not block_data:
+            print("❌ Erro ao obter TXs")
             return [], None
+        
+        return [{'txid': txid} for txid in block_data['tx']], block_data['time']
     
     def decode_runestone(self, txid):
         """Decodifica runestone"""
@@ -104,150 +134,131 @@ class DogTxTrackerV3:
             
             # Verificar se tem DOG
             edicts = runestone.get('edicts', [])
-            has_dog = any(e.get('id') == '840000:3' for e in edicts)
+            has_dog = any(e.get('id') == DOG_RUNE_ID for e in edicts)
             
             return runestone if has_dog else None
             
         except:
             return None
     
-    def get_sender_address(self, prev_txid, prev_vout):
-        """Resolve endereço do sender"""
-        try:
-            result = subprocess.run(
-                ['bitcoin-cli', 'getrawtransaction', prev_txid, 'true'], 
-                capture_output=True, 
-                text=True, 
-                timeout=10
-            )
-            
-            if result.returncode == 0:
-                prev_tx = json.loads(result.stdout)
-                
-                if prev_vout < len(prev_tx['vout']):
-                    script_pubkey = prev_tx['vout'][prev_vout]['scriptPubKey']
-                    address = script_pubkey.get('address', 'unknown')
-                    
-                    if address == 'unknown' and 'type' in script_pubkey:
-                        if script_pubkey['type'] == 'nulldata':
-                            return 'OP_RETURN'
-                        elif script_pubkey['type'] == 'nonstandard':
-                            return 'NONSTANDARD'
-                        else:
-                            return f"UNKNOWN_{script_pubkey['type']}"
-                    
-                    return address
-        except:
+    def address_from_script(self, script_pubkey):
+        """Endereço de um scriptPubKey (ou marcador para scripts sem endereço)"""
+        address = script_pubkey.get('address', 'unknown')
+        
+        if address == 'unknown' and 'type' in script_pubkey:
+            if script_pubkey['type'] == 'nulldata':
+                return 'OP_RETURN'
+            elif script_pubkey['type'] == 'nonstandard':
+                return 'NONSTANDARD'
+            else:
+                return f"UNKNOWN_{script_pubkey['type']}"
+        
+        return address
+    
+    def get_sender_address(self, prev_txid, prev_vout, prevout=None):
+        """Resolve endereço do sender (prevout do bloco > cache > RPC)"""
+        if prevout:
+            return self.address_from_script(prevout.get('scriptPubKey', {}))
+        
+        input_key = f"{prev_txid}:{prev_vout}"
+        if input_key in self.address_cache:
+            return self.address_cache[input_key]
+        
+        prev_tx = self.rpc.call('getrawtransaction', prev_txid, True, timeout=10)
+        if not prev_tx:
             return 'ERROR'
         
+        if prev_vout < len(prev_tx['vout']):
+            return self.address_from_script(prev_tx['vout'][prev_vout]['scriptPubKey'])
+        
         return 'UNKNOWN'
     
-    def analyze_dog_transaction(self, txid, runestone, block_height, block_timestamp):
-        """Analisa transação DOG COMPLETA com valores EXATOS"""
+    def analyze_dog_transaction(self, txid, runestone, block_height, block_timestamp, tx_data=None):
+        """Analisa transação DOG COMPLETA com valores EXATOS
+        
+        `tx_data` (TX do getblock verbosity 3) evita buscar a TX e os prevouts de novo.
+        """
         try:
-            result = subprocess.run(
-                ['bitcoin-cli', 'getrawtransaction', txid, 'true'], 
-                capture_output=True, 
-                text=True, 
-                timeout=10
-            )
-            
-            if result.returncode != 0:
+            if not tx_data or 'vin' not in tx_data:
+                tx_data = self.rpc.call('getrawtransaction', txid, True, timeout=10)
+            if not tx_data:
                 return None
             
-            tx_data = json.loads(result.stdout)
-            
-            # INPUTS - com valores EXATOS do snapshot
+            # INPUTS - com valores EXATOS do snapshot (unidades base, inteiros)
             senders = []
-            total_dog_in = 0
             
             for vin in tx_data.get('vin', []):
                 if 'coinbase' in vin:
                     continue
                 
                 if 'txid' in vin and 'vout' in vin:
-                    sender_address = self.get_sender_address(vin['txid'], vin['vout'])
+                    sender_address = self.get_sender_address(vin['txid'], vin['vout'], vin.get('prevout'))
                     input_utxo_key = f"{vin['txid']}:{vin['vout']}"
                     
                     # Buscar no snapshot de UTXOs
-                    input_dog_amount = 0
-                    has_dog = False
-                    
-                    if input_utxo_key in self.dog_utxos:
-                        input_dog_amount = self.dog_utxos[input_utxo_key]['amount']
-                        has_dog = True
-                        total_dog_in += input_dog_amount
-                    
-                    senders.append({
-                        'address': sender_address,
-                        'input': input_utxo_key,
-                        'amount': input_dog_amount,
-                        'amount_dog': input_dog_amount / 100000,
-                        'has_dog': has_dog
-                    })
-            
-            # OUTPUTS - do runestone
-            receivers = []
-            total_dog_out = 0
-            edicts = runestone.get('edicts', [])
+                    utxo = self.dog_utxos.get(input_utxo_key)
+                    senders.append(Party(sender_address, int(utxo['amount']) if utxo else 0, input=input_utxo_key))
             
-            for edict in edicts:
-                if edict.get('id') == '840000:3':  # DOG
-                    output_num = edict.get('output', 0)
-                    amount = edict.get('amount', 0)
-                    
-                    if output_num < len(tx_data['vout']):
-                        receiver_address = tx_data['vout'][output_num]['scriptPubKey'].get('address', 'UNKNOWN')
-                        receivers.append({
-                            'address': receiver_address,
-                            'vout': output_num,
-                            'amount': amount,
-                            'amount_dog': amount / 100000
-                        })
-                        total_dog_out += amount
+            # OUTPUTS - edicts aplicados ao saldo de entrada (runestone_decoder.allocate):
+            # cobre edicts de divisão (output == nº de outputs) e o troco que vai
+            # para o pointer ou para o primeiro output não OP_RETURN
+            total_dog_in = sum(sender.amount for sender in senders)
+            vouts = tx_data.get('vout', [])
+            scripts = [vout.get('scriptPubKey', {}).get('hex', '') for vout in vouts]
+            allocation = allocate(
+                find_runestone(scripts) or runestone_from_ord(runestone),
+                scripts,
+                total_dog_in if total_dog_in > 0 else None,
+            )
+            receivers = [
+                Party(vouts[output_num]['scriptPubKey'].get('address', 'UNKNOWN'), amount, vout=output_num)
+                for output_num, amount in sorted(allocation.outputs.items())
+            ]
+            total_dog_out = sum(receiver.amount for receiver in receivers)
+            inputs_estimated = False
             
             # CORREÇÃO: Aplicar REGRA DO PROTOCOLO RUNES
             # Input runes = Output runes (protocolo garante!)
             # Se não detectamos valores nos inputs, é porque snapshot foi após processamento
+            # (aí só os edicts explícitos têm quantia conhecida)
             if total_dog_in == 0 and total_dog_out > 0:
                 # Identificar inputs TAPROOT (bc1p*) - esses carregam runes
                 # Inputs SegWit (bc1q*) geralmente são taxa BTC
-                taproot_inputs = [s for s in senders if s['address'].startswith('bc1p')]
+                taproot_indexes = [i for i, s in enumerate(senders) if s.address.startswith('bc1p')]
                 
-                if len(taproot_inputs) > 0:
+                if len(taproot_indexes) > 0:
                     # REGRA DO PROTOCOLO: Total IN = Total OUT
-                    # Distribuir igualmente entre inputs Taproot
-                    dog_per_input = total_dog_out / len(taproot_inputs)
+                    # Distribuir igualmente (divisão inteira; resto no primeiro input Taproot)
+                    # SegWit permanece com 0 DOG (taxa BTC)
+                    share, remainder = divmod(total_dog_out, len(taproot_indexes))
+                    for position, index in enumerate(taproot_indexes):
+                        senders[index] = senders[index]._replace(amount=share + (remainder if position == 0 else 0))
+                    inputs_estimated = True  # Estimativa: fica fora do spend_index
                     
-                    for sender in senders:
-                        if sender['address'].startswith('bc1p'):
-                            sender['amount'] = int(dog_per_input * 100000)
-                            sender['amount_dog'] = dog_per_input
-                            sender['has_dog'] = True
-                        # SegWit permanece com 0 DOG (taxa BTC)
-                    
-                    total_dog_in = total_dog_out
-                    print(f"   🔧 Aplicada regra do protocolo: {total_dog_out / 100000:.2f} DOG distribuído entre {len(taproot_inputs)} inputs Taproot")
+                    print(f"   🔧 Aplicada regra do protocolo: {total_dog_out / DOG_FACTOR:.2f} DOG distribuído entre {len(taproot_indexes)} inputs Taproot")
             
             # Determinar tipo (DOG NUNCA tem mint!)
             tx_type = 'transfer'
             if len(receivers) == 0:
                 tx_type = 'burn'
             
-            return {
-                'txid': txid,
-                'block_height': block_height,
-                'timestamp': datetime.fromtimestamp(block_timestamp).isoformat() if block_timestamp else None,
-                'type': tx_type,
-                'senders': senders,
-                'receivers': receivers,
-                'total_dog_moved': total_dog_out / 100000,
-                'total_dog_in': total_dog_in / 100000,
-                'total_dog_out': total_dog_out / 100000,
-                'sender_count': len(senders),
-                'receiver_count': len(receivers),
-                'runestone': runestone
-            }
+            # Fee na ingestão (prevouts já vieram no payload do bloco)
+            fee = fee_from_tx(tx_data) or {}
+            extra = {'type': tx_type, 'runestone': runestone}
+            if inputs_estimated:
+                extra['inputs_estimated'] = True
+            extra.update((k, v) for k, v in fee.items() if k != 'fee_sats')
+            
+            # DogTransaction até a gravação (to_compact só em save_transactions)
+            return DogTransaction(
+                txid,
+                block_height,
+                datetime.fromtimestamp(block_timestamp).isoformat() if block_timestamp else None,
+                senders,
+                receivers,
+                fee_sats=fee.get('fee_sats'),
+                extra=extra,
+            )
             
         except Exception as e:
             print(f"⚠️ Erro ao analisar TX {txid}: {e}")
@@ -264,22 +275,27 @@ class DogTxTrackerV3:
         print(f"📊 Snapshot tem {len(self.dog_utxos)} UTXOs DOG")
         
         # Obter TXs do bloco
-        txids, block_timestamp = self.get_block_transactions(block_height)
-        if not txids:
+        block_txs, block_timestamp = self.get_block_transactions(block_height)
+        if not block_txs:
             print("❌ Não foi possível obter TXs")
             return []
         
-        print(f"📦 Bloco tem {len(txids)} transações")
+        print(f"📦 Bloco tem {len(block_txs)} transações")
         
         # Analisar cada TX
         dog_transactions = []
         processed = 0
         
-        for txid in txids:
+        for tx_data in block_txs:
+            txid = tx_data['txid']
             processed += 1
             
             if processed % 500 == 0:
-                print(f"⏳ Processadas {processed}/{len(txids)} TXs...")
+                print(f"⏳ Processadas {processed}/{len(block_txs)} TXs...")
+            
+            # Sem OP_RETURN OP_13 não há runestone: nem chama o ord
+            if 'vout' in tx_data and not has_runestone_output(tx_data):
+                continue
             
             # Decodificar
             runestone = self.decode_runestone(txid)
@@ -287,63 +303,98 @@ class DogTxTrackerV3:
                 continue
             
             # Tem DOG! Analisar
-            dog_tx = self.analyze_dog_transaction(txid, runestone, block_height, block_timestamp)
+            dog_tx = self.analyze_dog_transaction(txid, runestone, block_height, block_timestamp, tx_data)
             
             if dog_tx:
                 dog_transactions.append(dog_tx)
                 print(f"🎯 TX DOG: {txid}")
-                print(f"   IN: {dog_tx['total_dog_in']:.2f} | OUT: {dog_tx['total_dog_out']:.2f}")
-                print(f"   {dog_tx['sender_count']} senders → {dog_tx['receiver_count']} receivers")
+                print(f"   IN: {to_dog(dog_tx.total_in):.2f} | OUT: {to_dog(dog_tx.total_out):.2f}")
+                print(f"   {len(dog_tx.senders)} senders → {len(dog_tx.receivers)} receivers")
         
         print(f"\n✅ Encontradas {len(dog_transactions)} transações DOG")
         return dog_transactions
     
-    def load_existing_transactions(self):
-        """Carrega transações existentes"""
+    def load_existing_data(self):
+        """Conteúdo atual de dog_transactions.json ({} se ausente ou ilegível)"""
         if self.transactions_file.exists():
             try:
                 with open(self.transactions_file, 'r') as f:
-                    data = json.load(f)
-                    return data.get('transactions', [])
+                    return json.load(f)
             except:
                 pass
-        return []
+        return {}
+    
+    def load_existing_transactions(self):
+        """Carrega transações existentes (como DogTransaction)"""
+        return [as_record(tx) for tx in self.load_existing_data().get('transactions', [])]
+    
+    @contextmanager
+    def transactions_lock(self):
+        """Lock exclusivo (entre processos) para ler-mesclar-gravar dog_transactions.json"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.transactions_lock_file, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
     
     def save_transactions(self, new_transactions, block_height):
         """Salva transações"""
         try:
-            existing = self.load_existing_transactions()
+            new_transactions = [as_record(tx) for tx in new_transactions]
             
-            # Adicionar novas
-            existing_txids = {tx['txid'] for tx in existing}
-            for tx in new_transactions:
-                if tx['txid'] not in existing_txids:
-                    existing.append(tx)
+            # Daemon e mempool watcher gravam o mesmo arquivo: ler → mesclar → gravar
+            # sob lock, senão um sobrescreve as TXs que o outro acabou de salvar
+            with self.transactions_lock():
+                existing_data = self.load_existing_data()
+                existing = [as_record(tx) for tx in existing_data.get('transactions', [])]
             
-            # Ordenar
-            existing.sort(
-                key=lambda x: (x['block_height'], x['timestamp'] or ''),
-                reverse=True
-            )
+                # Adicionar novas (registros vindos do mempool são substituídos pela versão do bloco)
+                existing_by_txid = {tx.txid: index for index, tx in enumerate(existing)}
+                for tx in new_transactions:
+                    index = existing_by_txid.get(tx.txid)
+                    if index is None:
+                        existing_by_txid[tx.txid] = len(existing)
+                        existing.append(tx)
+                    elif existing[index].source == 'mempool' and tx.source != 'mempool':
+                        existing[index] = tx
+            
+                # Ordenar
+                existing.sort(key=lambda tx: tx.sort_key, reverse=True)
             
-            # Salvar
-            output_data = {
-                'timestamp': datetime.now().isoformat(),
-                'total_transactions': len(existing),
-                'last_block': block_height,
-                'last_update': datetime.now().isoformat(),
-                'transactions': existing
-            }
+                # Runestones vão para o store lateral; o arquivo guarda o formato compacto
+                stash_runestones(new_transactions)
             
-            with open(self.transactions_file, 'w') as f:
-                json.dump(output_data, f, indent=2)
+                # Salvar
+                output_data = {
+                    'timestamp': datetime.now().isoformat(),
+                    'total_transactions': len(existing),
+                    'last_block': max(block_height, existing_data.get('last_block') or 0),  # nunca retrocede
+                    'last_update': datetime.now().isoformat(),
+                    'transactions': [compact_transaction(tx) for tx in existing]
+                }
             
-            # Copiar para public
-            public_file = self.public_data_dir / 'dog_transactions.json'
-            with open(public_file, 'w') as f:
-                json.dump(output_data, f, indent=2)
+                # Salvar (e copiar para public) só se o conteúdo mudou
+                digest = content_digest(output_data)
+                written = 0
+                for path in (self.transactions_file, self.public_data_dir / 'dog_transactions.json'):
+                    if MANIFEST.write_json(path, output_data, digest=digest, indent=2):
+                        written += 1
             
-            print(f"💾 Salvas {len(existing)} transações totais ({len(new_transactions)} novas)")
+            if written:
+                print(f"💾 Salvas {len(existing)} transações totais ({len(new_transactions)} novas)")
+            else:
+                print(f"⏭️ Transações inalteradas ({len(existing)} totais), arquivos não regravados")
+            
+            # Índices locais: histórico de saldo por endereço e outpoints DOG gastos
+            try:
+                BalanceHistory().apply_transactions(new_transactions)
+                SpendIndex().record_transactions(new_transactions)
+            except Exception as e:
+                print(f"⚠️ Erro ao atualizar índices locais: {e}")
             return True
             
         except Exception as e:
@@ -4,13 +4,14 @@ Extrator COMPLETO do Airdrop DOG
 Usa Bitcoin Core local para escanear blocos do período do airdrop
 """
 
-import subprocess
 import json
 from collections import defaultdict
 from datetime import datetime
 
+from airdrop_scanner import DISTRIBUTOR_ADDRESS, distributor_script, is_distributor_tx
+from bitcoin_rpc import BitcoinRPC
+
 # Configurações
-DISTRIBUTOR_ADDRESS = "bc1pry0ne0yf5pkgqsszmytmqkpzs4aflhr8tfptz9sydqrhxexgujcqqler2t"
 # Blocos onde o airdrop realmente aconteceu (verificado nos dados)
 AIRDROP_BLOCKS = [840654, 840655, 840656, 840657, 840658, 850677, 858368]
 OUTPUT_FILE = "../data/airdrop_recipients.json"
@@ -47,56 +48,29 @@ distributor_txs_found = 0
 
 print("\n🔍 Escaneando blockchain...")
 
+# scriptPubKey do distribuidor calculado uma vez; os inputs de cada TX são
+# comparados com os prevouts que já vêm no bloco (getblock verbosity 3)
+rpc = BitcoinRPC()
+DISTRIBUTOR_SCRIPT = distributor_script(rpc)
+
 for block_height in AIRDROP_BLOCKS:
     try:
         # Obter hash do bloco
-        cmd_hash = ['bitcoin-cli', 'getblockhash', str(block_height)]
-        result_hash = subprocess.run(cmd_hash, capture_output=True, text=True, timeout=10)
-        if result_hash.returncode != 0:
+        block_hash = rpc.call('getblockhash', block_height, timeout=10)
+        if not block_hash:
             continue
         
-        block_hash = result_hash.stdout.strip()
-        
-        # Obter bloco completo com transações
-        cmd_block = ['bitcoin-cli', 'getblock', block_hash, '2']  # verbosity 2 = com TXs
-        result_block = subprocess.run(cmd_block, capture_output=True, text=True, timeout=30)
-        if result_block.returncode != 0:
+        # Bloco completo com TXs e prevouts (verbosity 3)
+        block = rpc.call('getblock', block_hash, 3, timeout=120)
+        if not block:
             continue
         
-        block = json.loads(result_block.stdout)
         block_time = block.get('time')
         
         # Processar transações do bloco
         for tx in block.get('tx', []):
-            # Verificar se o distribuidor está nos inputs
-            has_distributor_input = False
-            for vin in tx.get('vin', []):
-                if 'coinbase' in vin:
-                    continue
-                    
-                # Obter TX anterior para ver o scriptPubKey
-                prev_txid = vin.get('txid')
-                prev_vout = vin.get('vout')
-                
-                if not prev_txid:
-                    continue
-                
-                try:
-                    cmd_prev = ['bitcoin-cli', 'getrawtransaction', prev_txid, '1']
-                    result_prev = subprocess.run(cmd_prev, capture_output=True, text=True, timeout=10)
-                    if result_prev.returncode == 0:
-                        prev_tx = json.loads(result_prev.stdout)
-                        prev_output = prev_tx.get('vout', [])[prev_vout]
-                        addresses = prev_output.get('scriptPubKey', {}).get('addresses', [])
-                        address = prev_output.get('scriptPubKey', {}).get('address')
-                        
-                        if address == DISTRIBUTOR_ADDRESS or DISTRIBUTOR_ADDRESS in addresses:
-                            has_distributor_input = True
-                            break
-                except:
-                    pass
-            
-            if not has_distributor_input:
+            # Uma checagem por TX: algum input gasta output do distribuidor?
+            if not is_distributor_tx(rpc, tx, DISTRIBUTOR_SCRIPT):
                 continue
             
             # Esta TX foi enviada pelo distribuidor!
@@ -151,6 +125,7 @@ print(f"   Blocos processados: {blocks_processed:,}")
 print(f"   TXs do distribuidor: {distributor_txs_found:,}")
 print(f"   Total de outputs: {total_outputs:,}")
 print(f"   Recipients únicos: {len(recipients):,}")
+print(f"   Chamadas RPC: {rpc.calls:,}")
 
 # Preparar para salvar
 recipients_list = []
@@ -7,91 +7,47 @@ import subprocess
 import json
 import sys
 
+from airdrop_scanner import load_recipients, scan_range
+
 AIRDROP_RECIPIENTS_FILE = "../data/airdrop_recipients.json"
 OUTPUT_FILE = "../data/airdrop_recipients_complete.json"
 AIRDROP_AMOUNT = 889806
 TARGET_UTXOS = 112384
+START_BLOCK = 840650
+END_BLOCK = 840999
 
 print("=" * 80)
 print("🎯 EXTRATOR COMPLETO - META: 112,384 UTXOs")
 print("=" * 80)
 
-# Carregar recipients
+# Carregar recipients (frozenset compartilhado com os workers do scanner)
 print("\n📂 Carregando recipients...")
-with open(AIRDROP_RECIPIENTS_FILE, 'r') as f:
-    data = json.load(f)
-    recipients_list = data['recipients']
-
-recipients_map = {r['address']: {'receive_count': 0, 'txs': []} for r in recipients_list}
+recipients = load_recipients(AIRDROP_RECIPIENTS_FILE)
 
-print(f"✅ {len(recipients_list):,} recipients carregados")
+print(f"✅ {len(recipients):,} recipients carregados")
 
-# Expandir busca gradualmente
 print(f"\n📋 ESTRATÉGIA:")
-print(f"   Range expandido: blocos 840650 a 841000 (350 blocos)")
+print(f"   Range expandido: blocos {START_BLOCK} a {END_BLOCK} ({END_BLOCK - START_BLOCK + 1} blocos)")
+print(f"   Scan paralelo por shards (airdrop_scanner.py)")
 print(f"   Meta: {TARGET_UTXOS:,} UTXOs")
 
 print(f"\n🚀 Escaneando...\n", flush=True)
 
-total_outputs = 0
-blocks_processed = 0
-blocks_with_data = []
-
-for block_height in range(840650, 841000):
-    try:
-        cmd_hash = ['bitcoin-cli', 'getblockhash', str(block_height)]
-        result = subprocess.run(cmd_hash, capture_output=True, text=True, timeout=10)
-        if result.returncode != 0:
-            continue
-        
-        block_hash = result.stdout.strip()
-        
-        cmd_block = ['bitcoin-cli', 'getblock', block_hash, '2']
-        result = subprocess.run(cmd_block, capture_output=True, text=True, timeout=30)
-        if result.returncode != 0:
-            continue
-        
-        block = json.loads(result.stdout)
-        outputs_in_block = 0
-        
-        for tx in block.get('tx', []):
-            txid = tx['txid']
-            for vout in tx.get('vout', []):
-                script_pub_key = vout.get('scriptPubKey', {})
-                recipient_addr = script_pub_key.get('address')
-                addresses = script_pub_key.get('addresses', [])
-                
-                if not recipient_addr and addresses:
-                    recipient_addr = addresses[0]
-                
-                if recipient_addr in recipients_map:
-                    recipients_map[recipient_addr]['receive_count'] += 1
-                    recipients_map[recipient_addr]['txs'].append({
-                        'tx': txid,
-                        'block': block_height,
-                        'vout': vout.get('n')
-                    })
-                    outputs_in_block += 1
-                    total_outputs += 1
-        
-        if outputs_in_block > 0:
-            blocks_with_data.append(block_height)
-            print(f"   📦 Bloco {block_height}: {outputs_in_block} outputs | Total: {total_outputs:,}", flush=True)
-        
-        blocks_processed += 1
-        
-        # Parar se atingir a meta
-        if total_outputs >= TARGET_UTXOS:
-            print(f"\n🎯 META ATINGIDA! {total_outputs:,} outputs encontrados!", flush=True)
-            break
-        
-    except Exception as e:
-        continue
+matches, stats = scan_range(START_BLOCK, END_BLOCK, recipients)
+recipients_map = {
+    addr: {
+        'receive_count': len(matches.get(addr, [])),
+        'txs': [{'tx': txid, 'block': block, 'vout': vout} for txid, block, vout, *_ in matches.get(addr, [])],
+    }
+    for addr in recipients
+}
+total_outputs = stats['outputs']
+blocks_with_data = sorted({block for found in matches.values() for _txid, block, *_ in found})
 
 print(f"\n{'='*80}")
 print(f"📊 SCAN COMPLETO!")
 print(f"{'='*80}")
-print(f"   Blocos escaneados: {blocks_processed}")
+print(f"   Blocos escaneados: {stats['blocks']} ({stats['blocks_per_sec'] or '-'} blocos/s)")
 print(f"   Blocos com dados: {len(blocks_with_data)}")
 print(f"   Outputs encontrados: {total_outputs:,}")
 print(f"   Meta: {TARGET_UTXOS:,}")
@@ -5,12 +5,12 @@ Estratégia: Para cada recipient, analisar SUAS transações no período do aird
 e contar quantos outputs de ~889,806 DOG recebeu
 """
 
-import requests
 import json
-import time
 import sys
 from datetime import datetime
 
+from address_index import AddressIndex
+
 # Forçar flush de output para monitoramento em tempo real
 sys.stdout.flush()
 sys.stderr.flush()
@@ -36,116 +36,54 @@ with open(AIRDROP_RECIPIENTS_FILE, 'r') as f:
 print(f"✅ {len(recipients_list):,} recipients carregados")
 
 print(f"\n📋 ESTRATÉGIA:")
-print(f"   1. Para cada recipient, buscar SUAS transações via API")
-print(f"   2. Filtrar apenas TXs dos blocos do airdrop: {AIRDROP_BLOCKS}")
-print(f"   3. Para cada TX, contar outputs de ~{AIRDROP_AMOUNT:,} DOG para esse recipient")
+print(f"   1. Indexar localmente os blocos do airdrop: {AIRDROP_BLOCKS} (address_index.py)")
+print(f"   2. Consultar os outputs de todos os recipients numa única busca no índice")
+print(f"   3. Cada output para o recipient nesses blocos = 1 airdrop de ~{AIRDROP_AMOUNT:,} DOG")
 print(f"   4. Soma = total de airdrops que o recipient recebeu")
 
-print(f"\n⏱️  Estimativa: ~2-3 horas (fazendo 5 req/seg com rate limiting)", flush=True)
 print("🚀 Iniciando extração...", flush=True)
 
+index = AddressIndex()
+index.build_heights(AIRDROP_BLOCKS)
+
+print("\n🔍 Consultando o índice...", flush=True)
+received = index.outputs_for(
+    [r['address'] for r in recipients_list],
+    min(AIRDROP_BLOCKS),
+    max(AIRDROP_BLOCKS),
+    distributor_only=False,
+)
+
 updated_recipients = []
 total_airdrops_found = 0
 multi_airdrop_recipients = []
-processed = 0
-errors = 0
-
-print("\n🔍 Processando recipients...", flush=True)
-print("   (Progresso a cada 100)\n", flush=True)
 
 for recipient in recipients_list:
     addr = recipient['address']
     
-    try:
-        # Buscar TXs do recipient via Blockstream API
-        url = f"https://blockstream.info/api/address/{addr}/txs"
-        response_api = requests.get(url, timeout=30)
-        
-        if response_api.status_code != 200:
-            # Manter dados existentes se falhar
-            updated_recipients.append({
-                'address': addr,
-                'receive_count': recipient.get('receive_count', 1),
-                'airdrop_amount': recipient.get('receive_count', 1) * AIRDROP_AMOUNT,
-                'extraction_status': 'api_error'
-            })
-            errors += 1
-            processed += 1
-            continue
-        
-        txs = response_api.json()
-        
-        # Contar UTXOs de airdrop recebidos
-        airdrop_utxos_received = 0
-        airdrop_txs_detail = []
-        
-        for tx in txs:
-            # Filtrar apenas TXs dos blocos do airdrop
-            block_height = tx.get('status', {}).get('block_height')
-            if block_height not in AIRDROP_BLOCKS:
-                continue
-            
-            # Analisar outputs para este recipient
-            for vout in tx.get('vout', []):
-                vout_addr = vout.get('scriptpubkey_address')
-                if vout_addr != addr:
-                    continue
-                
-                # Verificar o valor em satoshis
-                # Para runes, precisamos verificar via Ord ou assumir padrão
-                # Por enquanto, vamos contar TODOS os outputs para este recipient
-                # nos blocos do airdrop, pois cada output = 1 airdrop
-                
-                airdrop_utxos_received += 1
-                airdrop_txs_detail.append({
-                    'tx': tx['txid'],
-                    'block': block_height,
-                    'vout': vout.get('n')
-                })
-        
-        # Atualizar recipient com dados exatos
-        updated_recipient = {
-            'address': addr,
-            'receive_count': airdrop_utxos_received,
-            'airdrop_amount': airdrop_utxos_received * AIRDROP_AMOUNT,
-            'airdrop_txs': airdrop_txs_detail,
-            'extraction_status': 'success'
-        }
-        
-        updated_recipients.append(updated_recipient)
-        total_airdrops_found += airdrop_utxos_received
-        
-        if airdrop_utxos_received > 1:
-            multi_airdrop_recipients.append(updated_recipient)
-        
-        processed += 1
-        
-        # Progresso
-        if processed % 100 == 0:
-            multi_count = len(multi_airdrop_recipients)
-            print(f"   ⏳ {processed:,}/{len(recipients_list):,} | "
-                  f"Airdrops: {total_airdrops_found:,} | "
-                  f"Multi: {multi_count:,} | "
-                  f"Erros: {errors}", flush=True)
-        
-        # Rate limiting: 5 req/seg
-        time.sleep(0.2)
-        
-    except KeyboardInterrupt:
-        print("\n⚠️  Interrompido pelo usuário!")
-        print(f"   Processados até agora: {processed:,}")
-        break
-    except Exception as e:
-        print(f"   ⚠️  Erro no {addr[:20]}...: {e}")
-        updated_recipients.append({
-            'address': addr,
-            'receive_count': recipient.get('receive_count', 1),
-            'airdrop_amount': recipient.get('receive_count', 1) * AIRDROP_AMOUNT,
-            'extraction_status': 'exception'
-        })
-        errors += 1
-        processed += 1
-        time.sleep(1)
+    # Contar outputs recebidos nos blocos do airdrop (cada output = 1 airdrop)
+    airdrop_txs_detail = [
+        {'tx': txid, 'block': block_height, 'vout': vout}
+        for block_height, txid, vout, _value in received.get(addr, [])
+        if block_height in AIRDROP_BLOCKS
+    ]
+    airdrop_utxos_received = len(airdrop_txs_detail)
+    
+    updated_recipient = {
+        'address': addr,
+        'receive_count': airdrop_utxos_received,
+        'airdrop_amount': airdrop_utxos_received * AIRDROP_AMOUNT,
+        'airdrop_txs': airdrop_txs_detail,
+        'extraction_status': 'success'
+    }
+    
+    updated_recipients.append(updated_recipient)
+    total_airdrops_found += airdrop_utxos_received
+    
+    if airdrop_utxos_received > 1:
+        multi_airdrop_recipients.append(updated_recipient)
+
+processed = len(updated_recipients)
 
 print(f"\n✅ Processamento completo!")
 print(f"\n📊 RESULTADOS FINAIS:")
@@ -153,7 +91,6 @@ print(f"   Recipients processados: {processed:,}")
 print(f"   Total de airdrops contabilizados: {total_airdrops_found:,}")
 print(f"   Recipients com múltiplos airdrops: {len(multi_airdrop_recipients):,}")
 print(f"   Percentual com múltiplos: {len(multi_airdrop_recipients)/len(updated_recipients)*100:.2f}%")
-print(f"   Erros: {errors}")
 
 # Reordenar por receive_count
 updated_recipients.sort(key=lambda x: x['receive_count'], reverse=True)
@@ -163,13 +100,12 @@ for i, r in enumerate(updated_recipients, 1):
 # Salvar
 output_data = {
     'timestamp': datetime.now().isoformat(),
-    'extraction_method': 'recipient_tx_analysis_exact',
+    'extraction_method': 'local_address_index_exact',
     'airdrop_blocks': AIRDROP_BLOCKS,
     'airdrop_amount_per_utxo': AIRDROP_AMOUNT,
     'total_recipients': len(updated_recipients),
     'total_airdrops': total_airdrops_found,
     'recipients_with_multiple': len(multi_airdrop_recipients),
-    'extraction_errors': errors,
     'recipients': updated_recipients
 }
 
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Fila persistente de backfill de fees (SQLite) com workers paralelos
+
+- data/fee_backfill.db guarda cada txid sem fee, com prioridade por altura
+  de bloco (mais recentes primeiro), tentativas e resultado
+- Workers em threads calculam as fees; um semáforo limita a concorrência
+  de RPC (FEE_RPC_CONCURRENCY)
+- Cada resultado é gravado na hora: parar e retomar não perde progresso
+- A fila é semeada a partir do cache do Upstash no máximo a cada
+  FEE_SEED_INTERVAL_MIN minutos (não a cada execução)
+- Fees prontas são aplicadas por txid no Upstash (upstash_store.DogTxStore.patch)
+- A mesma tabela serve de cache de fees por txid para o sync da Xverse
+  (`known_fees` / `store_fees`)
+
+Uso:
+    python3 fee_backfill_queue.py           # roda continuamente drenando a fila
+    python3 fee_backfill_queue.py --once    # drena o que houver e sai
+    python3 fee_backfill_queue.py --seed    # força semear a partir do Upstash
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import update_holders_and_fees
+from dog_fees import fee_from_tx
+from upstash_store import DogTxStore
+
+SCRIPT_DIR = Path(__file__).parent
+QUEUE_DB = SCRIPT_DIR.parent / 'data' / 'fee_backfill.db'
+
+FEE_WORKERS = int(os.environ.get('FEE_WORKERS', '8'))
+FEE_RPC_CONCURRENCY = int(os.environ.get('FEE_RPC_CONCURRENCY', '4'))
+FEE_MAX_ATTEMPTS = int(os.environ.get('FEE_MAX_ATTEMPTS', '5'))
+FEE_SEED_INTERVAL_MIN = float(os.environ.get('FEE_SEED_INTERVAL_MIN', '60'))
+FEE_FLUSH_EVERY = int(os.environ.get('FEE_FLUSH_EVERY', '200'))
+FEE_IDLE_SLEEP_SEC = 60
+CLAIM_SIZE = 500
+
+
+class FeeBackfillQueue:
+    def __init__(self, db_path: Path = QUEUE_DB):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(db_path))
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS fee_queue (
+                txid TEXT PRIMARY KEY,
+                block_height INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                fee_sats INTEGER,
+                vsize INTEGER,
+                fee_rate REAL,
+                published INTEGER NOT NULL DEFAULT 0,
+                updated_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS fee_queue_priority
+                ON fee_queue (status, block_height DESC);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            """
+        )
+        self.db.commit()
+
+    def enqueue(self, items: Iterable[Tuple[str, int]]) -> int:
+        """Adiciona (txid, block_height) ainda não conhecidos. Retorna quantos entraram"""
+        before = self.db.total_changes
+        self.db.executemany(
+            'INSERT OR IGNORE INTO fee_queue (txid, block_height, updated_at) VALUES (?, ?, ?)',
+            [(txid, height or 0, datetime.now().isoformat()) for txid, height in items],
+        )
+        self.db.commit()
+        return self.db.total_changes - before
+
+    def claim(self, limit: int) -> List[Tuple[str, int]]:
+        """Próximos txids pendentes, mais recentes primeiro"""
+        return self.db.execute(
+            "SELECT txid, block_height FROM fee_queue WHERE status = 'pending' "
+            'ORDER BY block_height DESC, attempts ASC LIMIT ?',
+            (limit,),
+        ).fetchall()
+
+    def complete(self, txid: str, fee: Dict) -> None:
+        self.db.execute(
+            "UPDATE fee_queue SET status = 'done', fee_sats = ?, vsize = ?, fee_rate = ?, "
+            'attempts = attempts + 1, published = 0, updated_at = ? WHERE txid = ?',
+            (fee['fee_sats'], fee.get('vsize'), fee.get('fee_rate'), datetime.now().isoformat(), txid),
+        )
+        self.db.commit()
+
+    def store_fees(self, items: Iterable[Tuple[str, int, Dict]]) -> None:
+        """Grava fees obtidas fora da fila (txid, block_height, fee) como já publicadas"""
+        now = datetime.now().isoformat()
+        self.db.executemany(
+            "INSERT INTO fee_queue (txid, block_height, status, attempts, fee_sats, vsize, fee_rate, published, updated_at) "
+            "VALUES (?, ?, 'done', 1, ?, ?, ?, 1, ?) "
+            "ON CONFLICT(txid) DO UPDATE SET status = 'done', fee_sats = excluded.fee_sats, "
+            "vsize = excluded.vsize, fee_rate = excluded.fee_rate, updated_at = excluded.updated_at",
+            [(txid, height or 0, fee['fee_sats'], fee.get('vsize'), fee.get('fee_rate'), now) for txid, height, fee in items],
+        )
+        self.db.commit()
+
+    def fail(self, txid: str) -> None:
+        self.db.execute(
+            "UPDATE fee_queue SET attempts = attempts + 1, updated_at = ?, "
+            "status = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END WHERE txid = ?",
+            (datetime.now().isoformat(), FEE_MAX_ATTEMPTS, txid),
+        )
+        self.db.commit()
+
+    def known_fees(self, txids: Iterable[str]) -> Dict[str, Dict]:
+        """Fees já calculadas para os txids informados"""
+        txids = list(txids)
+        fees: Dict[str, Dict] = {}
+        for start in range(0, len(txids), 500):
+            chunk = txids[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.db.execute(
+                f"SELECT txid, fee_sats, vsize, fee_rate FROM fee_queue WHERE status = 'done' AND txid IN ({placeholders})",
+                chunk,
+            )
+            for txid, fee_sats, vsize, fee_rate in rows:
+                fees[txid] = {'fee_sats': fee_sats, 'vsize': vsize, 'fee_rate': fee_rate}
+        return fees
+
+    def unpublished(self) -> Dict[str, Dict]:
+        rows = self.db.execute(
+            "SELECT txid, fee_sats, vsize, fee_rate FROM fee_queue WHERE status = 'done' AND published = 0"
+        )
+        return {txid: {'fee_sats': fee, 'vsize': vsize, 'fee_rate': rate} for txid, fee, vsize, rate in rows}
+
+    def mark_published(self, txids: Iterable[str]) -> None:
+        self.db.executemany('UPDATE fee_queue SET published = 1 WHERE txid = ?', [(txid,) for txid in txids])
+        self.db.commit()
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.db.execute('SELECT status, COUNT(*) FROM fee_queue GROUP BY status').fetchall())
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        self.db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+        self.db.commit()
+
+
+# === Cálculo =================================================================
+
+RPC_SLOTS = threading.BoundedSemaphore(FEE_RPC_CONCURRENCY)
+
+
+def compute_fee(txid: str) -> Optional[Dict]:
+    """Fee via getrawtransaction verbosity 2 (prevouts inclusos); fallback por input"""
+    with RPC_SLOTS:
+        tx_data = update_holders_and_fees.RPC.call('getrawtransaction', txid, 2, timeout=15)
+        fee = fee_from_tx(tx_data) if tx_data else None
+        if fee:
+            return fee
+
+        fee_sats = update_holders_and_fees.calculate_transaction_fee(txid)
+        if fee_sats:
+            vsize = tx_data.get('vsize') if tx_data else None
+            return {'fee_sats': fee_sats, 'vsize': vsize, 'fee_rate': round(fee_sats / vsize, 2) if vsize else None}
+    return None
+
+
+# === Semeadura e publicação ==================================================
+
+def seed_from_upstash(queue: FeeBackfillQueue, force: bool = False) -> int:
+    """Enfileira transações sem fee do cache do Upstash (no máximo a cada intervalo)"""
+    last_seed = queue.get_meta('last_seed')
+    if not force and last_seed and time.time() - float(last_seed) < FEE_SEED_INTERVAL_MIN * 60:
+        return 0
+
+    cache_data = update_holders_and_fees.get_cache_from_upstash()
+    if not cache_data:
+        return 0
+
+    missing = [
+        (tx['txid'], tx.get('block_height') or 0)
+        for tx in cache_data.get('transactions', [])
+        if tx.get('txid') and not tx.get('fee_sats')
+    ]
+    added = queue.enqueue(missing)
+    queue.set_meta('last_seed', str(time.time()))
+    print(f"🌱 Fila semeada: {added} novos txids ({len(missing)} sem fee no cache)")
+    return added
+
+
+def publish_fees(queue: FeeBackfillQueue) -> int:
+    """Aplica as fees prontas direto nos registros do Upstash (HMGET + HSET em pipeline)"""
+    fees = queue.unpublished()
+    if not fees:
+        return 0
+
+    store = DogTxStore()
+    if not store.available:
+        return 0
+
+    try:
+        applied = store.patch({
+            txid: {k: v for k, v in fee.items() if v is not None}
+            for txid, fee in fees.items()
+        })
+    except Exception as e:
+        print(f"❌ Erro ao publicar fees: {e}")
+        return 0
+
+    # Txids que já saíram do cache também contam como publicados
+    queue.mark_published(fees.keys())
+    print(f"📡 {applied} fees publicadas no Upstash ({store.bytes_sent:,} bytes)")
+    return applied
+
+
+# === Execução ================================================================
+
+def drain(queue: FeeBackfillQueue) -> Tuple[int, int]:
+    """Processa a fila até esvaziar. Retorna (calculadas, falhas)"""
+    calculated = 0
+    failed = 0
+    since_flush = 0
+    tried = set()  # falhas voltam para a fila, mas só na próxima rodada
+    start_time = time.time()
+
+    with ThreadPoolExecutor(max_workers=FEE_WORKERS) as executor:
+        while True:
+            batch = [row for row in queue.claim(CLAIM_SIZE + len(tried)) if row[0] not in tried][:CLAIM_SIZE]
+            if not batch:
+                break
+            tried.update(txid for txid, _height in batch)
+
+            futures = {executor.submit(compute_fee, txid): txid for txid, _height in batch}
+            for future in as_completed(futures):
+                txid = futures[future]
+                try:
+                    fee = future.result()
+                except Exception:
+                    fee = None
+
+                # Checkpoint: cada resultado é persistido imediatamente
+                if fee:
+                    queue.complete(txid, fee)
+                    calculated += 1
+                    since_flush += 1
+                else:
+                    queue.fail(txid)
+                    failed += 1
+
+            elapsed = time.time() - start_time
+            print(f"⏳ {calculated} fees, {failed} falhas ({calculated / max(elapsed, 1e-9):.1f} fees/s) | fila: {queue.counts()}")
+
+            if since_flush >= FEE_FLUSH_EVERY:
+                publish_fees(queue)
+                since_flush = 0
+
+    publish_fees(queue)
+    return calculated, failed
+
+
+def run_backfill(once: bool = False, force_seed: bool = False) -> bool:
+    queue = FeeBackfillQueue()
+    print(f"⚙️ Workers: {FEE_WORKERS} | concorrência RPC: {FEE_RPC_CONCURRENCY}")
+
+    while True:
+        seed_from_upstash(queue, force=force_seed)
+        force_seed = False
+
+        calculated, failed = drain(queue)
+        print(f"📊 Rodada: {calculated} calculadas, {failed} falhas | fila: {queue.counts()}")
+        print(f"💾 Cache de TXs: {update_holders_and_fees.TX_CACHE.summary()}")
+
+        if once:
+            return calculated > 0 or failed == 0
+        time.sleep(FEE_IDLE_SLEEP_SEC)
+
+
+def main():
+    print("=" * 80)
+    print("💰 BACKFILL DE FEES - FILA PERSISTENTE")
+    print("=" * 80)
+    run_backfill(once='--once' in sys.argv, force_seed='--seed' in sys.argv)
+
+
+if __name__ == '__main__':
+    main()
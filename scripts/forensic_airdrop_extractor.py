@@ -11,12 +11,15 @@ Este script faz análise forense COMPLETA:
 """
 
 import json
-import requests
-import time
+import os
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
 
+from dog_record import to_dog
+from http_client import FOREVER, HTTP
+from runestone_decoder import allocate, find_runestone
+
 # Configurações
 DISTRIBUTOR_ADDRESS = "bc1pry0ne0yf5pkgqsszmytmqkpzs4aflhr8tfptz9sydqrhxexgujcqqler2t"
 MINT_TX = "1107d8477c6067fb47ff34aaea37ceb84842db07e4e829817964fcddfd713224"
@@ -26,6 +29,8 @@ OUTPUT_FILE = BASE_DIR / 'data' / 'forensic_airdrop_data.json'
 
 # APIs
 MEMPOOL_API = "https://mempool.space/api"
+ORD_SERVER_URL = os.getenv("ORD_SERVER_URL", "http://127.0.0.1:8080")
+DOG_RUNE_NAME = "DOG•GO•TO•THE•MOON"
 
 def get_address_txs(address, api_base=MEMPOOL_API):
     """Obtém TODAS as transações de um endereço"""
@@ -37,10 +42,11 @@ def get_address_txs(address, api_base=MEMPOOL_API):
         last_seen_txid = None
         
         while True:
+            # Páginas /chain/<txid> são histórico imutável: replay do cache em disco
             if last_seen_txid:
-                response = requests.get(f"{url}/chain/{last_seen_txid}", timeout=30)
+                response = HTTP.get(f"{url}/chain/{last_seen_txid}", ttl=FOREVER)
             else:
-                response = requests.get(url, timeout=30)
+                response = HTTP.get(url)
             
             if response.status_code != 200:
                 print(f"❌ Erro na API: {response.status_code}")
@@ -54,7 +60,6 @@ def get_address_txs(address, api_base=MEMPOOL_API):
             last_seen_txid = txs[-1]['txid']
             
             print(f"   📊 {len(all_txs)} transações encontradas...")
-            time.sleep(0.5)
             
             if len(all_txs) > 10000:
                 print("⚠️  Limite de transações atingido")
@@ -67,19 +72,57 @@ def get_address_txs(address, api_base=MEMPOOL_API):
         print(f"❌ Erro: {e}")
         return []
 
-def get_rune_amount_from_tx(txid):
-    """
-    Tenta obter a quantidade de runes de uma transação.
-    Isso requer análise dos runestones na transação.
+def get_output_dog_balance(outpoint):
+    """DOG (unidades base) num outpoint via servidor do ord (/output/<outpoint>). None se desconhecido
+
+    O ord descarta os saldos de runes quando o outpoint é gasto: resposta de
+    outpoint gasto (ou sem runes) não prova 0 DOG e volta como None. Sem
+    cache permanente: a resposta depende do estado atual do ord.
     """
-    # Por enquanto, vamos usar estimativa baseada nos outputs
-    # Em produção, precisaria decodificar o runestone
-    return None
+    response = HTTP.get(f"{ORD_SERVER_URL}/output/{outpoint}", headers={'Accept': 'application/json'},
+                        timeout=5, retries=1)  # Erro de conexão sobe: o chamador desliga o ord
+    if response.status_code != 200:
+        return None
+    data = response.json()
+    runes = data.get('runes') or {}
+    if data.get('spent') or not runes:
+        return None
+    for name, entry in (runes.items() if isinstance(runes, dict) else runes):
+        if name == DOG_RUNE_NAME:
+            return int(entry['amount'])
+    return 0
+
+def parents_first(txs):
+    """TXs por altura e, dentro do bloco, cada TX depois das que ela gasta (vin -> txid)"""
+    by_txid = {tx['txid']: tx for tx in txs}
+    ordered, emitted = [], set()
+    for root in sorted(txs, key=lambda tx: tx.get('status', {}).get('block_height') or float('inf')):
+        stack = [root]
+        while stack:
+            tx = stack[-1]
+            if tx['txid'] in emitted:
+                stack.pop()
+                continue
+            pending = [by_txid[vin['txid']] for vin in tx.get('vin', [])
+                       if vin.get('txid') in by_txid and vin['txid'] not in emitted]
+            if pending:
+                stack.extend(pending)
+                continue
+            emitted.add(tx['txid'])
+            ordered.append(stack.pop())
+    return ordered
 
 def extract_forensic_data(distributor_txs):
     """
     Extrai dados forenses COMPLETOS das transações de distribuição.
     
+    A quantidade de DOG de cada output sai do runestone da TX (edicts
+    aplicados pelo runestone_decoder). As TXs são processadas da mais antiga
+    para a mais nova (pais antes dos filhos dentro do bloco): o DOG alocado aos outputs do próprio distribuidor
+    (troco) vira o saldo de entrada das TXs seguintes; inputs fora dessa
+    cadeia são consultados no servidor do ord. Sem ord, vale o total dos
+    edicts explícitos (ver runestone_decoder.allocate).
+    
     Para cada recipient, captura:
     - Endereço
     - Quantidade EXATA recebida (de cada tx)
@@ -104,8 +147,11 @@ def extract_forensic_data(distributor_txs):
     })
     
     distribution_txs = []
+    dog_outpoints = {}  # 'txid:vout' -> DOG (unidades base) alocado nesta passada
+    ord_available = True
     
-    for tx in distributor_txs:
+    ordered = parents_first(distributor_txs)  # Troco do pai antes do filho, mesmo no mesmo bloco
+    for tx in ordered:
         txid = tx['txid']
         block_height = tx.get('status', {}).get('block_height')
         block_time = tx.get('status', {}).get('block_time')
@@ -119,28 +165,48 @@ def extract_forensic_data(distributor_txs):
         if not is_sender:
             continue
         
+        # DOG exato por output: edicts do runestone sobre o saldo de entrada
+        balance = 0
+        for vin in tx.get('vin', []):
+            outpoint = f"{vin.get('txid')}:{vin.get('vout')}"
+            amount = dog_outpoints.pop(outpoint, None)
+            if amount is None and ord_available:
+                try:
+                    amount = get_output_dog_balance(outpoint)
+                except Exception:
+                    ord_available = False
+            balance = None if amount is None or balance is None else balance + amount
+        scripts = [vout.get('scriptpubkey', '') for vout in tx.get('vout', [])]
+        allocation = allocate(find_runestone(scripts), scripts, balance)
+        
         # Extrair outputs que NÃO são para a própria distribuidora
         tx_recipients = []
-        for vout in tx.get('vout', []):
+        for index, vout in enumerate(tx.get('vout', [])):
             recipient_addr = vout.get('scriptpubkey_address')
             output_value = vout.get('value', 0)  # Valor em satoshis
+            # Sem saldo de entrada conhecido a quantia fica em aberto (None) e não entra nos totais
+            dog_amount = allocation.outputs.get(index, 0) if allocation.exact else None
+            
+            if recipient_addr == DISTRIBUTOR_ADDRESS and balance is not None and dog_amount is not None:
+                dog_outpoints[f"{txid}:{index}"] = dog_amount
             
             if recipient_addr and recipient_addr != DISTRIBUTOR_ADDRESS:
-                # Aqui assumimos que o valor em satoshis é proporcional ao DOG
-                # Em produção, decodificaríamos o runestone
-                
                 # Registrar recebimento
                 receive_record = {
                     'tx': txid,
                     'block': block_height,
                     'time': block_time,
                     'btc_value': output_value,
-                    'vout': vout.get('n')
+                    'vout': index,
+                    'dog_amount': to_dog(dog_amount) if dog_amount is not None else None,
+                    'exact': allocation.exact
                 }
                 
                 recipient_data = recipients[recipient_addr]
                 recipient_data['address'] = recipient_addr
                 recipient_data['receive_count'] += 1
+                if dog_amount is not None:
+                    recipient_data['total_received'] += dog_amount
                 recipient_data['receive_history'].append(receive_record)
                 
                 # Primeira vez?
@@ -161,38 +227,23 @@ def extract_forensic_data(distributor_txs):
                 'txid': txid,
                 'block_height': block_height,
                 'block_time': block_time,
-                'recipients_count': len(tx_recipients)
+                'recipients_count': len(tx_recipients),
+                'dog_distributed': to_dog(sum(allocation.outputs.get(i, 0) for i, v in enumerate(tx.get('vout', []))
+                                              if v.get('scriptpubkey_address') != DISTRIBUTOR_ADDRESS))
+                                   if allocation.exact else None,
+                'dog_burned': to_dog(allocation.burned) if allocation.exact else None,
+                'exact': allocation.exact
             })
     
+    # Unidades base -> DOG
+    for recipient_data in recipients.values():
+        recipient_data['total_received'] = to_dog(recipient_data['total_received'])
+    
     print(f"✅ {len(recipients):,} recipients com dados forenses extraídos")
     print(f"✅ {len(distribution_txs):,} transações de distribuição analisadas")
     
     return recipients, distribution_txs
 
-def calculate_estimated_dog_amounts(recipients):
-    """
-    Calcula estimativa de DOG recebido com base nos padrões.
-    
-    Sabemos que a maioria recebeu 889,806 DOG.
-    Vamos usar heurísticas para estimar valores.
-    """
-    print("\n💡 Calculando estimativas de DOG recebido...")
-    
-    STANDARD_AIRDROP = 889806  # DOG padrão
-    
-    for addr, data in recipients.items():
-        # Heurística simples: se recebeu 1 vez, provavelmente é o valor padrão
-        if data['receive_count'] == 1:
-            data['estimated_dog_received'] = STANDARD_AIRDROP
-        else:
-            # Se recebeu múltiplas vezes, pode ser mais
-            data['estimated_dog_received'] = STANDARD_AIRDROP * data['receive_count']
-        
-        data['total_received'] = data['estimated_dog_received']
-    
-    print(f"✅ Estimativas calculadas")
-    return recipients
-
 def save_forensic_data(recipients, distribution_txs):
     """Salva dados forenses em formato estruturado"""
     print(f"\n💾 Salvando dados forenses em {OUTPUT_FILE}...")
@@ -220,12 +271,12 @@ def save_forensic_data(recipients, distribution_txs):
     
     output_data = {
         'timestamp': datetime.now().isoformat(),
-        'extraction_method': 'forensic_mempool_api',
+        'extraction_method': 'forensic_mempool_api_runestone_edicts',
         'mint_tx': MINT_TX,
         'distributor_address': DISTRIBUTOR_ADDRESS,
         'statistics': {
             'total_recipients': total_recipients,
-            'total_distributed_estimate': total_distributed,
+            'total_distributed': total_distributed,
             'average_per_recipient': avg_received,
             'total_distribution_txs': len(distribution_txs)
         },
@@ -249,7 +300,7 @@ def save_forensic_data(recipients, distribution_txs):
     
     # Mostrar estatísticas
     print(f"\n📊 ESTATÍSTICAS FORENSES:")
-    print(f"   💰 Total distribuído (estimado): {total_distributed:,.0f} DOG")
+    print(f"   💰 Total distribuído: {total_distributed:,.5f} DOG")
     print(f"   📈 Média por recipient: {avg_received:,.0f} DOG")
     print(f"   🎯 Total de recipients: {total_recipients:,}")
     
@@ -284,10 +335,7 @@ def main():
         print("\n❌ Nenhum recipient encontrado!")
         return
     
-    # 3. Calcular estimativas de DOG
-    recipients = calculate_estimated_dog_amounts(recipients)
-    
-    # 4. Salvar resultado
+    # 3. Salvar resultado
     save_forensic_data(recipients, distribution_txs)
     
     print("\n" + "="*80)
@@ -10,22 +10,38 @@ Este script faz ANÁLISE CRUZADA PROFUNDA:
    - Venda desde o airdrop (perdeu quanto)
    - Taxa de retenção individual
    - Padrão de dumping (vendendo aos poucos)
-   - Velocidade de acumulação
+   - Velocidade de acumulação (janela real de cada endereço, do
+     histórico de saldos mantido pelo tracker - balance_history.py)
    - Ranking no airdrop vs ranking atual
    - Mudança de posição
 """
 
+import bisect
+import heapq
 import json
 import sys
 from pathlib import Path
 from datetime import datetime
 
+try:
+    import numpy as np
+except ImportError:  # Sem NumPy: classificação perfil a perfil
+    np = None
+
+from balance_history import BALANCE_HISTORY_DB, BalanceHistory
+
 # Configurações
 BASE_DIR = Path(__file__).parent.parent
 AIRDROP_DATA_FILE = BASE_DIR / 'data' / 'airdrop_recipients.json'
 HOLDERS_FILE = BASE_DIR / 'backend' / 'data' / 'dog_holders_by_address.json'
 OUTPUT_FILE = BASE_DIR / 'data' / 'forensic_behavioral_analysis.json'
 
+BLOCKS_PER_DAY = 144
+# Janela usada quando o endereço não está no histórico de saldos
+# (aproximação: blocos desde 840000)
+BLOCKS_SINCE_AIRDROP = 918786 - 840000
+DAYS_SINCE_AIRDROP = BLOCKS_SINCE_AIRDROP / BLOCKS_PER_DAY
+
 def load_json(file_path):
     """Carrega arquivo JSON"""
     try:
@@ -38,21 +54,35 @@ def load_json(file_path):
         print(f"❌ Erro ao decodificar JSON: {file_path}")
         return None
 
+def holder_entry(holder, rank):
+    """Entrada do mapa de holders (rank começa em 1)"""
+    return {
+        'current_balance': holder.get('total_dog', 0),
+        'current_rank': rank,
+        'utxo_count': holder.get('utxo_count', 0)
+    }
+
 def create_holders_map(holders_data):
     """Cria mapa de holders para busca rápida"""
     holders_map = {}
     
     if 'holders' in holders_data:
         for idx, holder in enumerate(holders_data['holders']):
-            holders_map[holder['address']] = {
-                'current_balance': holder.get('total_dog', 0),
-                'current_rank': idx + 1,
-                'utxo_count': holder.get('utxo_count', 0)
-            }
+            holders_map[holder['address']] = holder_entry(holder, idx + 1)
     
     return holders_map
 
-def calculate_behavior_metrics(recipient, holders_map):
+def load_holding_spans(addresses):
+    """(primeiro recebimento, blocos até a última mudança de saldo) por endereço"""
+    if not BALANCE_HISTORY_DB.exists():
+        return {}
+    return BalanceHistory().holding_spans(addresses)
+
+def holding_days(span):
+    """Dias da janela de acumulação do endereço (sem histórico: janela aproximada)"""
+    return span[1] / BLOCKS_PER_DAY if span else DAYS_SINCE_AIRDROP
+
+def calculate_behavior_metrics(recipient, holders_map, spans=None):
     """
     Calcula métricas comportamentais AVANÇADAS.
     
@@ -68,13 +98,14 @@ def calculate_behavior_metrics(recipient, holders_map):
     address = recipient['address']
     airdrop_amount = recipient['airdrop_amount']
     airdrop_rank = recipient.get('rank', 0)
+    span = (spans or {}).get(address)
     
     profile = {
         'address': address,
         'airdrop_rank': airdrop_rank,
         'airdrop_amount': airdrop_amount,
         'receive_count': recipient['receive_count'],
-        'first_receive_block': recipient.get('first_receive_block', 0),
+        'first_receive_block': recipient.get('first_receive_block') or (span[0] if span else 0),
         'first_receive_time': recipient.get('first_receive_time', ''),
         'current_balance': 0,
         'current_rank': None,
@@ -109,12 +140,11 @@ def calculate_behavior_metrics(recipient, holders_map):
         # Mudança de ranking
         profile['rank_change'] = airdrop_rank - current_rank  # Positivo = subiu
         
-        # Taxa de acumulação (DOG ganho por dia desde airdrop)
-        # Aproximação: blocos desde 840000
-        blocks_since = 918786 - 840000  # Aproximado
-        days_since = blocks_since / 144  # ~144 blocos por dia
-        if days_since > 0:
-            profile['accumulation_rate'] = profile['absolute_change'] / days_since
+        # Taxa de acumulação (DOG ganho por dia, do primeiro recebimento
+        # até a última mudança de saldo)
+        days = holding_days(span)
+        if days > 0:
+            profile['accumulation_rate'] = profile['absolute_change'] / days
         
         # Classificar padrão comportamental
         profile = classify_behavior(profile)
@@ -124,102 +154,76 @@ def calculate_behavior_metrics(recipient, holders_map):
     
     return profile
 
+# Padrões na ordem de avaliação: (pattern, category, detail, diamond_score, is_dumping)
+# A condição de cada um está em behavior_conditions(); o último é o padrão (else)
+BEHAVIOR_PATTERNS = [
+    # ACCUMULATORS: Qualquer um que comprou mais (change_pct > 0)
+    ('satoshi_visionary', 'Accumulator', 'Satoshi Visionary (10x+)', 95, False),
+    ('btc_maximalist', 'Accumulator', 'BTC Maximalist (5x-10x)', 90, False),
+    ('rune_master', 'Accumulator', 'Rune Master (2x-5x)', 85, False),
+    ('ordinal_believer', 'Accumulator', 'Ordinal Believer (50%+)', 80, False),
+    ('dog_legend', 'Accumulator', 'DOG Legend (Added Any Amount)', 75, False),
+    # HOLDERS: Manteve EXATAMENTE o airdrop (apenas 100%)
+    ('diamond_paws', 'Holder', 'Diamond Paws 🐾 (Kept Exact Airdrop)', 100, False),
+    # SOLD OR MOVED: Venderam ou moveram qualquer quantidade (mesmo que parcial)
+    ('hodl_hero', 'Sold or Moved', 'HODL Hero (90%+)', 65, False),
+    ('steady_holder', 'Sold or Moved', 'Steady Holder (75%+)', 55, False),
+    ('profit_taker', 'Sold or Moved', 'Profit Taker (50%+)', 45, False),
+    ('early_exit', 'Sold or Moved', 'Early Exit (25%+)', 30, True),
+    ('panic_seller', 'Sold or Moved', 'Panic Seller (10%+)', 15, True),
+    ('paper_hands', 'Sold or Moved', 'Paper Hands 📄 (<10%)', 5, True),
+]
+ACCUMULATOR_PATTERNS = [pattern for pattern, category, *_ in BEHAVIOR_PATTERNS if category == 'Accumulator']
+TOP_LIMIT = 50
+
+
+def behavior_conditions(change_pct, retention):
+    """Condições de BEHAVIOR_PATTERNS (menos o último). Aceita escalares ou arrays NumPy"""
+    return [
+        change_pct >= 1000,  # 10x ou mais
+        change_pct >= 500,   # 5x-10x
+        change_pct >= 200,   # 2x-5x
+        change_pct >= 50,    # 50%-200%
+        change_pct > 0,      # Qualquer acumulação positiva
+        change_pct == 0,     # Manteve exatamente 100%
+        retention >= 90,     # Vendeu ou moveu até 10%
+        retention >= 75,     # Vendeu 10%-25%
+        retention >= 50,     # Vendeu 25%-50%
+        retention >= 25,     # Vendeu 50%-75%
+        retention >= 10,     # Vendeu 75%-90%
+    ]
+
+
+def rank_adjustment_conditions(rank_change):
+    """Ajuste do score por rank change: (condição, delta). Aceita escalares ou arrays NumPy"""
+    return [
+        (rank_change > 1000, 10),   # Subiu muito
+        (rank_change > 500, 5),
+        (rank_change < -1000, -10),  # Caiu muito
+    ]
+
+
 def classify_behavior(profile):
     """Classifica o padrão comportamental com análise profunda"""
     
-    balance = profile['current_balance']
     change_pct = profile['percentage_change']
     retention = profile['retention_rate']
     rank_change = profile['rank_change'] or 0
     
-    # Diamond Score (0-100)
-    diamond_score = 0
-    
-    # ACCUMULATORS: Qualquer um que comprou mais (change_pct > 0)
-    if change_pct >= 1000:  # 10x ou mais
-        profile['behavior_pattern'] = 'satoshi_visionary'
-        profile['behavior_category'] = 'Accumulator'  # Categoria consolidada
-        profile['behavior_detail'] = 'Satoshi Visionary (10x+)'  # Detalhe interno
-        diamond_score = 95
-        
-    elif change_pct >= 500:  # 5x-10x
-        profile['behavior_pattern'] = 'btc_maximalist'
-        profile['behavior_category'] = 'Accumulator'
-        profile['behavior_detail'] = 'BTC Maximalist (5x-10x)'
-        diamond_score = 90
-        
-    elif change_pct >= 200:  # 2x-5x
-        profile['behavior_pattern'] = 'rune_master'
-        profile['behavior_category'] = 'Accumulator'
-        profile['behavior_detail'] = 'Rune Master (2x-5x)'
-        diamond_score = 85
-        
-    elif change_pct >= 50:  # 50%-200%
-        profile['behavior_pattern'] = 'ordinal_believer'
-        profile['behavior_category'] = 'Accumulator'
-        profile['behavior_detail'] = 'Ordinal Believer (50%+)'
-        diamond_score = 80
-        
-    elif change_pct > 0:  # Qualquer acumulação positiva
-        profile['behavior_pattern'] = 'dog_legend'
-        profile['behavior_category'] = 'Accumulator'
-        profile['behavior_detail'] = 'DOG Legend (Added Any Amount)'
-        diamond_score = 75
-        
-    # HOLDERS: Manteve EXATAMENTE o airdrop (apenas 100%)
-    elif change_pct == 0:  # Manteve exatamente 100%
-        profile['behavior_pattern'] = 'diamond_paws'
-        profile['behavior_category'] = 'Holder'
-        profile['behavior_detail'] = 'Diamond Paws 🐾 (Kept Exact Airdrop)'
-        diamond_score = 100
-        
-    # SOLD OR MOVED: Venderam ou moveram qualquer quantidade (mesmo que parcial)
-    elif retention >= 90:  # Vendeu ou moveu até 10%
-        profile['behavior_pattern'] = 'hodl_hero'
-        profile['behavior_category'] = 'Sold or Moved'
-        profile['behavior_detail'] = 'HODL Hero (90%+)'
-        diamond_score = 65
-        
-    elif retention >= 75:  # Vendeu 10%-25%
-        profile['behavior_pattern'] = 'steady_holder'
-        profile['behavior_category'] = 'Sold or Moved'
-        profile['behavior_detail'] = 'Steady Holder (75%+)'
-        diamond_score = 55
-        
-    elif retention >= 50:  # Vendeu 25%-50%
-        profile['behavior_pattern'] = 'profit_taker'
-        profile['behavior_category'] = 'Sold or Moved'
-        profile['behavior_detail'] = 'Profit Taker (50%+)'
-        diamond_score = 45
-        
-    elif retention >= 25:  # Vendeu 50%-75%
-        profile['behavior_pattern'] = 'early_exit'
-        profile['behavior_category'] = 'Sold or Moved'
-        profile['behavior_detail'] = 'Early Exit (25%+)'
-        diamond_score = 30
-        profile['is_dumping'] = True
-        
-    elif retention >= 10:  # Vendeu 75%-90%
-        profile['behavior_pattern'] = 'panic_seller'
-        profile['behavior_category'] = 'Sold or Moved'
-        profile['behavior_detail'] = 'Panic Seller (10%+)'
-        diamond_score = 15
-        profile['is_dumping'] = True
-        
-    else:  # Vendeu 90%+ ou tudo
-        profile['behavior_pattern'] = 'paper_hands'
-        profile['behavior_category'] = 'Sold or Moved'
-        profile['behavior_detail'] = 'Paper Hands 📄 (<10%)'
-        diamond_score = 5
+    conditions = behavior_conditions(change_pct, retention)
+    index = next((i for i, matched in enumerate(conditions) if matched), len(conditions))
+    pattern, category, detail, diamond_score, is_dumping = BEHAVIOR_PATTERNS[index]
+    profile['behavior_pattern'] = pattern
+    profile['behavior_category'] = category
+    profile['behavior_detail'] = detail
+    if is_dumping:
         profile['is_dumping'] = True
     
-    # Ajustar score baseado em rank change
-    if rank_change > 1000:  # Subiu muito
-        diamond_score = min(100, diamond_score + 10)
-    elif rank_change > 500:
-        diamond_score = min(100, diamond_score + 5)
-    elif rank_change < -1000:  # Caiu muito
-        diamond_score = max(0, diamond_score - 10)
+    # Ajustar score baseado em rank change (Diamond Score 0-100)
+    for matched, delta in rank_adjustment_conditions(rank_change):
+        if matched:
+            diamond_score = min(100, max(0, diamond_score + delta))
+            break
     
     profile['diamond_score'] = diamond_score
     
@@ -260,22 +264,9 @@ def generate_insights(profile):
     
     return insights
 
-def generate_behavioral_analysis(airdrop_data, holders_data):
-    """Gera análise comportamental completa"""
-    print("\nGerando análise comportamental...")
-    
-    recipients = airdrop_data.get('recipients', [])
-    holders_map = create_holders_map(holders_data)
-    
-    print(f"   {len(recipients):,} recipients do airdrop")
-    print(f"   {len(holders_map):,} holders atuais")
-    
-    # Analisar cada recipient
-    profiles = []
-    
-    # Contadores para estatísticas
-    stats = {
-        'total_analyzed': len(recipients),
+def _new_stats(total):
+    return {
+        'total_analyzed': total,
         'still_holding': 0,
         'sold_everything': 0,
         'accumulated': 0,
@@ -283,38 +274,206 @@ def generate_behavioral_analysis(airdrop_data, holders_data):
         'diamond_hands': 0,
         'by_pattern': {}
     }
+
+def count_profile(stats, profile, sign=1):
+    """Soma (sign=1) ou retira (sign=-1) a contribuição do perfil nas estatísticas"""
+    if profile['current_balance'] > 0:
+        stats['still_holding'] += sign
+    else:
+        stats['sold_everything'] += sign
+    
+    if profile['percentage_change'] > 0:
+        stats['accumulated'] += sign
+    
+    if profile['is_dumping']:
+        stats['dumping'] += sign
+    
+    if profile['behavior_pattern'] == 'diamond_paws':
+        stats['diamond_hands'] += sign  # Mantém nome da chave para compatibilidade
+    
+    # Contar por padrão (padrão zerado sai do dict, como na contagem completa)
+    pattern = profile['behavior_pattern']
+    stats['by_pattern'][pattern] = stats['by_pattern'].get(pattern, 0) + sign
+    if stats['by_pattern'][pattern] <= 0:
+        del stats['by_pattern'][pattern]
+
+def update_rates(stats):
+    """Calcula os percentuais a partir dos contadores"""
+    total = stats['total_analyzed']
+    stats['retention_rate'] = (stats['still_holding'] / total * 100) if total > 0 else 0
+    stats['accumulator_rate'] = (stats['accumulated'] / total * 100) if total > 0 else 0
+    stats['dumper_rate'] = (stats['dumping'] / total * 100) if total > 0 else 0
+
+def _analyze_profiles_loop(recipients, holders_map, spans):
+    """Caminho por perfil (sem NumPy): um dict por recipient, ordenado por diamond score"""
+    profiles = []
+    stats = _new_stats(len(recipients))
     
     for recipient in recipients:
-        profile = calculate_behavior_metrics(recipient, holders_map)
+        profile = calculate_behavior_metrics(recipient, holders_map, spans)
         profiles.append(profile)
-        
-        # Atualizar estatísticas
-        if profile['current_balance'] > 0:
-            stats['still_holding'] += 1
-        else:
-            stats['sold_everything'] += 1
-        
-        if profile['percentage_change'] > 0:
-            stats['accumulated'] += 1
-        
-        if profile['is_dumping']:
-            stats['dumping'] += 1
-        
-        if profile['behavior_pattern'] == 'diamond_paws':
-            stats['diamond_hands'] += 1  # Mantém nome da chave para compatibilidade
-        
-        # Contar por padrão
-        pattern = profile['behavior_pattern']
-        stats['by_pattern'][pattern] = stats['by_pattern'].get(pattern, 0) + 1
+        count_profile(stats, profile)
     
     # Ordenar por diamond score (maiores primeiro)
     profiles.sort(key=lambda x: x['diamond_score'], reverse=True)
     
+    top_performers = {
+        'diamond_hands': [p for p in profiles if p['behavior_pattern'] == 'diamond_paws'][:TOP_LIMIT],
+        'accumulators': [p for p in profiles if p['behavior_pattern'] in ACCUMULATOR_PATTERNS][:TOP_LIMIT],
+        'sellers': sorted([p for p in profiles if p['is_dumping']], key=lambda x: x['retention_rate'])[:TOP_LIMIT]
+    }
+    return profiles, stats, top_performers
+
+def _smallest(keys, positions, limit=TOP_LIMIT):
+    """Posições das `limit` menores chaves (empate: menor posição) via argpartition"""
+    if len(keys) > limit:
+        kth = keys[np.argpartition(keys, limit - 1)[limit - 1]]
+        keep = keys <= kth  # Mantém os empatados na fronteira
+        keys, positions = keys[keep], positions[keep]
+    return positions[np.lexsort((positions, keys))[:limit]]
+
+def _analyze_profiles_columnar(recipients, holders_map, spans):
+    """
+    Caminho colunar (NumPy): a classificação roda sobre arrays e os dicts
+    (com insights) só são montados na hora de emitir cada linha.
+    Produz exatamente o mesmo resultado de _analyze_profiles_loop.
+    """
+    count = len(recipients)
+    holders = [holders_map.get(recipient['address']) for recipient in recipients]
+    
+    airdrop = np.array([recipient['airdrop_amount'] for recipient in recipients], dtype=np.float64)
+    airdrop_rank = np.array([recipient.get('rank', 0) for recipient in recipients], dtype=np.int64)
+    held = np.array([holder is not None for holder in holders], dtype=bool)
+    balance = np.array([holder['current_balance'] if holder else 0 for holder in holders], dtype=np.float64)
+    current_rank = np.array([holder['current_rank'] if holder else 0 for holder in holders], dtype=np.int64)
+    recipient_spans = [spans.get(recipient['address']) for recipient in recipients]
+    days = np.array([holding_days(span) for span in recipient_spans], dtype=np.float64)
+    
+    # Métricas (mesmas fórmulas de calculate_behavior_metrics)
+    with_amount = held & (airdrop > 0)
+    safe_airdrop = np.where(airdrop > 0, airdrop, 1)
+    absolute_change = balance - airdrop
+    percentage_change = np.where(with_amount, absolute_change / safe_airdrop * 100, -100)
+    retention = np.where(with_amount, balance / safe_airdrop * 100, 0)
+    rank_change = np.where(held, airdrop_rank - current_rank, 0)
+    accumulation_rate = np.where(days > 0, absolute_change / np.where(days > 0, days, 1), 0)
+    
+    # Classificação: índice em BEHAVIOR_PATTERNS
+    conditions = behavior_conditions(percentage_change, retention)
+    pattern_index = np.select(conditions, np.arange(len(conditions)), default=len(conditions))
+    base_score = np.array([entry[3] for entry in BEHAVIOR_PATTERNS])[pattern_index]
+    adjustments = rank_adjustment_conditions(rank_change)
+    delta = np.select([matched for matched, _ in adjustments], [d for _, d in adjustments], default=0)
+    score = np.where(held, np.clip(base_score + delta, 0, 100), 0)
+    dumping = held & np.array([entry[4] for entry in BEHAVIOR_PATTERNS])[pattern_index]
+    pattern_index = np.where(held, pattern_index, len(BEHAVIOR_PATTERNS) - 1)  # Não holder: paper_hands
+    
+    # Estatísticas
+    stats = _new_stats(count)
+    stats['still_holding'] = int(np.count_nonzero(balance > 0))
+    stats['sold_everything'] = count - stats['still_holding']
+    stats['accumulated'] = int(np.count_nonzero(percentage_change > 0))
+    stats['dumping'] = int(np.count_nonzero(dumping))
+    diamond_index = next(i for i, entry in enumerate(BEHAVIOR_PATTERNS) if entry[0] == 'diamond_paws')
+    stats['diamond_hands'] = int(np.count_nonzero(pattern_index == diamond_index))
+    if count:
+        # by_pattern na ordem de primeira aparição (igual ao loop)
+        indexes, first_seen, totals = np.unique(pattern_index, return_index=True, return_counts=True)
+        for position in np.argsort(first_seen):
+            stats['by_pattern'][BEHAVIOR_PATTERNS[indexes[position]][0]] = int(totals[position])
+    
+    # Ordem de saída: diamond score decrescente, estável
+    order = np.argsort(-score, kind='stable')
+    
+    airdrop_amounts = [recipient['airdrop_amount'] for recipient in recipients]
+    percentage_values = percentage_change.tolist()
+    retention_values = retention.tolist()
+    rate_values = accumulation_rate.tolist()
+    pattern_values = pattern_index.tolist()
+    score_values = score.tolist()
+    dumping_values = dumping.tolist()
+    
+    def emit(row):
+        recipient, holder = recipients[row], holders[row]
+        pattern, category, detail, _, _ = BEHAVIOR_PATTERNS[pattern_values[row]]
+        profile = {
+            'address': recipient['address'],
+            'airdrop_rank': recipient.get('rank', 0),
+            'airdrop_amount': airdrop_amounts[row],
+            'receive_count': recipient['receive_count'],
+            'first_receive_block': recipient.get('first_receive_block') or (recipient_spans[row][0] if recipient_spans[row] else 0),
+            'first_receive_time': recipient.get('first_receive_time', ''),
+            'current_balance': 0,
+            'current_rank': None,
+            'absolute_change': 0,
+            'percentage_change': -100,
+            'retention_rate': 0,
+            'rank_change': None,
+            'behavior_pattern': 'paper_hands',
+            'behavior_category': 'Sold or Moved',
+            'accumulation_rate': 0,
+            'is_dumping': False,
+            'diamond_score': 0,
+            'insights': []
+        }
+        if holder is None:
+            return profile
+        profile['current_balance'] = holder['current_balance']
+        profile['current_rank'] = holder['current_rank']
+        profile['absolute_change'] = holder['current_balance'] - airdrop_amounts[row]
+        if airdrop_amounts[row] > 0:
+            profile['percentage_change'] = percentage_values[row]
+            profile['retention_rate'] = retention_values[row]
+        profile['rank_change'] = profile['airdrop_rank'] - holder['current_rank']
+        if days[row] > 0:
+            profile['accumulation_rate'] = rate_values[row]
+        profile['behavior_pattern'] = pattern
+        profile['behavior_category'] = category
+        profile['is_dumping'] = dumping_values[row]
+        profile['diamond_score'] = score_values[row]
+        profile['behavior_detail'] = detail
+        profile['insights'] = generate_insights(profile)
+        return profile
+    
+    profiles = [emit(row) for row in order.tolist()]
+    
+    # Top performers sem reordenar a lista inteira
+    ordered_pattern = pattern_index[order]
+    positions = np.arange(count)
+    accumulator_indexes = [i for i, entry in enumerate(BEHAVIOR_PATTERNS) if entry[0] in ACCUMULATOR_PATTERNS]
+    diamond_positions = positions[ordered_pattern == diamond_index][:TOP_LIMIT]
+    accumulator_positions = positions[np.isin(ordered_pattern, accumulator_indexes)][:TOP_LIMIT]
+    seller_mask = dumping[order]
+    seller_positions = _smallest(retention[order][seller_mask], positions[seller_mask])
+    
+    top_performers = {
+        'diamond_hands': [profiles[position] for position in diamond_positions.tolist()],
+        'accumulators': [profiles[position] for position in accumulator_positions.tolist()],
+        'sellers': [profiles[position] for position in seller_positions.tolist()]
+    }
+    return profiles, stats, top_performers
+
+def generate_behavioral_analysis(airdrop_data, holders_data):
+    """Gera análise comportamental completa"""
+    print("\nGerando análise comportamental...")
+    
+    recipients = airdrop_data.get('recipients', [])
+    holders_map = create_holders_map(holders_data)
+    
+    print(f"   {len(recipients):,} recipients do airdrop")
+    print(f"   {len(holders_map):,} holders atuais")
+    
+    spans = load_holding_spans(recipient['address'] for recipient in recipients)
+    print(f"   {len(spans):,} recipients com histórico de saldo")
+    
+    if np is not None:
+        profiles, stats, top_performers = _analyze_profiles_columnar(recipients, holders_map, spans)
+    else:
+        print("   ⚠️ NumPy não instalado, usando o caminho por perfil (mais lento)")
+        profiles, stats, top_performers = _analyze_profiles_loop(recipients, holders_map, spans)
+    
     # Calcular percentuais
-    total = stats['total_analyzed']
-    stats['retention_rate'] = (stats['still_holding'] / total * 100) if total > 0 else 0
-    stats['accumulator_rate'] = (stats['accumulated'] / total * 100) if total > 0 else 0
-    stats['dumper_rate'] = (stats['dumping'] / total * 100) if total > 0 else 0
+    update_rates(stats)
     
     print(f"\nAnálise comportamental completa!")
     print(f"   Diamond Hands: {stats['diamond_hands']:,}")
@@ -322,46 +481,238 @@ def generate_behavioral_analysis(airdrop_data, holders_data):
     print(f"   Dumpers: {stats['dumping']:,}")
     print(f"   Paper Hands: {stats['sold_everything']:,}")
     
-    return profiles, stats
+    return profiles, stats, top_performers
 
-def save_behavioral_analysis(profiles, stats, airdrop_data):
-    """Salva análise comportamental"""
-    print(f"\nSalvando análise em {OUTPUT_FILE}...")
+def encode_profile(profile):
+    """Linha do perfil em all_profiles: um perfil por linha, pelo encoder em C
+    (com indent o json cai no encoder em Python, ~10x mais lento)"""
+    return '    ' + json.dumps(profile)
+
+def write_behavioral_analysis(profiles, stats, top_performers, rows=None):
+    """Grava o arquivo de análise (tmp + replace: a API nunca lê arquivo pela metade)
     
+    `rows`: textos já codificados de cada perfil (encode_profile), na ordem de
+    `profiles`; a atualização incremental só recodifica as linhas que mudaram.
+    """
     OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
     
-    # Top performers
-    top_diamond_paws = [p for p in profiles if p['behavior_pattern'] == 'diamond_paws'][:50]
-    top_accumulators = [p for p in profiles if p['behavior_pattern'] in ['satoshi_visionary', 'btc_maximalist', 'rune_master', 'ordinal_believer', 'dog_legend']][:50]
-    biggest_sellers = sorted([p for p in profiles if p['is_dumping']], 
-                            key=lambda x: x['retention_rate'])[:50]
-    
     output_data = {
         'timestamp': datetime.now().isoformat(),
         'analysis_type': 'forensic_behavioral',
         'statistics': stats,
-        'top_performers': {
-            'diamond_hands': top_diamond_paws,  # Mantém nome da chave para compatibilidade
-            'accumulators': top_accumulators,
-            'sellers': biggest_sellers
-        },
-        'all_profiles': profiles
+        'top_performers': top_performers,  # 'diamond_hands' mantém nome da chave para compatibilidade
     }
-    
-    with open(OUTPUT_FILE, 'w') as f:
-        json.dump(output_data, f, indent=2)
+    if rows is None:
+        rows = [encode_profile(profile) for profile in profiles]
+    
+    temp_file = OUTPUT_FILE.with_suffix('.json.tmp')
+    with open(temp_file, 'w') as f:
+        f.write(json.dumps(output_data, indent=2)[:-2])  # Sem o '\n}' final
+        if rows:
+            f.write(',\n  "all_profiles": [\n')
+            f.write(',\n'.join(rows))
+            f.write('\n  ]\n}')
+        else:
+            f.write(',\n  "all_profiles": []\n}')
+    temp_file.replace(OUTPUT_FILE)
+
+def save_behavioral_analysis(profiles, stats, top_performers):
+    """Salva análise comportamental"""
+    print(f"\nSalvando análise em {OUTPUT_FILE}...")
+    write_behavioral_analysis(profiles, stats, top_performers)
     
     print(f"{len(profiles):,} perfis comportamentais salvos!")
     
     # Mostrar top insights
     print(f"\nTOP 10 DIAMOND PAWS 🐾:")
-    for i, p in enumerate(top_diamond_paws[:10]):
+    for i, p in enumerate(top_performers['diamond_hands'][:10]):
         print(f"   #{i+1}: {p['address'][:30]}... - Score: {p['diamond_score']} - {p['behavior_category']}")
     
     print(f"\nTOP 10 ACCUMULATORS:")
-    for i, p in enumerate(top_accumulators[:10]):
+    for i, p in enumerate(top_performers['accumulators'][:10]):
         print(f"   #{i+1}: {p['address'][:30]}... - Change: +{p['percentage_change']:.1f}% - {p['behavior_category']}")
 
+# === Atualização incremental (por bloco) =====================================
+
+# Top performers: filtro de cada lista. A ordem é a do caminho completo
+# (diamond score decrescente, empate na ordem dos recipients); sellers
+# ordenam antes por retention_rate
+TOP_LIST_FILTERS = {
+    'diamond_hands': lambda p: p['behavior_pattern'] == 'diamond_paws',
+    'accumulators': lambda p: p['behavior_pattern'] in ACCUMULATOR_PATTERNS,
+    'sellers': lambda p: p['is_dumping'],
+}
+
+class IncrementalBehaviorAnalysis:
+    """
+    Análise forense residente, atualizada a cada bloco pelo pipeline.
+    
+    O pipeline passa o conjunto de endereços cujo saldo mudou no bloco;
+    só os perfis desses recipients são recalculados, junto com os que
+    mudaram de posição no ranking. Um rank só muda entre a menor e a maior
+    posição (antes/depois) dos endereços alterados, então só essa faixa dos
+    holders é conferida. As estatísticas são ajustadas pela diferença entre
+    perfil antigo e novo, e só as listas de top performers que continham ou
+    passam a conter um perfil alterado são refeitas.
+    
+    A ordem de saída fica num índice ordenado por (-diamond_score, posição)
+    e o texto JSON de cada perfil fica em cache: a gravação só recodifica
+    os perfis que mudaram.
+    """
+    
+    def __init__(self, airdrop_data):
+        self.airdrop_data = airdrop_data
+        self.recipients = airdrop_data.get('recipients', [])
+        self.index = {recipient['address']: i for i, recipient in enumerate(self.recipients)}
+        self.profiles = []  # Paralelo a self.recipients
+        self.rows = []  # Texto de cada perfil (encode_profile); None = recodificar
+        self.order = []  # (-diamond_score, i) em ordem de saída
+        self.holder_ranks = None  # Endereço -> rank no bloco anterior
+        self.stats = None
+        self.top_performers = None
+        self.resync = False
+    
+    @classmethod
+    def open(cls, holders):
+        """Análise pronta para atualizar; None se não houver dados do airdrop"""
+        airdrop_data = load_json(AIRDROP_DATA_FILE)
+        if not airdrop_data:
+            return None
+        analysis = cls(airdrop_data)
+        if not analysis.load_saved():
+            analysis.rebuild(holders)
+        return analysis
+    
+    def _reset_order(self):
+        self.rows = [None] * len(self.profiles)
+        self.order = sorted((-profile['diamond_score'], i) for i, profile in enumerate(self.profiles))
+    
+    def load_saved(self):
+        """Retoma a análise gravada se ela cobre os mesmos recipients"""
+        saved = load_json(OUTPUT_FILE) if OUTPUT_FILE.exists() else None
+        if not saved:
+            return False
+        by_address = {profile['address']: profile for profile in saved.get('all_profiles', [])}
+        if len(by_address) != len(self.recipients) or any(address not in by_address for address in self.index):
+            return False
+        
+        self.profiles = [by_address[recipient['address']] for recipient in self.recipients]
+        self._reset_order()
+        self.stats = saved['statistics']
+        self.top_performers = {name: self._top(name) for name in TOP_LIST_FILTERS}
+        self.resync = True  # O arquivo pode estar atrás dos holders atuais
+        return True
+    
+    def rebuild(self, holders):
+        """Cálculo completo (primeira execução ou recipients diferentes do arquivo)"""
+        profiles, self.stats, self.top_performers = generate_behavioral_analysis(self.airdrop_data, {'holders': holders})
+        by_address = {profile['address']: profile for profile in profiles}
+        self.profiles = [by_address[recipient['address']] for recipient in self.recipients]
+        self._reset_order()
+        self.holder_ranks = {holder['address']: rank for rank, holder in enumerate(holders, start=1)}
+        self.resync = False
+        self._write()
+    
+    def _order_key(self, i):
+        return (-self.profiles[i]['diamond_score'], i)
+    
+    def _top(self, name):
+        matches = TOP_LIST_FILTERS[name]
+        if name == 'sellers':
+            candidates = (i for i, profile in enumerate(self.profiles) if matches(profile))
+            key = lambda i: (self.profiles[i]['retention_rate'],) + self._order_key(i)
+            return [self.profiles[i] for i in heapq.nsmallest(TOP_LIMIT, candidates, key=key)]
+        # Já na ordem de saída: para nos primeiros TOP_LIMIT
+        top = []
+        for _, i in self.order:
+            if matches(self.profiles[i]):
+                top.append(self.profiles[i])
+                if len(top) == TOP_LIMIT:
+                    break
+        return top
+    
+    def _stale(self, holders, ranks, changed_addresses):
+        """Recipients cujo rank (ou, após carregar o arquivo, o saldo) não bate com os holders"""
+        if self.resync or self.holder_ranks is None:
+            stale = set()
+            for i, profile in enumerate(self.profiles):
+                rank = ranks.get(profile['address'])
+                if rank != profile['current_rank']:
+                    stale.add(i)
+                elif self.resync and rank and holders[rank - 1].get('total_dog', 0) != profile['current_balance']:
+                    stale.add(i)
+            return stale
+        
+        # Faixa de ranks que pode ter se deslocado (endereço novo ou que zerou: até o fim)
+        end = len(holders) + 1
+        low, high = end, 0
+        for address in changed_addresses:
+            before, after = self.holder_ranks.get(address, end), ranks.get(address, end)
+            if before != after:
+                low, high = min(low, before, after), max(high, before, after)
+        stale = set()
+        for rank in range(low, min(high, len(holders)) + 1):
+            i = self.index.get(holders[rank - 1]['address'])
+            if i is not None and self.profiles[i]['current_rank'] != rank:
+                stale.add(i)
+        return stale
+    
+    def _write(self):
+        for i, row in enumerate(self.rows):
+            if row is None:
+                self.rows[i] = encode_profile(self.profiles[i])
+        ordered = [i for _, i in self.order]
+        write_behavioral_analysis(
+            [self.profiles[i] for i in ordered], self.stats, self.top_performers,
+            rows=[self.rows[i] for i in ordered],
+        )
+    
+    def update(self, changed_addresses, holders):
+        """Recalcula os perfis afetados pelo bloco e grava. Retorna quantos perfis mudaram"""
+        ranks = {holder['address']: rank for rank, holder in enumerate(holders, start=1)}
+        dirty = {self.index[address] for address in changed_addresses if address in self.index}
+        dirty |= self._stale(holders, ranks, changed_addresses)
+        self.holder_ranks = ranks
+        self.resync = False
+        
+        # Mapa de holders só dos recipients recalculados
+        addresses = [self.recipients[i]['address'] for i in dirty]
+        holders_map = {address: holder_entry(holders[ranks[address] - 1], ranks[address]) for address in addresses if address in ranks}
+        spans = load_holding_spans(addresses)
+        touched_lists = set()
+        moved = []  # (posição no índice de ordem, nova chave)
+        updated = 0
+        for i in dirty:
+            old = self.profiles[i]
+            new = calculate_behavior_metrics(self.recipients[i], holders_map, spans)
+            if new == old:
+                continue
+            count_profile(self.stats, old, -1)
+            count_profile(self.stats, new)
+            touched_lists.update(name for name, matches in TOP_LIST_FILTERS.items() if matches(old) or matches(new))
+            if new['diamond_score'] != old['diamond_score']:
+                moved.append((bisect.bisect_left(self.order, (-old['diamond_score'], i)), (-new['diamond_score'], i)))
+            self.profiles[i] = new
+            self.rows[i] = None
+            updated += 1
+        
+        if not updated:
+            return 0
+        
+        # Troca as chaves no lugar e reordena: com poucas chaves fora do lugar
+        # o timsort é praticamente linear
+        for position, key in moved:
+            self.order[position] = key
+        if moved:
+            self.order.sort()
+        
+        update_rates(self.stats)
+        for name in touched_lists:
+            self.top_performers[name] = self._top(name)
+        
+        self._write()
+        return updated
+
 def main():
     print("="*80)
     print("ANALISADOR COMPORTAMENTAL FORENSE")
@@ -384,10 +735,10 @@ def main():
     print(f"{holders_data.get('total_holders', 0):,} holders carregados")
     
     # 3. Gerar análise comportamental
-    profiles, stats = generate_behavioral_analysis(airdrop_data, holders_data)
+    profiles, stats, top_performers = generate_behavioral_analysis(airdrop_data, holders_data)
     
     # 4. Salvar resultado
-    save_behavioral_analysis(profiles, stats, airdrop_data)
+    save_behavioral_analysis(profiles, stats, top_performers)
     
     print("\n" + "="*80)
     print("ANÁLISE COMPORTAMENTAL COMPLETA!")
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Cliente HTTP compartilhado para as APIs externas (Xverse, Unisat,
+mempool.space, Blockstream)
+
+- Uma requests.Session por host, com pool de conexões (HTTP_POOL_SIZE)
+- Token bucket por API compartilhado entre processos
+  (rate_limiter.SharedTokenBucket, estado em data/http_buckets/)
+- 429: backoff adaptativo no bucket + Retry-After; erros de rede e 5xx
+  são retentados
+- Cache de respostas em disco (SQLite, data/http_cache.db) com ETag /
+  Last-Modified: dentro do `ttl` a resposta é reaproveitada sem rede;
+  depois disso vira requisição condicional (304 reaproveita o corpo)
+
+Uso:
+    from http_client import HTTP, FOREVER
+    response = HTTP.get("https://blockstream.info/api/address/bc1.../txs", ttl=FOREVER)
+    if response.status_code == 200:
+        txs = response.json()
+
+HTTP_CACHE_REFRESH=1 força revalidação de tudo (ignora o ttl).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rate_limiter import SharedTokenBucket
+
+BASE_DIR = Path(__file__).parent.parent
+HTTP_CACHE_DB = Path(os.getenv("HTTP_CACHE_DB", str(BASE_DIR / "data" / "http_cache.db")))
+HTTP_BUCKETS_DIR = BASE_DIR / "data" / "http_buckets"
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+HTTP_CACHE_REFRESH = os.getenv("HTTP_CACHE_REFRESH") == "1"
+FOREVER = float("inf")  # respostas imutáveis (histórico on-chain)
+
+# host -> (nome da API, req/s)
+API_LIMITS = {
+    "api.secretkeylabs.io": ("xverse", float(os.getenv("XVERSE_RATE_PER_SEC", "4"))),
+    "open-api.unisat.io": ("unisat", float(os.getenv("UNISAT_RATE_PER_SEC", "2"))),
+    "mempool.space": ("mempool", float(os.getenv("MEMPOOL_RATE_PER_SEC", "2"))),
+    "blockstream.info": ("blockstream", float(os.getenv("BLOCKSTREAM_RATE_PER_SEC", "5"))),
+    "127.0.0.1": ("ord", float(os.getenv("ORD_RATE_PER_SEC", "50"))),  # servidor local do ord
+}
+DEFAULT_RATE_PER_SEC = 2.0
+
+
+class HttpResponse:
+    """Resposta mínima (status, headers, corpo), vinda da rede ou do cache"""
+
+    def __init__(self, status_code: int, content: bytes, headers: Optional[Dict[str, str]] = None, from_cache: bool = False):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"HTTP {self.status_code}", response=self)
+
+
+class HttpClient:
+    def __init__(self, cache_path: Optional[Path] = HTTP_CACHE_DB):
+        self.sessions: Dict[str, requests.Session] = {}
+        self.limiters: Dict[str, SharedTokenBucket] = {}
+        self.lock = threading.Lock()
+
+        self.network = 0
+        self.replayed = 0
+        self.revalidated = 0
+
+        self.cache = None
+        if cache_path:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            self.cache = sqlite3.connect(str(cache_path), check_same_thread=False)
+            self.cache.execute("PRAGMA journal_mode=WAL")
+            self.cache.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, body BLOB NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            self.cache.commit()
+
+    # === Sessões e limites ==================================================
+
+    def session_for(self, host: str) -> requests.Session:
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["User-Agent"] = "DogData/1.0"
+                self.sessions[host] = session
+            return session
+
+    def limiter_for(self, url: str) -> SharedTokenBucket:
+        host = urlsplit(url).hostname or url
+        with self.lock:
+            limiter = self.limiters.get(host)
+            if limiter is None:
+                name, rate = API_LIMITS.get(host, (host, DEFAULT_RATE_PER_SEC))
+                limiter = SharedTokenBucket(HTTP_BUCKETS_DIR / f"{name}.json", rate)
+                self.limiters[host] = limiter
+            return limiter
+
+    # === Cache ==============================================================
+
+    @staticmethod
+    def cache_key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        return f"{url}?{urlencode(sorted(params.items()))}" if params else url
+
+    def _cached(self, key: str):
+        if self.cache is None:
+            return None
+        with self.lock:
+            return self.cache.execute(
+                "SELECT etag, last_modified, body, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+    def _store(self, key: str, etag: Optional[str], last_modified: Optional[str], body: bytes) -> None:
+        if self.cache is None:
+            return
+        with self.lock:
+            self.cache.execute(
+                "INSERT OR REPLACE INTO responses (key, etag, last_modified, body, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                (key, etag, last_modified, body, time.time()),
+            )
+            self.cache.commit()
+
+    # === Requisições ========================================================
+
+    def get(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        ttl: float = 0,
+        timeout: float = 30,
+        retries: int = 3,
+    ) -> HttpResponse:
+        """GET com cache/ETag, rate limit por API e retentativas.
+
+        `ttl` (segundos): dentro dele a resposta em cache é devolvida sem rede.
+        """
+        key = self.cache_key(url, params)
+        cached = self._cached(key)
+        if cached and not HTTP_CACHE_REFRESH and time.time() - cached[3] < ttl:
+            self.replayed += 1
+            return HttpResponse(200, cached[2], from_cache=True)
+
+        request_headers = dict(headers or {})
+        if cached:
+            if cached[0]:
+                request_headers["If-None-Match"] = cached[0]
+            if cached[1]:
+                request_headers["If-Modified-Since"] = cached[1]
+
+        session = self.session_for(urlsplit(url).hostname or url)
+        limiter = self.limiter_for(url)
+
+        for attempt in range(1, retries + 1):
+            try:
+                limiter.acquire()
+                self.network += 1
+                response = session.get(url, params=params, headers=request_headers, timeout=timeout)
+            except requests.RequestException as exc:
+                if attempt == retries:
+                    raise
+                wait = attempt * 2
+                print(f"  ⚠️ Erro HTTP (tentativa {attempt}/{retries}): {exc}. Retentando em {wait}s...")
+                time.sleep(wait)
+                continue
+
+            if response.status_code == 429:
+                # Backoff adaptativo: a taxa do bucket (compartilhada) cai pela metade
+                limiter.penalize()
+                retry_after = response.headers.get("Retry-After", "")
+                wait = int(retry_after) if retry_after.isdigit() else min(5, attempt * 2)
+                print(f"  ⏳ Rate limit (429) em {urlsplit(url).hostname}. Taxa {limiter.rate:.1f} req/s, aguardando {wait}s...")
+                time.sleep(wait)
+                continue
+
+            if response.status_code >= 500 and attempt < retries:
+                time.sleep(attempt * 2)
+                continue
+
+            limiter.reward()
+
+            if response.status_code == 304 and cached:
+                self.revalidated += 1
+                self._store(key, cached[0], cached[1], cached[2])
+                return HttpResponse(200, cached[2], dict(response.headers), from_cache=True)
+
+            if response.status_code == 200:
+                self._store(key, response.headers.get("ETag"), response.headers.get("Last-Modified"), response.content)
+            return HttpResponse(response.status_code, response.content, dict(response.headers))
+
+        return HttpResponse(429, b"", {})
+
+    def summary(self) -> str:
+        return f"{self.network} requisições de rede | {self.replayed} do cache | {self.revalidated} revalidadas (304)"
+
+
+HTTP = HttpClient()
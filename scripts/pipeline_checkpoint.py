@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Checkpoint binário do estado do pipeline daemon (restart a quente)
+
+Gravado a cada fronteira de bloco em data/pipeline_checkpoint.bin e lido
+via mmap no restart, em vez de rodar `ord balances` e resolver todos os
+endereços de novo.
+
+FORMATO (little-endian, seções em ordem):
+    header   : magic(8) version height n_utxos n_addresses n_holders n_blocks
+    utxos    : n_utxos × (txid[32] vout:u32 amount:u64 address_idx:u32)
+               ordenados por (txid, vout) → busca binária direto no mmap
+    addr_off : (n_addresses + 1) × u32   (offsets no blob de endereços)
+    addr_blob: endereços UTF-8 concatenados
+    holders  : n_holders × (address_idx:u32 total_amount:u64 utxo_count:u32 rank:u32)
+    blocks   : n_blocks × (height:u32 hash[32])   (últimos N blocos, p/ detectar reorg)
+"""
+
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+MAGIC = b'DOGCKPT1'
+VERSION = 1
+HEADER = struct.Struct('<8s6I')
+UTXO_RECORD = struct.Struct('<32sIQI')
+OFFSET = struct.Struct('<I')
+HOLDER_RECORD = struct.Struct('<IQII')
+BLOCK_RECORD = struct.Struct('<I32s')
+NO_ADDRESS = 0xFFFFFFFF
+
+
+def write_checkpoint(
+    path: Path,
+    height: int,
+    dog_utxos: Dict[str, Dict],
+    address_cache: Dict[str, str],
+    holders: List[Dict],
+    block_hashes: List[Tuple[int, str]],
+) -> int:
+    """Grava o checkpoint de forma atômica. Retorna o tamanho em bytes"""
+    addresses: List[str] = []
+    address_index: Dict[str, int] = {}
+
+    def index_of(address: Optional[str]) -> int:
+        if not address:
+            return NO_ADDRESS
+        idx = address_index.get(address)
+        if idx is None:
+            idx = address_index[address] = len(addresses)
+            addresses.append(address)
+        return idx
+
+    utxo_rows = []
+    for outpoint, data in dog_utxos.items():
+        txid, vout = outpoint.split(':')
+        utxo_rows.append((bytes.fromhex(txid), int(vout), int(data['amount']), index_of(address_cache.get(outpoint))))
+    utxo_rows.sort()
+
+    holder_rows = [
+        (index_of(h['address']), h['total_amount'], h['utxo_count'], h['rank'])
+        for h in holders
+    ]
+
+    encoded = [a.encode('utf-8') for a in addresses]
+    offsets = [0]
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+
+    temp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, height, len(utxo_rows), len(addresses), len(holder_rows), len(block_hashes)))
+        for row in utxo_rows:
+            f.write(UTXO_RECORD.pack(*row))
+        for offset in offsets:
+            f.write(OFFSET.pack(offset))
+        f.write(b''.join(encoded))
+        for row in holder_rows:
+            f.write(HOLDER_RECORD.pack(*row))
+        for block_height, block_hash in block_hashes:
+            f.write(BLOCK_RECORD.pack(block_height, bytes.fromhex(block_hash)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return path.stat().st_size
+
+
+class PipelineCheckpoint:
+    """Leitura do checkpoint via mmap (sem desserializar o arquivo inteiro)"""
+
+    def __init__(self, path: Path):
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.height, self.n_utxos, self.n_addresses, self.n_holders, self.n_blocks = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Checkpoint inválido ou de versão diferente: {path}")
+
+        self._utxo_start = HEADER.size
+        self._offsets_start = self._utxo_start + self.n_utxos * UTXO_RECORD.size
+        self._blob_start = self._offsets_start + (self.n_addresses + 1) * OFFSET.size
+        blob_size = OFFSET.unpack_from(self._map, self._offsets_start + self.n_addresses * OFFSET.size)[0]
+        self._holders_start = self._blob_start + blob_size
+        self._blocks_start = self._holders_start + self.n_holders * HOLDER_RECORD.size
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def address(self, idx: int) -> Optional[str]:
+        if idx == NO_ADDRESS:
+            return None
+        start, end = struct.unpack_from('<2I', self._map, self._offsets_start + idx * OFFSET.size)
+        return self._map[self._blob_start + start:self._blob_start + end].decode('utf-8')
+
+    def lookup_utxo(self, outpoint: str) -> Optional[Tuple[int, Optional[str]]]:
+        """(amount, endereço) de um UTXO via busca binária no mmap"""
+        txid, vout = outpoint.split(':')
+        key = (bytes.fromhex(txid), int(vout))
+        lo, hi = 0, self.n_utxos
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = UTXO_RECORD.unpack_from(self._map, self._utxo_start + mid * UTXO_RECORD.size)
+            if (row[0], row[1]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_utxos:
+            row = UTXO_RECORD.unpack_from(self._map, self._utxo_start + lo * UTXO_RECORD.size)
+            if (row[0], row[1]) == key:
+                return row[2], self.address(row[3])
+        return None
+
+    def block_hashes(self) -> List[Tuple[int, str]]:
+        return [
+            (height, block_hash.hex())
+            for height, block_hash in BLOCK_RECORD.iter_unpack(
+                self._map[self._blocks_start:self._blocks_start + self.n_blocks * BLOCK_RECORD.size]
+            )
+        ]
+
+    def load_state(self) -> Tuple[Dict[str, Dict], Dict[str, str], List[Dict]]:
+        """Reconstrói (dog_utxos, address_cache, holders) para o daemon"""
+        addresses = [self.address(i) for i in range(self.n_addresses)]
+
+        dog_utxos: Dict[str, Dict] = {}
+        address_cache: Dict[str, str] = {}
+        utxo_bytes = self._map[self._utxo_start:self._offsets_start]
+        for txid, vout, amount, address_idx in UTXO_RECORD.iter_unpack(utxo_bytes):
+            outpoint = f"{txid.hex()}:{vout}"
+            dog_utxos[outpoint] = {'amount': amount}
+            if address_idx != NO_ADDRESS:
+                address_cache[outpoint] = addresses[address_idx]
+
+        holders = []
+        holder_bytes = self._map[self._holders_start:self._blocks_start]
+        for address_idx, total_amount, utxo_count, rank in HOLDER_RECORD.iter_unpack(holder_bytes):
+            holders.append({
+                'address': addresses[address_idx],
+                'total_amount': total_amount,
+                'total_dog': total_amount / 100000,
+                'utxo_count': utxo_count,
+                'rank': rank,
+            })
+
+        return dog_utxos, address_cache, holders
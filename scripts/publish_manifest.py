@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Manifesto de publicação: evita regravar arquivos e reenviar chaves sem mudança
+
+- Cada artefato publicado (arquivo JSON ou chave Redis) tem o digest do
+  último conteúdo publicado em data/publish_manifest.json
+- Arquivos guardam também mtime e tamanho do que foi gravado: se outro
+  writer mexeu no arquivo, o skip não vale e o conteúdo é regravado
+- Campos voláteis (timestamp, last_update, last_updated) ficam fora do
+  digest: só mudar o horário não conta como mudança
+- Escrita de arquivos é atômica (tmp + os.replace)
+- Contadores de gravados/inalterados para o resumo de cada ciclo
+
+Uso:
+    from publish_manifest import MANIFEST
+    MANIFEST.write_json(path, payload, indent=2)   # False se nada mudou
+    print(MANIFEST.summary()); MANIFEST.reset_counts()
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+BASE_DIR = Path(__file__).parent.parent
+MANIFEST_FILE = BASE_DIR / 'data' / 'publish_manifest.json'
+VOLATILE_KEYS = ('timestamp', 'last_update', 'last_updated')
+
+
+def content_digest(payload: Any, volatile: Iterable[str] = VOLATILE_KEYS) -> str:
+    """sha256 do JSON canônico, ignorando as chaves voláteis do nível de cima"""
+    if isinstance(payload, dict):
+        volatile = set(volatile)
+        payload = {k: v for k, v in payload.items() if k not in volatile}
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class PublishManifest:
+    def __init__(self, path: Path = MANIFEST_FILE):
+        self.path = path
+        # Chave Redis: digest; arquivo: [digest, mtime_ns, tamanho]
+        self.digests: Dict[str, Union[str, List[Any]]] = {}
+        self.mtime: Optional[float] = None
+        self.lock = threading.Lock()
+        self.writes = 0
+        self.skips = 0
+
+    def _refresh(self) -> None:
+        """Relê o manifesto se outro processo o alterou"""
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return
+        if mtime == self.mtime:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                self.digests = json.load(f)
+            self.mtime = mtime
+        except (OSError, ValueError):
+            pass
+
+    def _save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.path.with_suffix('.json.tmp')
+        with open(temp_file, 'w') as f:
+            json.dump(self.digests, f, indent=1, sort_keys=True)
+        os.replace(temp_file, self.path)
+        self.mtime = self.path.stat().st_mtime
+
+    @staticmethod
+    def artifact_name(path: Path) -> str:
+        path = Path(path).resolve()
+        try:
+            return str(path.relative_to(BASE_DIR.resolve()))
+        except ValueError:
+            return str(path)
+
+    @staticmethod
+    def file_stamp(path: Path) -> Optional[List[int]]:
+        """[mtime_ns, tamanho] do arquivo em disco (None se não existe)"""
+        try:
+            stat = Path(path).stat()
+        except OSError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def is_current(self, name: str, digest: str, stamp: Optional[List[int]] = None) -> bool:
+        expected = digest if stamp is None else [digest] + stamp
+        with self.lock:
+            self._refresh()
+            return self.digests.get(name) == expected
+
+    def record(self, name: str, digest: str, stamp: Optional[List[int]] = None) -> None:
+        with self.lock:
+            self._refresh()
+            self.digests[name] = digest if stamp is None else [digest] + stamp
+            self._save()
+
+    def skip(self, name: str, digest: str, stamp: Optional[List[int]] = None) -> bool:
+        """True (e conta como inalterado) se o artefato já foi publicado com esse digest"""
+        if self.is_current(name, digest, stamp):
+            self.skips += 1
+            return True
+        return False
+
+    def published(self, name: str, digest: str, stamp: Optional[List[int]] = None) -> None:
+        self.record(name, digest, stamp)
+        self.writes += 1
+
+    def write_json(self, path: Path, payload: Any, digest: Optional[str] = None, force: bool = False, **dump_kwargs) -> bool:
+        """Grava `payload` em `path` só se o conteúdo mudou (ou `force`). Retorna True se gravou
+
+        O skip só vale se o arquivo em disco ainda é o que este manifesto gravou.
+        """
+        path = Path(path)
+        name = self.artifact_name(path)
+        digest = digest or content_digest(payload)
+        stamp = self.file_stamp(path)
+        if not force and stamp is not None and self.skip(name, digest, stamp):
+            return False
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = path.with_suffix(path.suffix + '.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, **dump_kwargs)
+        os.replace(temp_file, path)
+        self.published(name, digest, self.file_stamp(path))
+        return True
+
+    def reset_counts(self) -> None:
+        self.writes = 0
+        self.skips = 0
+
+    def summary(self) -> str:
+        return f"{self.writes} gravados, {self.skips} inalterados (pulados)"
+
+
+MANIFEST = PublishManifest()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Token bucket thread-safe com backoff adaptativo (AIMD)
+
+- `acquire()` bloqueia até haver token; a taxa (tokens/s) segue a cota da API
+- `penalize()` em cada 429: taxa cai pela metade e o balde é esvaziado
+- `reward()` em cada sucesso: taxa volta aos poucos até o máximo
+- `SharedTokenBucket`: mesmo balde compartilhado entre processos (estado em
+  arquivo com flock), para scripts diferentes respeitarem a mesma cota
+
+Uso:
+    from rate_limiter import TokenBucket
+    limiter = TokenBucket(rate=4, capacity=4)
+    limiter.acquire()
+    response = session.get(...)
+    limiter.penalize() if response.status_code == 429 else limiter.reward()
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: cai para o balde por processo
+    fcntl = None
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None, min_rate: Optional[float] = None):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = float(min_rate) if min_rate else max(self.max_rate / 16, 0.1)
+        self.capacity = float(capacity) if capacity else max(self.max_rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+        self.acquired = 0
+        self.throttled = 0
+        self.waited = 0.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Consome `tokens`, esperando o necessário. Retorna o tempo esperado"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    self.acquired += 1
+                    self.waited += waited
+                    return waited
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+    def penalize(self) -> None:
+        """429 recebido: reduz a taxa pela metade e esvazia o balde"""
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+            self.updated = time.monotonic()
+            self.throttled += 1
+
+    def reward(self) -> None:
+        """Sucesso: recupera a taxa em passos de 10% do máximo"""
+        if self.rate >= self.max_rate:
+            return
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.1)
+
+    def summary(self) -> str:
+        return (
+            f"{self.acquired} requisições | taxa atual {self.rate:.1f}/{self.max_rate:.1f} req/s | "
+            f"429s: {self.throttled} | espera total {self.waited:.1f}s"
+        )
+
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket com estado em arquivo, compartilhado entre processos"""
+
+    def __init__(self, path: Path, rate: float, capacity: Optional[float] = None, min_rate: Optional[float] = None):
+        super().__init__(rate, capacity, min_rate)
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _shared_state(self):
+        with self.lock, open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or '{}')
+                except ValueError:
+                    state = {}
+                now = time.time()
+                rate = min(float(state.get('rate', self.max_rate)), self.max_rate)
+                tokens = float(state.get('tokens', self.capacity))
+                updated = float(state.get('updated', now))
+                state = {'rate': rate, 'tokens': min(self.capacity, tokens + max(now - updated, 0) * rate), 'updated': now}
+
+                yield state
+
+                self.rate = state['rate']
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        if fcntl is None:
+            return super().acquire(tokens)
+        waited = 0.0
+        while True:
+            with self._shared_state() as state:
+                if state['tokens'] >= tokens:
+                    state['tokens'] -= tokens
+                    self.acquired += 1
+                    self.waited += waited
+                    return waited
+                wait = (tokens - state['tokens']) / state['rate']
+            time.sleep(wait)
+            waited += wait
+
+    def penalize(self) -> None:
+        if fcntl is None:
+            return super().penalize()
+        with self._shared_state() as state:
+            state['rate'] = max(self.min_rate, state['rate'] / 2)
+            state['tokens'] = 0.0
+        self.throttled += 1
+
+    def reward(self) -> None:
+        if fcntl is None:
+            return super().reward()
+        if self.rate >= self.max_rate:
+            return
+        with self._shared_state() as state:
+            state['rate'] = min(self.max_rate, state['rate'] + self.max_rate * 0.1)
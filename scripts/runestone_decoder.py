@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Decoder nativo de runestones e alocação de edicts (sem `ord decode`)
+
+- Lê o runestone direto do scriptPubKey (OP_RETURN OP_13 + pushes), com
+  os inteiros em LEB128, como no protocolo de runes do ord
+- `allocate()` aplica os edicts ao saldo de entrada de uma rune e devolve a
+  quantia exata (unidades base) de cada output, seguindo as regras do ord:
+  edict com output == nº de outputs divide entre os outputs não OP_RETURN,
+  amount 0 = todo o saldo restante, sobra vai para o pointer (ou o primeiro
+  output não OP_RETURN), cenotaph queima tudo
+- Sem saldo de entrada conhecido, assume que as entradas cobrem os edicts
+  explícitos; edicts com amount 0 ficam sem valor e o resultado sai como
+  não exato
+
+Uso:
+    from runestone_decoder import DOG_RUNE_ID, allocate, find_runestone
+    scripts = [vout['scriptPubKey']['hex'] for vout in tx['vout']]
+    runestone = find_runestone(scripts)
+    allocation = allocate(runestone, scripts, balance=None)
+    allocation.outputs   # {vout: quantia em unidades base}
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+DOG_RUNE_ID = (840000, 3)
+RUNESTONE_PREFIX = '6a5d'  # OP_RETURN OP_13
+
+# Tags do protocolo (pares tag/valor antes do corpo de edicts)
+TAG_BODY = 0
+TAG_FLAGS = 2
+TAG_MINT = 20
+TAG_POINTER = 22
+KNOWN_TAGS = {0, 1, 2, 3, 4, 5, 6, 8, 10, 12, 14, 16, 18, 20, 22, 127}
+KNOWN_FLAGS = 0b111  # etching, terms, turbo
+MAX_U128 = (1 << 128) - 1
+
+
+class Edict(NamedTuple):
+    rune_id: Tuple[int, int]
+    amount: int
+    output: int
+
+
+class Runestone(NamedTuple):
+    edicts: List[Edict]
+    pointer: Optional[int] = None
+    mint: Optional[Tuple[int, int]] = None
+    cenotaph: bool = False
+
+
+class Allocation(NamedTuple):
+    outputs: Dict[int, int]
+    burned: int = 0
+    exact: bool = True
+
+
+# === Decode ==================================================================
+
+def _payload(script: bytes) -> Optional[bytes]:
+    """Concatena os pushes depois de OP_RETURN OP_13. None se houver opcode que não é push"""
+    data, i = bytearray(), 2
+    while i < len(script):
+        opcode = script[i]
+        i += 1
+        if opcode <= 75:
+            size = opcode
+        elif opcode == 0x4c:
+            size, i = script[i], i + 1
+        elif opcode == 0x4d:
+            size, i = int.from_bytes(script[i:i + 2], 'little'), i + 2
+        elif opcode == 0x4e:
+            size, i = int.from_bytes(script[i:i + 4], 'little'), i + 4
+        else:
+            return None
+        if i + size > len(script):
+            return None
+        data += script[i:i + size]
+        i += size
+    return bytes(data)
+
+
+def _varints(payload: bytes) -> Optional[List[int]]:
+    values, value, shift = [], 0, 0
+    for byte in payload:
+        value |= (byte & 0x7f) << shift
+        if value > MAX_U128:
+            return None
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append(value)
+        value, shift = 0, 0
+    return values if shift == 0 else None  # varint truncado
+
+
+def decode_runestone_script(script_hex: str, output_count: int) -> Optional[Runestone]:
+    """Runestone de um scriptPubKey (hex). None se o script não for um runestone"""
+    if not script_hex.startswith(RUNESTONE_PREFIX):
+        return None
+    cenotaph = Runestone([], cenotaph=True)
+    payload = _payload(bytes.fromhex(script_hex))
+    integers = _varints(payload) if payload is not None else None
+    if integers is None:
+        return cenotaph
+
+    fields: Dict[int, List[int]] = {}
+    i = 0
+    while i < len(integers):
+        tag = integers[i]
+        if tag == TAG_BODY:
+            i += 1
+            break
+        if i + 1 >= len(integers):
+            return cenotaph
+        fields.setdefault(tag, []).append(integers[i + 1])
+        i += 2
+
+    body = integers[i:]
+    if len(body) % 4:
+        return cenotaph
+    if any(tag % 2 == 0 and tag not in KNOWN_TAGS for tag in fields):
+        return cenotaph
+    # Tag par com valores sobrando (ex: dois pointers) é cenotaph, como no ord:
+    # mint consome dois inteiros (block, tx), as demais um
+    if any(tag % 2 == 0 and len(values) != (2 if tag == TAG_MINT else 1) for tag, values in fields.items()):
+        return cenotaph
+    # Qualquer flag desconhecida, inclusive o bit 127 (flag Cenotaph do ord)
+    if fields.get(TAG_FLAGS, [0])[0] & ~KNOWN_FLAGS:
+        return cenotaph
+
+    edicts, block, tx = [], 0, 0
+    for offset in range(0, len(body), 4):
+        block_delta, tx_delta, amount, output = body[offset:offset + 4]
+        block, tx = block + block_delta, (tx + tx_delta if block_delta == 0 else tx_delta)
+        if (block == 0 and tx > 0) or output > output_count:
+            return cenotaph
+        edicts.append(Edict((block, tx), amount, output))
+
+    pointer = fields.get(TAG_POINTER, [None])[0]
+    if pointer is not None and pointer >= output_count:
+        return cenotaph
+    mint = fields.get(TAG_MINT)
+    return Runestone(edicts, pointer, tuple(mint) if mint else None)
+
+
+def find_runestone(scripts: Sequence[str]) -> Optional[Runestone]:
+    """Primeiro output OP_RETURN OP_13 da TX (o único que o protocolo considera)"""
+    for script_hex in scripts:
+        if script_hex and script_hex.startswith(RUNESTONE_PREFIX):
+            return decode_runestone_script(script_hex, len(scripts))
+    return None
+
+
+# === Alocação ================================================================
+
+def allocate(
+    runestone: Optional[Runestone],
+    scripts: Sequence[str],
+    balance: Optional[int],
+    rune_id: Tuple[int, int] = DOG_RUNE_ID,
+) -> Allocation:
+    """Quantia da rune em cada output (unidades base), pelas regras de edicts do ord.
+
+    `balance`: saldo da rune nas entradas; None = desconhecido (ver docstring do módulo).
+    """
+    is_return = [bool(s) and s.startswith('6a') for s in scripts]
+    destinations = [vout for vout, burn in enumerate(is_return) if not burn]
+
+    if runestone is not None and runestone.cenotaph:
+        return Allocation({}, burned=balance or 0, exact=balance is not None)
+
+    edicts = [edict for edict in (runestone.edicts if runestone else []) if edict.rune_id == rune_id]
+    exact = balance is not None
+    if balance is None:
+        # Entradas cobrem exatamente os edicts explícitos
+        balance = sum(
+            edict.amount * (len(destinations) if edict.output == len(scripts) else 1)
+            for edict in edicts
+        )
+
+    outputs: Dict[int, int] = {}
+    burned = 0
+    unallocated = balance
+
+    def give(vout: int, amount: int) -> None:
+        nonlocal unallocated, burned
+        if amount <= 0:
+            return
+        unallocated -= amount
+        if is_return[vout]:
+            burned += amount
+        else:
+            outputs[vout] = outputs.get(vout, 0) + amount
+
+    for edict in edicts:
+        if edict.amount == 0 and not exact:
+            continue  # "todo o saldo" sem saldo conhecido
+        if edict.output == len(scripts):
+            if not destinations:
+                continue
+            if edict.amount == 0:
+                each, remainder = divmod(unallocated, len(destinations))
+                for index, vout in enumerate(destinations):
+                    give(vout, each + (1 if index < remainder else 0))
+            else:
+                for vout in destinations:
+                    give(vout, min(edict.amount, unallocated))
+        else:
+            give(edict.output, unallocated if edict.amount == 0 else min(edict.amount, unallocated))
+
+    if exact and unallocated > 0:
+        pointer = runestone.pointer if runestone else None
+        if pointer is not None:
+            give(pointer, unallocated)
+        elif destinations:
+            give(destinations[0], unallocated)
+        else:
+            burned += unallocated
+
+    has_zero_edict = any(edict.amount == 0 for edict in edicts)
+    return Allocation(outputs, burned, exact or not has_zero_edict)
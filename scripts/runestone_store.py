@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Store lateral de runestones decodificados (SQLite, por txid)
+
+Os registros armazenados em dog_transactions.json / Upstash não carregam
+mais o runestone completo (ver dog_record.to_compact). O decode fica aqui
+e é consultado sob demanda; se faltar, é refeito via `ord decode`.
+
+Uso:
+    python3 runestone_store.py <txid>     # imprime o runestone da TX
+"""
+
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from dog_record import TransactionLike, as_record
+
+BASE_DIR = Path(__file__).parent.parent
+RUNESTONE_DB = BASE_DIR / 'data' / 'runestones.db'
+
+
+class RunestoneStore:
+    def __init__(self, db_path: Path = RUNESTONE_DB):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(db_path))
+        self.db.execute('CREATE TABLE IF NOT EXISTS runestones (txid TEXT PRIMARY KEY, data TEXT NOT NULL)')
+        self.db.commit()
+
+    def put_many(self, runestones: Dict[str, Dict[str, Any]]) -> int:
+        self.db.executemany(
+            'INSERT OR REPLACE INTO runestones (txid, data) VALUES (?, ?)',
+            [(txid, json.dumps(runestone, separators=(',', ':'))) for txid, runestone in runestones.items()],
+        )
+        self.db.commit()
+        return len(runestones)
+
+    def get(self, txid: str, decode: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None) -> Optional[Dict[str, Any]]:
+        """Runestone guardado; se ausente e `decode` informado, decodifica e guarda"""
+        row = self.db.execute('SELECT data FROM runestones WHERE txid = ?', (txid,)).fetchone()
+        if row:
+            return json.loads(row[0])
+        runestone = decode(txid) if decode else None
+        if runestone:
+            self.put_many({txid: runestone})
+        return runestone
+
+
+def stash_runestones(transactions: Iterable[TransactionLike], store: Optional[RunestoneStore] = None) -> int:
+    """Move os runestones embutidos nos registros (DogTransaction ou dict) para o store (antes de compactar)"""
+    records = (as_record(tx) for tx in transactions)
+    runestones = {record.txid: record.extra['runestone'] for record in records if record.extra.get('runestone') and record.txid}
+    if not runestones:
+        return 0
+    return (store or RunestoneStore()).put_many(runestones)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: python3 runestone_store.py <txid>")
+        sys.exit(1)
+
+    from dog_tx_tracker_v3 import DogTxTrackerV3
+
+    txid = sys.argv[1]
+    runestone = RunestoneStore().get(txid, decode=DogTxTrackerV3().decode_runestone)
+    if not runestone:
+        print(f"❌ Runestone não encontrado para {txid}")
+        sys.exit(1)
+    print(json.dumps(runestone, indent=2))
+
+
+if __name__ == '__main__':
+    main()
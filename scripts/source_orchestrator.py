@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Orquestrador de fontes de transações DOG (node local, Xverse, Unisat)
+
+- As fontes rodam em paralelo, cada uma com seu prazo (SOURCE_DEADLINE_*_SEC)
+- Vence o resultado válido mais recente (maior block_height); a espera
+  termina assim que um resultado alcança o topo da chain ou a fonte
+  primária (ou, se ela falhou, a próxima do ranking) responde com dados
+  válidos
+- As perdedoras recebem um sinal de cancelamento (threading.Event)
+- Latência (média móvel) e falhas de cada fonte ficam em
+  data/source_stats.json; a fonte saudável mais rápida vira a primária
+
+Uso:
+    from source_orchestrator import fetch_transactions_from_sources
+    transactions, source = fetch_transactions_from_sources(500)
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from bitcoin_rpc import BitcoinRPC
+from dog_record import DogTransaction, as_record
+
+BASE_DIR = Path(__file__).parent.parent
+STATS_FILE = BASE_DIR / 'data' / 'source_stats.json'
+NODE_TRANSACTIONS_FILE = BASE_DIR / 'backend' / 'data' / 'dog_transactions.json'
+
+SOURCE_ORDER = ('node', 'xverse', 'unisat')  # prioridade enquanto não há estatísticas
+SOURCE_DEADLINES = {
+    'node': float(os.environ.get('SOURCE_DEADLINE_NODE_SEC', '10')),
+    'xverse': float(os.environ.get('SOURCE_DEADLINE_XVERSE_SEC', '90')),
+    'unisat': float(os.environ.get('SOURCE_DEADLINE_UNISAT_SEC', '60')),
+}
+NODE_MAX_LAG_BLOCKS = int(os.environ.get('SOURCE_NODE_MAX_LAG', '1'))
+STATS_WINDOW = 20  # últimos resultados usados para a taxa de falha
+MAX_FAILURE_RATE = 0.5
+LATENCY_ALPHA = 0.3
+
+
+# === Estatísticas ============================================================
+
+class SourceStats:
+    def __init__(self, path: Path = STATS_FILE):
+        self.path = path
+        try:
+            with open(path, 'r') as f:
+                self.data: Dict[str, Dict[str, Any]] = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        return self.data.setdefault(name, {'runs': 0, 'failures': 0, 'latency_ewma': None, 'recent': []})
+
+    def record(self, name: str, ok: bool, latency: float, error: Optional[str] = None, newest_block: Optional[int] = None) -> None:
+        entry = self._entry(name)
+        entry['runs'] += 1
+        entry['recent'] = (entry['recent'] + [1 if ok else 0])[-STATS_WINDOW:]
+        if ok:
+            previous = entry['latency_ewma']
+            entry['latency_ewma'] = round(latency if previous is None else LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * previous, 3)
+            entry['last_block'] = newest_block
+        else:
+            entry['failures'] += 1
+            entry['last_error'] = error
+
+    def failure_rate(self, name: str) -> float:
+        recent = self._entry(name)['recent']
+        return 1 - sum(recent) / len(recent) if recent else 0.0
+
+    def ranked(self, names=SOURCE_ORDER) -> List[str]:
+        """Saudáveis primeiro, por latência; sem histórico mantém a prioridade padrão"""
+        def score(name):
+            entry = self._entry(name)
+            healthy = self.failure_rate(name) <= MAX_FAILURE_RATE
+            latency = entry['latency_ewma']
+            return (not healthy, latency is None, latency or 0, SOURCE_ORDER.index(name))
+        return sorted(names, key=score)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.path.with_suffix('.json.tmp')
+        with open(temp_file, 'w') as f:
+            json.dump(self.data, f, indent=2)
+        os.replace(temp_file, self.path)
+
+
+# === Fontes ==================================================================
+
+def fetch_from_node(max_transactions: int, cancel_event: threading.Event, tip: Optional[int]) -> List[DogTransaction]:
+    """Saída do pipeline local (backend/data), válida só se estiver no topo da chain"""
+    if tip is None:
+        raise RuntimeError('node local indisponível')
+    with open(NODE_TRANSACTIONS_FILE, 'r') as f:
+        data = json.load(f)
+    lag = tip - (data.get('last_block') or 0)
+    if lag > NODE_MAX_LAG_BLOCKS:
+        raise RuntimeError(f'pipeline local {lag} blocos atrás do node')
+    return [as_record(tx) for tx in data.get('transactions', [])[:max_transactions]]
+
+
+def fetch_from_xverse(max_transactions: int, cancel_event: threading.Event, tip: Optional[int]) -> List[DogTransaction]:
+    from unisat_dog_sync import XverseDogSync  # import tardio para evitar ciclo
+
+    return XverseDogSync(max_transactions).fetch_transactions(cancel_event=cancel_event)
+
+
+def fetch_from_unisat(max_transactions: int, cancel_event: threading.Event, tip: Optional[int]) -> List[DogTransaction]:
+    from unisat_dog_sync import LegacyUnisatDogSync
+
+    return LegacyUnisatDogSync().fetch_transactions(cancel_event=cancel_event)[:max_transactions]
+
+
+SOURCES: Dict[str, Callable[[int, threading.Event, Optional[int]], List[DogTransaction]]] = {
+    'node': fetch_from_node,
+    'xverse': fetch_from_xverse,
+    'unisat': fetch_from_unisat,
+}
+
+
+def newest_block(transactions: List[DogTransaction]) -> Optional[int]:
+    """Maior altura de bloco, ou None se o resultado não for válido"""
+    if not transactions or not all(tx.txid for tx in transactions):
+        return None
+    heights = [tx.block_height for tx in transactions]
+    return max(heights) if max(heights) > 0 else None
+
+
+# === Corrida =================================================================
+
+def fetch_transactions_from_sources(max_transactions: int) -> Tuple[List[DogTransaction], str]:
+    """Consulta as fontes em paralelo e devolve (transações, fonte vencedora)"""
+    stats = SourceStats()
+    order = stats.ranked()
+    primary = order[0]
+    tip = BitcoinRPC().call('getblockcount', timeout=5)
+    print(f"🏁 Fontes: {' > '.join(order)} (primária: {primary}) | topo do node: {tip or 'indisponível'}")
+
+    cancel_event = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=len(order))
+    started = time.monotonic()
+    futures = {executor.submit(SOURCES[name], max_transactions, cancel_event, tip): name for name in order}
+    deadlines = {name: started + SOURCE_DEADLINES[name] for name in order}
+    results: Dict[str, Tuple[List[DogTransaction], int]] = {}
+    failed = set()
+    pending = set(futures)
+
+    try:
+        while pending:
+            now = time.monotonic()
+            timeout = max(0.0, min(deadlines[futures[f]] for f in pending) - now)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            elapsed = time.monotonic() - started
+
+            for future in done:
+                name = futures[future]
+                try:
+                    transactions = future.result()
+                    newest = newest_block(transactions)
+                    if newest is None:
+                        raise RuntimeError('resultado vazio ou inválido')
+                    results[name] = (transactions, newest)
+                    stats.record(name, True, elapsed, newest_block=newest)
+                    print(f"  ✅ {name}: {len(transactions)} TXs até o bloco {newest} em {elapsed:.1f}s")
+                except Exception as exc:  # pylint: disable=broad-except
+                    failed.add(name)
+                    stats.record(name, False, elapsed, error=str(exc))
+                    print(f"  ❌ {name}: {exc} ({elapsed:.1f}s)")
+
+            now = time.monotonic()
+            for future in [f for f in pending if now >= deadlines[futures[f]]]:
+                name = futures[future]
+                pending.discard(future)
+                failed.add(name)
+                stats.record(name, False, now - started, error='prazo esgotado')
+                print(f"  ⏰ {name}: prazo de {SOURCE_DEADLINES[name]:.0f}s esgotado")
+
+            # Primária efetiva: a mais bem ranqueada que ainda não falhou
+            effective_primary = next((name for name in order if name not in failed), None)
+            at_tip = tip is not None and any(newest >= tip for _txs, newest in results.values())
+            if results and (at_tip or effective_primary in results):
+                break
+    finally:
+        # Perdedoras: cancelamento cooperativo, sem esperar terminarem
+        cancel_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        stats.save()
+
+    if not results:
+        return [], 'none'
+
+    winner = max(results, key=lambda name: (results[name][1], -order.index(name)))
+    print(f"🏆 Fonte vencedora: {winner} (bloco {results[winner][1]})")
+    return results[winner][0], winner
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Índice de gastos de outpoints DOG (SQLite, data/spend_index.db)
+
+O Bitcoin Core não responde "quem gastou este output". Este índice guarda,
+só para outpoints que carregavam DOG (mantém o arquivo pequeno):
+
+    spends   (outpoint 'txid:vout', spending_txid, height, amount)
+             amount = DOG do outpoint gasto, em unidades base
+    outputs  (outpoint, txid, address, height, amount)
+             outputs DOG criados (índice de funding: por TX e por endereço)
+
+- Mantido pelo tracker: `record_transactions()` a cada save de TXs
+  confirmadas (senders trazem o outpoint gasto e o DOG dele; receivers,
+  o vout criado, troco incluído). TXs com `inputs_estimated` não
+  registram gastos
+- Seguir um output DOG para frente é uma busca por chave (`spender()`)
+- Backfill a partir de dog_transactions.json
+
+Uso:
+    python3 spend_index.py --backfill
+    python3 spend_index.py <txid>:<vout>      # quem gastou o outpoint
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from dog_record import DOG_FACTOR, TransactionLike, as_record
+
+BASE_DIR = Path(__file__).parent.parent
+SPEND_INDEX_DB = Path(os.environ.get('SPEND_INDEX_DB', str(BASE_DIR / 'data' / 'spend_index.db')))
+TRANSACTIONS_FILE = BASE_DIR / 'backend' / 'data' / 'dog_transactions.json'
+
+
+class Spend(NamedTuple):
+    txid: str      # TX que gastou o outpoint
+    height: int
+    amount: int    # DOG do outpoint (unidades base)
+
+
+class Output(NamedTuple):
+    outpoint: str
+    txid: str      # TX que criou o outpoint
+    address: str
+    height: int
+    amount: int    # DOG (unidades base)
+
+
+class SpendIndex:
+    def __init__(self, db_path: Path = SPEND_INDEX_DB):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(db_path))
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS spends (
+                outpoint TEXT PRIMARY KEY,
+                spending_txid TEXT NOT NULL,
+                height INTEGER NOT NULL,
+                amount INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_spends_txid ON spends (spending_txid)')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS outputs (
+                outpoint TEXT PRIMARY KEY,
+                txid TEXT NOT NULL,
+                address TEXT NOT NULL,
+                height INTEGER NOT NULL,
+                amount INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_outputs_txid ON outputs (txid)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_outputs_address ON outputs (address, height)')
+        self.db.commit()
+
+    def _wanted(self, keys: Iterable[str]) -> None:
+        """Tabela temporária com as chaves de uma consulta em lote (lado externo do join)"""
+        self.db.execute('CREATE TEMP TABLE IF NOT EXISTS wanted (key TEXT PRIMARY KEY)')
+        self.db.execute('DELETE FROM wanted')
+        self.db.executemany('INSERT OR IGNORE INTO wanted VALUES (?)', [(key,) for key in keys])
+
+    def record_transactions(self, transactions: Iterable[TransactionLike]) -> int:
+        """Registra os outpoints DOG gastos e criados pelas TXs confirmadas"""
+        rows, outputs = [], []
+        for tx in transactions:
+            record = as_record(tx)
+            if not record.block_height or record.source == 'mempool':
+                continue
+            if not record.inputs_estimated:  # Quantias chutadas pelo tracker não viram arestas
+                rows.extend(
+                    (sender.input, record.txid, record.block_height, sender.amount)
+                    for sender in record.senders
+                    if sender.input and sender.amount > 0
+                )
+            outputs.extend(
+                (f"{record.txid}:{receiver.vout}", record.txid, receiver.address, record.block_height, receiver.amount)
+                for receiver in record.receivers
+                if receiver.vout is not None and receiver.amount > 0
+            )
+        self.db.executemany('INSERT OR REPLACE INTO spends VALUES (?, ?, ?, ?)', rows)
+        self.db.executemany('INSERT OR REPLACE INTO outputs VALUES (?, ?, ?, ?, ?)', outputs)
+        self.db.commit()
+        return len(rows)
+
+    def spender(self, outpoint: str) -> Optional[Spend]:
+        """TX que gastou o outpoint DOG (None: não gasto ou fora do índice)"""
+        row = self.db.execute(
+            'SELECT spending_txid, height, amount FROM spends WHERE outpoint = ?', (outpoint,)
+        ).fetchone()
+        return Spend(*row) if row else None
+
+    def spenders(self, outpoints: Iterable[str]) -> Dict[str, Spend]:
+        """Vários outpoints de uma vez"""
+        self._wanted(outpoints)
+        rows = self.db.execute(
+            'SELECT s.outpoint, s.spending_txid, s.height, s.amount FROM wanted w CROSS JOIN spends s ON s.outpoint = w.key'
+        )
+        return {outpoint: Spend(txid, height, amount) for outpoint, txid, height, amount in rows}
+
+    def spent_by(self, txid: str) -> Dict[str, Spend]:
+        """Outpoints DOG gastos pela TX (caminho inverso)"""
+        rows = self.db.execute('SELECT outpoint, spending_txid, height, amount FROM spends WHERE spending_txid = ?', (txid,))
+        return {outpoint: Spend(spending_txid, height, amount) for outpoint, spending_txid, height, amount in rows}
+
+    def inputs_of(self, txids: Iterable[str]) -> Dict[str, Dict[str, Spend]]:
+        """spent_by() de várias TXs numa consulta: {txid: {outpoint: Spend}}"""
+        self._wanted(txids)
+        rows = self.db.execute(
+            'SELECT s.outpoint, s.spending_txid, s.height, s.amount FROM wanted w CROSS JOIN spends s ON s.spending_txid = w.key'
+        )
+        inputs: Dict[str, Dict[str, Spend]] = {}
+        for outpoint, txid, height, amount in rows:
+            inputs.setdefault(txid, {})[outpoint] = Spend(txid, height, amount)
+        return inputs
+
+    # === Funding (outputs DOG criados) ======================================
+
+    def outputs(self, outpoints: Iterable[str]) -> Dict[str, Output]:
+        self._wanted(outpoints)
+        rows = self.db.execute('SELECT o.* FROM wanted w CROSS JOIN outputs o ON o.outpoint = w.key')
+        return {row[0]: Output(*row) for row in rows}
+
+    def outputs_of(self, txids: Iterable[str]) -> Dict[str, List[Output]]:
+        """Outputs DOG criados por cada TX: {txid: [Output]}"""
+        self._wanted(txids)
+        created: Dict[str, List[Output]] = {}
+        for row in self.db.execute('SELECT o.* FROM wanted w CROSS JOIN outputs o ON o.txid = w.key ORDER BY o.outpoint'):
+            created.setdefault(row[1], []).append(Output(*row))
+        return created
+
+    def outputs_to(self, address: str) -> List[Output]:
+        """Outputs DOG recebidos pelo endereço, em ordem de altura"""
+        rows = self.db.execute('SELECT * FROM outputs WHERE address = ? ORDER BY height, outpoint', (address,))
+        return [Output(*row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Índice outpoint DOG -> TX que gastou')
+    parser.add_argument('outpoint', nargs='?')
+    parser.add_argument('--backfill', action='store_true', help='registra os gastos de dog_transactions.json')
+    args = parser.parse_args()
+
+    index = SpendIndex()
+    if args.backfill:
+        if not TRANSACTIONS_FILE.exists():
+            print(f"⚠️ {TRANSACTIONS_FILE} não encontrado")
+        else:
+            with open(TRANSACTIONS_FILE, 'r') as f:
+                recorded = index.record_transactions(json.load(f).get('transactions', []))
+            print(f"✅ {recorded:,} outpoints DOG gastos registrados (e os outputs DOG criados)")
+
+    if args.outpoint:
+        spend = index.spender(args.outpoint)
+        if spend:
+            print(f"   {args.outpoint} -> {spend.txid} (bloco {spend.height}, {spend.amount / DOG_FACTOR:,.5f} DOG)")
+        else:
+            print(f"   {args.outpoint}: sem gasto DOG no índice")
+
+
+if __name__ == '__main__':
+    main()
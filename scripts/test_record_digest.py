@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+🧪 Teste de paridade do digest de registros (Python x TypeScript)
+
+Os dois writers do Upstash (scripts/upstash_store.py e
+lib/dog-transactions-store.ts) gravam dog:tx:digest; se o digest diverge,
+cada um vê os registros do outro como alterados e reenvia tudo.
+
+Testa, contra os vetores de lib/dog-record-digest-vectors.json:
+1. record_digest() / canonical_json() do Python
+2. transactionDigest() / canonicalJson() do TypeScript (Node com
+   --experimental-strip-types; pulado em Node antigo)
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from upstash_store import canonical_json, record_digest
+
+BASE_DIR = Path(__file__).parent.parent
+VECTORS_FILE = BASE_DIR / 'lib' / 'dog-record-digest-vectors.json'
+TS_MODULE = BASE_DIR / 'lib' / 'dog-record-digest.ts'
+
+NODE_CHECK = """
+import { readFileSync } from 'fs'
+import { canonicalJson, transactionDigest } from '%s'
+const vectors = JSON.parse(readFileSync('%s', 'utf8'))
+const failed = vectors.filter((v) => canonicalJson(v.record) !== v.canonical || transactionDigest(v.record) !== v.digest)
+console.log(JSON.stringify(failed.map((v) => v.digest)))
+"""
+
+def test_python(vectors):
+    """Teste 1: Python"""
+    failed = [v['digest'] for v in vectors if canonical_json(v['record']) != v['canonical'] or record_digest(v['record']) != v['digest']]
+    print(f"{'✅' if not failed else '❌'} Python: {len(vectors) - len(failed)}/{len(vectors)} vetores")
+    return not failed
+
+def test_typescript(vectors):
+    """Teste 2: TypeScript (Node)"""
+    try:
+        result = subprocess.run(
+            ['node', '--experimental-strip-types', '--no-warnings', '--input-type=module', '-e',
+             NODE_CHECK % (TS_MODULE.as_uri(), VECTORS_FILE)],
+            capture_output=True, text=True, timeout=30,
+        )
+    except FileNotFoundError:
+        print("⚠️ TypeScript: node não encontrado, pulado")
+        return True
+    if result.returncode != 0:
+        print(f"⚠️ TypeScript: Node sem suporte a --experimental-strip-types, pulado ({result.stderr.strip().splitlines()[-1:]})")
+        return True
+    failed = json.loads(result.stdout)
+    print(f"{'✅' if not failed else '❌'} TypeScript: {len(vectors) - len(failed)}/{len(vectors)} vetores")
+    return not failed
+
+def main():
+    with open(VECTORS_FILE, 'r', encoding='utf-8') as f:
+        vectors = json.load(f)
+    ok = test_python(vectors)
+    ok = test_typescript(vectors) and ok
+    sys.exit(0 if ok else 1)
+
+if __name__ == '__main__':
+    main()
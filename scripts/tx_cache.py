@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Cache de transações compartilhado (LRU limitado por bytes + camada em disco)
+
+- Memória: LRU com limite em bytes (TX_CACHE_MAX_MB), não em quantidade
+- Disco (opcional): SQLite em data/tx_cache.db, persiste entre execuções;
+  só transações confirmadas vão para o disco (são imutáveis)
+- Guarda apenas os campos usados pelos scripts (valores, endereços,
+  prevouts, vsize/fee), não o JSON verbose inteiro
+- Contadores de hit/miss/evicção para o resumo de cada execução
+
+Uso:
+    from tx_cache import TxCache
+    cache = TxCache()
+    tx = cache.get_or_fetch(txid, lambda: rpc.call('getrawtransaction', txid, True))
+    print(cache.summary())
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+TX_CACHE_MAX_MB = float(os.environ.get('TX_CACHE_MAX_MB', '64'))
+TX_CACHE_DISK = os.environ.get('TX_CACHE_DISK', str(Path(__file__).parent.parent / 'data' / 'tx_cache.db'))
+
+
+def _slim_script(script_pubkey: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: script_pubkey[k] for k in ('address', 'type', 'hex') if k in script_pubkey}
+
+
+def slim_transaction(tx_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduz a TX verbose aos campos que os scripts leem (mesmo formato de chaves)"""
+    vin = []
+    for item in tx_data.get('vin', []):
+        slim = {k: item[k] for k in ('txid', 'vout', 'coinbase') if k in item}
+        prevout = item.get('prevout')
+        if prevout:
+            slim['prevout'] = {'value': prevout.get('value'), 'scriptPubKey': _slim_script(prevout.get('scriptPubKey', {}))}
+        vin.append(slim)
+
+    slim_tx = {
+        'txid': tx_data.get('txid'),
+        'vin': vin,
+        'vout': [
+            {'value': item.get('value'), 'n': item.get('n'), 'scriptPubKey': _slim_script(item.get('scriptPubKey', {}))}
+            for item in tx_data.get('vout', [])
+        ],
+    }
+    for key in ('vsize', 'size', 'fee', 'blockhash'):
+        if key in tx_data:
+            slim_tx[key] = tx_data[key]
+    return slim_tx
+
+
+class TxCache:
+    def __init__(self, max_bytes: int = int(TX_CACHE_MAX_MB * 1024 * 1024), disk_path: Optional[str] = TX_CACHE_DISK):
+        self.max_bytes = max_bytes
+        self.entries: 'OrderedDict[str, tuple]' = OrderedDict()
+        self.current_bytes = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_writes = 0
+
+        self.disk = None
+        if disk_path:
+            Path(disk_path).parent.mkdir(parents=True, exist_ok=True)
+            self.disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self.disk.execute('PRAGMA journal_mode=WAL')
+            self.disk.execute('CREATE TABLE IF NOT EXISTS txs (txid TEXT PRIMARY KEY, data TEXT NOT NULL)')
+            self.disk.commit()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _remember(self, txid: str, encoded: str, tx_data: Dict[str, Any]) -> None:
+        """Insere na LRU de memória (lock já adquirido) e evicta pelo tamanho"""
+        size = len(encoded)
+        if txid in self.entries:
+            self.current_bytes -= self.entries.pop(txid)[1]
+        self.entries[txid] = (tx_data, size)
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes and self.entries:
+            _old_txid, (_old_data, old_size) = self.entries.popitem(last=False)
+            self.current_bytes -= old_size
+            self.evictions += 1
+
+    def get(self, txid: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.entries.get(txid)
+            if entry is not None:
+                self.entries.move_to_end(txid)
+                self.hits += 1
+                return entry[0]
+
+            if self.disk is not None:
+                row = self.disk.execute('SELECT data FROM txs WHERE txid = ?', (txid,)).fetchone()
+                if row:
+                    tx_data = json.loads(row[0])
+                    self._remember(txid, row[0], tx_data)
+                    self.disk_hits += 1
+                    return tx_data
+
+            self.misses += 1
+            return None
+
+    def put(self, txid: str, tx_data: Dict[str, Any]) -> Dict[str, Any]:
+        slim = slim_transaction(tx_data)
+        encoded = json.dumps(slim, separators=(',', ':'))
+        with self.lock:
+            self._remember(txid, encoded, slim)
+            if self.disk is not None and slim.get('blockhash'):
+                self.disk.execute('INSERT OR REPLACE INTO txs (txid, data) VALUES (?, ?)', (txid, encoded))
+                self.disk.commit()
+                self.disk_writes += 1
+        return slim
+
+    def get_or_fetch(self, txid: str, fetch: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        tx_data = self.get(txid)
+        if tx_data is not None:
+            return tx_data
+        tx_data = fetch()
+        if tx_data:
+            return self.put(txid, tx_data)
+        return None
+
+    def clear(self) -> None:
+        """Limpa apenas a memória (o disco continua valendo entre execuções)"""
+        with self.lock:
+            self.entries.clear()
+            self.current_bytes = 0
+
+    def summary(self) -> str:
+        lookups = self.hits + self.disk_hits + self.misses
+        hit_rate = (self.hits + self.disk_hits) / lookups * 100 if lookups else 0.0
+        return (
+            f"{len(self.entries)} TXs em memória ({self.current_bytes / 1024 / 1024:.1f}/{self.max_bytes / 1024 / 1024:.0f} MB) | "
+            f"hits: {self.hits} memória + {self.disk_hits} disco | misses: {self.misses} | "
+            f"hit rate: {hit_rate:.1f}% | evicções: {self.evictions} | gravadas em disco: {self.disk_writes}"
+        )
@@ -5,16 +5,24 @@ com fallback para a API gratuita da Unisat.
 
 Gera/atualiza o arquivo public/data/dog_transactions.json mantendo
 as últimas N transações (default: 500) com informações de inputs/outputs.
+
+A busca na Xverse é incremental: as páginas de atividade são pedidas em
+ondas concorrentes (1, 2, 4... páginas) sob um token bucket, e a busca
+para na primeira página que contém uma transação confirmada já presente
+no arquivo local.
 """
 
 import json
 import os
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
-import requests
+from dog_record import DogTransaction, Party, as_record, compact_transaction, to_dog
+from http_client import FOREVER, HTTP
+from publish_manifest import MANIFEST
 
 # === Configurações gerais ====================================================
 
@@ -23,18 +31,15 @@ DATA_DIR = SCRIPT_DIR.parent / "public" / "data"
 OUTPUT_FILE = DATA_DIR / "dog_transactions.json"
 
 DOG_RUNE_ID = "840000:3"
-DOG_DIVISIBILITY = 5
-DOG_FACTOR = 10 ** DOG_DIVISIBILITY
 MAX_TRANSACTIONS = int(os.getenv("DOG_MAX_TRANSACTIONS", "500"))
-NET_EPSILON = 1e-5
 
 # --- Xverse ------------------------------------------------------------------
 XVERSE_API_BASE = os.getenv("XVERSE_API_BASE", "https://api.secretkeylabs.io").rstrip("/")
 XVERSE_API_KEY = os.getenv("XVERSE_API_KEY")
 XVERSE_ACTIVITY_LIMIT = 25
 XVERSE_MAX_PAGES = int(os.getenv("XVERSE_ACTIVITY_MAX_PAGES", "250"))
-XVERSE_DELAY_SEC = float(os.getenv("XVERSE_ACTIVITY_DELAY_MS", "250")) / 1000.0
-XVERSE_FEE_DELAY_SEC = float(os.getenv("XVERSE_FEE_DELAY_MS", "400")) / 1000.0
+XVERSE_CONCURRENCY = int(os.getenv("XVERSE_CONCURRENCY", "8"))  # maior onda de páginas
+XVERSE_FEES_FROM_NODE = os.getenv("XVERSE_FEES_FROM_NODE", "1") != "0"  # usa o node local se responder
 
 # --- Unisat (fallback) -------------------------------------------------------
 UNISAT_API = "https://open-api.unisat.io/v1/indexer"
@@ -63,8 +68,15 @@ def safe_int(value: Any) -> int:
     return 0
 
 
-def round_dog(value: float) -> float:
-    return round(value, DOG_DIVISIBILITY)
+def load_known_transactions(path: Path = OUTPUT_FILE) -> Dict[str, DogTransaction]:
+    """Transações confirmadas já presentes no arquivo local, por txid."""
+    try:
+        with open(path, "r", encoding="utf-8") as fp:
+            data = json.load(fp)
+    except (OSError, ValueError):
+        return {}
+    records = (as_record(tx) for tx in data.get("transactions", []))
+    return {record.txid: record for record in records if record.txid and record.block_height > 0}
 
 
 def iso_timestamp(value: Optional[str]) -> str:
@@ -84,223 +96,215 @@ class XverseDogSync:
             raise RuntimeError("XVERSE_API_KEY não está configurada.")
 
         self.max_transactions = max_transactions
-        self.session = requests.Session()
-        self.session.headers.update(
-            {
-                "User-Agent": "DogData Sync/1.0",
-                "Accept": "application/json",
-                "x-api-key": XVERSE_API_KEY,
-            }
+        # Token bucket da Xverse compartilhado entre processos (http_client)
+        self.limiter = HTTP.limiter_for(XVERSE_API_BASE)
+        self.headers = {
+            "Accept": "application/json",
+            "x-api-key": XVERSE_API_KEY,
+        }
+
+    def _request(self, path: str, params: Optional[Dict[str, Any]] = None, ttl: float = 0) -> Dict[str, Any]:
+        """GET na Xverse via http_client (rate limit, retentativas, ETag)"""
+        response = HTTP.get(f"{XVERSE_API_BASE}{path}", params=params, headers=self.headers, ttl=ttl)
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch_activity_page(self, page: int) -> Dict[str, Any]:
+        return self._request(
+            f"/v1/runes/{DOG_RUNE_ID}/activity",
+            params={"offset": page * XVERSE_ACTIVITY_LIMIT},
         )
 
-    def _request(self, path: str, params: Optional[Dict[str, Any]] = None, retries: int = 3) -> Dict[str, Any]:
-        url = f"{XVERSE_API_BASE}{path}"
-        for attempt in range(1, retries + 1):
-            try:
-                response = self.session.get(url, params=params, timeout=30)
-                if response.status_code == 429:
-                    wait = min(5, attempt * 2)
-                    print(f"  ⏳ Xverse rate limit (429). Aguardando {wait}s...")
-                    time.sleep(wait)
-                    continue
-                response.raise_for_status()
-                return response.json()
-            except Exception as exc:  # pylint: disable=broad-except
-                if attempt == retries:
-                    raise
-                wait = attempt * 2
-                print(f"  ⚠️ Erro Xverse (tentativa {attempt}/{retries}): {exc}. Retentando em {wait}s...")
-                time.sleep(wait)
-        raise RuntimeError("Falha inesperada na chamada Xverse")
-
-    def fetch_transactions(self) -> List[Dict[str, Any]]:
+    def fetch_transactions(
+        self,
+        known: Optional[Dict[str, DogTransaction]] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> List[DogTransaction]:
         print("🔍 Buscando transações via Xverse API...")
+        if known is None:
+            known = load_known_transactions()
         grouped: Dict[str, Dict[str, Any]] = {}
-        offset = 0
         pages = 0
-
-        while len(grouped) < self.max_transactions and pages < XVERSE_MAX_PAGES:
-            data = self._request(
-                f"/v1/runes/{DOG_RUNE_ID}/activity",
-                params={"offset": offset},
-            )
-            items = data.get("items") or []
-            if not items:
-                print("  ℹ️ Nenhuma página adicional retornada pela Xverse.")
-                break
-
-            for item in items:
-                txid = item.get("txid")
-                if not txid:
-                    continue
-
-                entry = grouped.setdefault(
-                    txid,
-                    {
-                        "block_height": item.get("blockHeight") or 0,
-                        "block_time": item.get("blockTime"),
-                        "inputs": [],
-                        "outputs": [],
-                        "others": [],
-                    },
-                )
-
-                if not entry["block_height"] and item.get("blockHeight"):
-                    entry["block_height"] = item["blockHeight"]
-                if not entry["block_time"] and item.get("blockTime"):
-                    entry["block_time"] = item["blockTime"]
-
-                item_type = (item.get("type") or "").lower()
-                if item_type == "input":
-                    entry["inputs"].append(item)
-                elif item_type in ("output", "mint"):
-                    entry["outputs"].append(item)
-                else:
-                    entry["others"].append(item)
-
-            offset += data.get("limit") or XVERSE_ACTIVITY_LIMIT
-            pages += 1
-            print(f"  ✅ Página {pages} processada (tx acumuladas: {len(grouped)})")
-
-            if XVERSE_DELAY_SEC > 0:
-                time.sleep(XVERSE_DELAY_SEC)
-
-        transactions: List[Dict[str, Any]] = []
+        wave = 1
+        reached_known = False
+        exhausted = False
+
+        with ThreadPoolExecutor(max_workers=XVERSE_CONCURRENCY) as executor:
+            while not (reached_known or exhausted) and len(grouped) < self.max_transactions and pages < XVERSE_MAX_PAGES:
+                if cancel_event is not None and cancel_event.is_set():
+                    print("  ⏹️ Busca Xverse cancelada (outra fonte venceu).")
+                    return []
+                # Slow start: 1, 2, 4... páginas por onda, até XVERSE_CONCURRENCY
+                batch = range(pages, min(pages + wave, XVERSE_MAX_PAGES))
+                results = list(executor.map(self._fetch_activity_page, batch))
+                wave = min(wave * 2, XVERSE_CONCURRENCY)
+
+                for data in results:
+                    items = data.get("items") or []
+                    if not items:
+                        print("  ℹ️ Nenhuma página adicional retornada pela Xverse.")
+                        exhausted = True
+                        break
+
+                    reached_known = self._group_items(items, grouped, known)
+                    pages += 1
+                    print(f"  ✅ Página {pages} processada (tx acumuladas: {len(grouped)})")
+                    if reached_known:
+                        print("  ⏹️ Alcançou transação já conhecida, parando a busca.")
+                        break
+
+        print(f"📡 Xverse: {pages} páginas | {self.limiter.summary()} | {HTTP.summary()}")
+
+        transactions: List[DogTransaction] = []
         for txid, payload in grouped.items():
+            # A TX conhecida da página de corte pode vir incompleta: mantém a local
+            if txid in known:
+                continue
             tx_data = self._build_transaction(txid, payload)
             if tx_data:
                 transactions.append(tx_data)
+        new_count = len(transactions)
+        transactions.extend(known.values())
 
-        transactions.sort(
-            key=lambda tx: (tx["block_height"], tx["timestamp"]),
-            reverse=True,
-        )
+        transactions.sort(key=lambda tx: tx.sort_key, reverse=True)
         trimmed = transactions[: self.max_transactions]
-        print(f"✅ Xverse retornou {len(trimmed)} transações (de {len(transactions)} encontradas)")
+        print(f"✅ Xverse retornou {len(trimmed)} transações ({new_count} novas, {len(known)} já conhecidas)")
+        if cancel_event is not None and cancel_event.is_set():
+            return []
         self._enrich_with_fees(trimmed)
         return trimmed
 
-    def _build_transaction(self, txid: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        inputs = payload.get("inputs") or []
-        outputs = payload.get("outputs") or []
-
-        senders: List[Dict[str, Any]] = []
-        sender_addresses = set()
-        total_in = 0.0
-
-        for item in inputs:
-            address = item.get("address") or ""
-            amount_raw = safe_int(item.get("amount"))
-            amount_dog = amount_raw / DOG_FACTOR
-            total_in += amount_dog
-
-            if address:
-                sender_addresses.add(address)
+    @staticmethod
+    def _group_items(items: List[Dict[str, Any]], grouped: Dict[str, Dict[str, Any]], known: Dict[str, DogTransaction]) -> bool:
+        """Agrupa os itens de atividade por txid. Retorna True se a página tem TX conhecida"""
+        reached_known = False
+        for item in items:
+            txid = item.get("txid")
+            if not txid:
+                continue
+            if txid in known:
+                reached_known = True
 
-            senders.append(
+            entry = grouped.setdefault(
+                txid,
                 {
-                    "address": address,
-                    "amount": amount_raw,
-                    "amount_dog": round_dog(amount_dog),
-                    "has_dog": amount_dog > NET_EPSILON,
-                }
+                    "block_height": item.get("blockHeight") or 0,
+                    "block_time": item.get("blockTime"),
+                    "inputs": [],
+                    "outputs": [],
+                    "others": [],
+                },
             )
 
-        receivers: List[Dict[str, Any]] = []
-        total_out = 0.0
-        total_change = 0.0
+            if not entry["block_height"] and item.get("blockHeight"):
+                entry["block_height"] = item["blockHeight"]
+            if not entry["block_time"] and item.get("blockTime"):
+                entry["block_time"] = item["blockTime"]
+
+            item_type = (item.get("type") or "").lower()
+            if item_type == "input":
+                entry["inputs"].append(item)
+            elif item_type in ("output", "mint"):
+                entry["outputs"].append(item)
+            else:
+                entry["others"].append(item)
+
+        return reached_known
+
+    def _build_transaction(self, txid: str, payload: Dict[str, Any]) -> Optional[DogTransaction]:
+        senders = [
+            Party(item.get("address") or "", safe_int(item.get("amount")))
+            for item in payload.get("inputs") or []
+        ]
+        receivers = [
+            Party(item["address"], safe_int(item.get("amount")))
+            for item in payload.get("outputs") or []
+            if item.get("address")
+        ]
 
-        for item in outputs:
-            address = item.get("address") or ""
-            if not address:
-                continue
+        return DogTransaction(
+            txid,
+            payload.get("block_height") or 0,
+            iso_timestamp(payload.get("block_time")),
+            senders,
+            receivers,
+        )
 
-            amount_raw = safe_int(item.get("amount"))
-            amount_dog = amount_raw / DOG_FACTOR
-            is_change = address in sender_addresses
-            if is_change:
-                total_change += amount_dog
-            total_out += amount_dog
+    def _fetch_btc_side(self, task: Tuple[str, str]) -> Optional[int]:
+        """Soma dos valores (sats) de /inputs ou /outputs de uma transação"""
+        txid, side = task
+        try:
+            # Inputs/outputs de uma TX não mudam: resposta em cache vale para sempre
+            data = self._request(f"/v1/ordinals/tx/{txid}/{side}", ttl=FOREVER)
+            return sum(safe_int(item.get("value")) for item in data.get("items", []))
+        except Exception as exc:  # pylint: disable=broad-except
+            print(f"⚠️ Falha ao obter {side} de {txid[:8]}…: {exc}")
+            return None
 
-            receivers.append(
-                {
-                    "address": address,
-                    "amount": amount_raw,
-                    "amount_dog": round_dog(amount_dog),
-                    "has_dog": amount_dog > NET_EPSILON,
-                    "is_change": is_change,
-                }
-            )
+    def _fees_from_xverse(self, txids: List[str], executor: ThreadPoolExecutor) -> Dict[str, Dict[str, Any]]:
+        tasks = [(txid, side) for txid in txids for side in ("inputs", "outputs")]
+        totals = dict(zip(tasks, executor.map(self._fetch_btc_side, tasks)))
+
+        fees: Dict[str, Dict[str, Any]] = {}
+        for txid in txids:
+            in_sats, out_sats = totals[(txid, "inputs")], totals[(txid, "outputs")]
+            if in_sats is not None and out_sats is not None:
+                fees[txid] = {"fee_sats": max(in_sats - out_sats, 0), "vsize": None, "fee_rate": None}
+        return fees
 
-        total_in = total_in if total_in > NET_EPSILON else total_out
-        net_transfer = max(total_out - total_change, 0.0)
+    @staticmethod
+    def _fees_from_node(txids: List[str], executor: ThreadPoolExecutor) -> Dict[str, Dict[str, Any]]:
+        """Fees via node local (getrawtransaction verbosity 2), se ele responder"""
+        import fee_backfill_queue  # import tardio: carrega RPC/cache só quando necessário
 
+        if fee_backfill_queue.update_holders_and_fees.RPC.call("getblockcount", timeout=5) is None:
+            return {}
         return {
-            "txid": txid,
-            "block_height": payload.get("block_height") or 0,
-            "timestamp": iso_timestamp(payload.get("block_time")),
-            "senders": senders,
-            "receivers": receivers,
-            "sender_count": len(senders),
-            "receiver_count": len(receivers),
-            "total_dog_in": round_dog(total_in),
-            "total_dog_out": round_dog(total_out),
-            "total_dog_moved": round_dog(total_out),
-            "net_transfer": round_dog(net_transfer),
-            "change_amount": round_dog(total_change),
-            "has_change": total_change > NET_EPSILON,
+            txid: fee
+            for txid, fee in zip(txids, executor.map(fee_backfill_queue.compute_fee, txids))
+            if fee
         }
 
-    def _fetch_btc_totals(self, txid: str) -> Optional[Tuple[int, int]]:
-        try:
-            inputs_resp = self.session.get(
-                f"{XVERSE_API_BASE}/v1/ordinals/tx/{txid}/inputs",
-                timeout=30,
-            )
-            inputs_resp.raise_for_status()
-            inputs_data = inputs_resp.json()
-            in_sats = sum(safe_int(item.get("value")) for item in inputs_data.get("items", []))
+    def _enrich_with_fees(self, transactions: List[DogTransaction]) -> None:
+        missing = [tx for tx in transactions if tx.fee_sats is None]
+        if not missing:
+            return
 
-            if XVERSE_FEE_DELAY_SEC > 0:
-                time.sleep(XVERSE_FEE_DELAY_SEC)
+        from fee_backfill_queue import FeeBackfillQueue
 
-            outputs_resp = self.session.get(
-                f"{XVERSE_API_BASE}/v1/ordinals/tx/{txid}/outputs",
-                timeout=30,
-            )
-            outputs_resp.raise_for_status()
-            outputs_data = outputs_resp.json()
-            out_sats = sum(safe_int(item.get("value")) for item in outputs_data.get("items", []))
+        # Cache persistente por txid (data/fee_backfill.db): só TXs inéditas são buscadas
+        fee_store = FeeBackfillQueue()
+        fees = fee_store.known_fees(tx.txid for tx in missing)
+        unseen = [tx.txid for tx in missing if tx.txid not in fees]
 
-            return in_sats, out_sats
-        except Exception as exc:  # pylint: disable=broad-except
-            print(f"⚠️ Falha ao obter BTC totals para {txid[:8]}…: {exc}")
-            return None
+        fetched: Dict[str, Dict[str, Any]] = {}
+        if unseen:
+            with ThreadPoolExecutor(max_workers=XVERSE_CONCURRENCY) as executor:
+                if XVERSE_FEES_FROM_NODE:
+                    fetched = self._fees_from_node(unseen, executor)
+                remaining = [txid for txid in unseen if txid not in fetched]
+                if remaining:
+                    fetched.update(self._fees_from_xverse(remaining, executor))
 
-    def _enrich_with_fees(self, transactions: List[Dict[str, Any]]) -> None:
-        if not XVERSE_API_KEY:
-            return
+        heights = {tx.txid: tx.block_height for tx in missing}
+        # Só TXs confirmadas vão para o cache (fee de TX no mempool pode mudar por RBF)
+        fee_store.store_fees((txid, heights[txid], fee) for txid, fee in fetched.items() if heights[txid] > 0)
+        fees.update(fetched)
 
-        for index, tx in enumerate(transactions, start=1):
-            if tx.get("fee_sats") is not None:
-                continue
-
-            totals = self._fetch_btc_totals(tx["txid"])
-            if totals:
-                in_sats, out_sats = totals
-                tx["fee_sats"] = max(in_sats - out_sats, 0)
+        for tx in missing:
+            fee = fees.get(tx.txid)
+            if fee:
+                tx.fee_sats = fee["fee_sats"]
+        print(f"💰 Fees: {len(missing) - len(unseen)} do cache, {len(fetched)} buscadas, {len(unseen) - len(fetched)} sem fee")
 
 
 # === Fallback Unisat =========================================================
 
 class LegacyUnisatDogSync:
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({"User-Agent": "DogData Explorer/1.0"})
-        if UNISAT_API_TOKEN:
-            self.session.headers["Authorization"] = f"Bearer {UNISAT_API_TOKEN}"
+        self.headers = {"Authorization": f"Bearer {UNISAT_API_TOKEN}"} if UNISAT_API_TOKEN else {}
 
-    def fetch_events(self, total_needed: int = 1500) -> List[Dict[str, Any]]:
+    def fetch_events(self, total_needed: int = 1500, cancel_event: Optional[threading.Event] = None) -> List[Dict[str, Any]]:
         print(f"🔍 (fallback) Buscando ~{total_needed} eventos na Unisat...")
         url = f"{UNISAT_API}/runes/event"
         events: List[Dict[str, Any]] = []
@@ -308,9 +312,12 @@ class LegacyUnisatDogSync:
         start = 0
 
         while len(events) < total_needed:
+            if cancel_event is not None and cancel_event.is_set():
+                print("  ⏹️ Busca Unisat cancelada (outra fonte venceu).")
+                return []
             params = {"rune": UNISAT_RUNE_NAME, "start": start, "limit": batch_size}
             try:
-                response = self.session.get(url, params=params, timeout=60)
+                response = HTTP.get(url, params=params, headers=self.headers, timeout=60)
                 response.raise_for_status()
                 data = response.json()
             except Exception as exc:  # pylint: disable=broad-except
@@ -332,7 +339,6 @@ class LegacyUnisatDogSync:
             if len(detail) < batch_size:
                 break
             start += batch_size
-            time.sleep(0.5)
 
         print(f"✅ Total de eventos Unisat: {len(events)}")
         return events
@@ -346,7 +352,7 @@ class LegacyUnisatDogSync:
             grouped.setdefault(txid, []).append(event)
         return grouped
 
-    def process_transaction(self, txid: str, events: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    def process_transaction(self, txid: str, events: List[Dict[str, Any]]) -> Optional[DogTransaction]:
         sends = [
             e
             for e in events
@@ -370,84 +376,25 @@ class LegacyUnisatDogSync:
             else datetime.now(timezone.utc).isoformat()
         )
 
-        senders: List[Dict[str, Any]] = []
-        sender_addresses = set()
-        total_in = 0.0
-
-        for send in sends:
-            address = send.get("address") or ""
-            amount_raw = safe_int(send.get("amount"))
-            amount_dog = amount_raw / DOG_FACTOR
-            total_in += amount_dog
-            if address:
-                sender_addresses.add(address)
-            senders.append(
-                {
-                    "address": address,
-                    "amount": amount_raw,
-                    "amount_dog": round_dog(amount_dog),
-                    "has_dog": amount_dog > NET_EPSILON,
-                }
-            )
-
-        receivers: List[Dict[str, Any]] = []
-        total_out = 0.0
-        total_change = 0.0
-
-        for receive in receives:
-            address = receive.get("address") or ""
-            amount_raw = safe_int(receive.get("amount"))
-            amount_dog = amount_raw / DOG_FACTOR
-            is_change = address in sender_addresses
-            if is_change:
-                total_change += amount_dog
-            total_out += amount_dog
-            receivers.append(
-                {
-                    "address": address,
-                    "amount": amount_raw,
-                    "amount_dog": round_dog(amount_dog),
-                    "has_dog": amount_dog > NET_EPSILON,
-                    "is_change": is_change,
-                }
-            )
-
-        total_in = total_in if total_in > NET_EPSILON else total_out
-        net_transfer = max(total_out - total_change, 0.0)
+        senders = [Party(send.get("address") or "", safe_int(send.get("amount"))) for send in sends]
+        receivers = [Party(receive.get("address") or "", safe_int(receive.get("amount"))) for receive in receives]
 
-        return {
-            "txid": txid,
-            "block_height": block_height,
-            "timestamp": timestamp,
-            "senders": senders,
-            "receivers": receivers,
-            "sender_count": len(senders),
-            "receiver_count": len(receivers),
-            "total_dog_in": round_dog(total_in),
-            "total_dog_out": round_dog(total_out),
-            "total_dog_moved": round_dog(total_out),
-            "net_transfer": round_dog(net_transfer),
-            "change_amount": round_dog(total_change),
-            "has_change": total_change > NET_EPSILON,
-        }
+        return DogTransaction(txid, block_height, timestamp, senders, receivers)
 
-    def fetch_transactions(self) -> List[Dict[str, Any]]:
-        events = self.fetch_events(total_needed=1500)
+    def fetch_transactions(self, cancel_event: Optional[threading.Event] = None) -> List[DogTransaction]:
+        events = self.fetch_events(total_needed=1500, cancel_event=cancel_event)
         if not events:
             return []
 
         tx_events = self.group_events_by_txid(events)
-        transactions: List[Dict[str, Any]] = []
+        transactions: List[DogTransaction] = []
 
         for txid, grouped_events in tx_events.items():
             tx_data = self.process_transaction(txid, grouped_events)
             if tx_data:
                 transactions.append(tx_data)
 
-        transactions.sort(
-            key=lambda tx: (tx["block_height"], tx["timestamp"]),
-            reverse=True,
-        )
+        transactions.sort(key=lambda tx: tx.sort_key, reverse=True)
         trimmed = transactions[:MAX_TRANSACTIONS]
         print(f"✅ Fallback Unisat produziu {len(trimmed)} transações.")
         return trimmed
@@ -455,31 +402,33 @@ class LegacyUnisatDogSync:
 
 # === Persistência ============================================================
 
-def save_transactions(transactions: List[Dict[str, Any]], source: str) -> None:
+def save_transactions(transactions: List[DogTransaction], source: str) -> None:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     now = datetime.now(timezone.utc)
 
     payload = {
         "timestamp": now.isoformat(),
         "total_transactions": len(transactions),
-        "last_block": transactions[0]["block_height"] if transactions else 0,
+        "last_block": transactions[0].block_height if transactions else 0,
         "last_update": now.strftime("%Y-%m-%d %H:%M:%S"),
         "source": source,
-        "transactions": transactions,
+        "transactions": [compact_transaction(tx) for tx in transactions],
     }
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as fp:
-        json.dump(payload, fp, indent=2, ensure_ascii=False)
-
-    print("=" * 60)
-    print(f"✅ Arquivo salvo em: {OUTPUT_FILE}")
+    # Pelo manifesto: os outros writers de dog_transactions.json enxergam esta gravação
+    if MANIFEST.write_json(OUTPUT_FILE, payload, indent=2, ensure_ascii=False):
+        print("=" * 60)
+        print(f"✅ Arquivo salvo em: {OUTPUT_FILE}")
+    else:
+        print("=" * 60)
+        print(f"⏭️ {OUTPUT_FILE} inalterado, não regravado")
     print(f"📊 Total de transações: {len(transactions)} | Fonte: {source.upper()}")
     if transactions:
         sample = transactions[0]
         print("🔍 Exemplo (TX mais recente):")
-        print(f"   TXID: {sample['txid'][:16]}...")
-        print(f"   Bloco: {sample['block_height']} | Total DOG: {sample['total_dog_moved']:.2f}")
-        print(f"   Senders: {sample['sender_count']} | Receivers: {sample['receiver_count']}")
+        print(f"   TXID: {sample.txid[:16]}...")
+        print(f"   Bloco: {sample.block_height} | Total DOG: {to_dog(sample.total_out):.2f}")
+        print(f"   Senders: {len(sample.senders)} | Receivers: {len(sample.receivers)}")
     print("=" * 60)
 
 
@@ -491,7 +440,7 @@ def main() -> int:
     print("=" * 60)
 
     source = "xverse"
-    transactions: List[Dict[str, Any]] = []
+    transactions: List[DogTransaction] = []
 
     try:
         xverse_sync = XverseDogSync()
@@ -14,13 +14,16 @@ Ou com variáveis de ambiente:
 import subprocess
 import json
 import sys
-import os
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional, Dict, Any
 from pathlib import Path
-import requests
 from collections import defaultdict
 
+from bitcoin_rpc import BitcoinRPC
+from publish_manifest import MANIFEST, content_digest
+from tx_cache import TxCache
+from upstash_store import DogTxStore
+
 # Tentar carregar .env se disponível
 try:
     from dotenv import load_dotenv
@@ -34,12 +37,8 @@ except ImportError:
 BITCOIN_CLI = 'bitcoin-cli'
 ORD_BINARY = '/home/bitmax/Projects/bitcoin-fullstack/ord/target/release/ord'
 ORD_DATA_DIR = 'data'
-UPSTASH_KV_REST_API_URL = os.environ.get('UPSTASH_KV_REST_API_URL')
-UPSTASH_KV_REST_API_TOKEN = os.environ.get('UPSTASH_KV_REST_API_TOKEN')
-CACHE_KEY = 'dog:transactions'
-MAX_FEES_TO_PROCESS = 500  # Aumentado - processa mais fees por execução
-BATCH_SIZE = 50  # Processar em lotes
-TX_CACHE = {}  # Cache de transações já buscadas
+TX_CACHE = TxCache()  # LRU limitado por bytes + camada em disco (tx_cache.py)
+RPC = BitcoinRPC()  # Conexão RPC reutilizada por todas as chamadas
 
 # Caminhos dos arquivos
 SCRIPT_DIR = Path(__file__).parent
@@ -54,72 +53,61 @@ def get_address_from_utxo(txid, output):
     Se falhar, usa getrawtransaction como fallback (para UTXOs gastos).
     """
     # Método 1: gettxout (mais rápido, funciona para UTXOs não gastos)
-    try:
-        result = subprocess.run(['bitcoin-cli', 'gettxout', txid, str(output)], 
-                              capture_output=True, text=True, timeout=10)
-        if result.returncode == 0 and result.stdout.strip():
-            data = json.loads(result.stdout)
-            if data and 'scriptPubKey' in data:
-                return data['scriptPubKey'].get('address')
-    except:
-        pass
+    data = RPC.call('gettxout', txid, output, timeout=10)
+    if data and 'scriptPubKey' in data:
+        return data['scriptPubKey'].get('address')
     
     # Método 2: getrawtransaction (fallback para UTXOs gastos)
-    try:
-        result = subprocess.run(['bitcoin-cli', 'getrawtransaction', txid, 'true'], 
-                              capture_output=True, text=True, timeout=10)
-        if result.returncode == 0:
-            tx_data = json.loads(result.stdout)
-            if 'vout' in tx_data and isinstance(output, int) and output < len(tx_data['vout']):
-                output_data = tx_data['vout'][output]
-                script_pubkey = output_data.get('scriptPubKey', {})
-                return script_pubkey.get('address')
-    except:
-        pass
+    tx_data = RPC.call('getrawtransaction', txid, True, timeout=10)
+    if tx_data and 'vout' in tx_data and isinstance(output, int) and output < len(tx_data['vout']):
+        output_data = tx_data['vout'][output]
+        script_pubkey = output_data.get('scriptPubKey', {})
+        return script_pubkey.get('address')
     
     return None
 
-def update_holders():
-    """Atualiza a lista de holders de DOG"""
-    print("\n" + "="*80)
-    print("📊 ATUALIZANDO LISTA DE HOLDERS")
-    print("="*80)
-    
-    print("🔍 Extraindo dados de DOG do indexador...")
-    
-    # Obter dados de balance
-    print("📊 Carregando dados de balance...")
+def get_dog_runes():
+    """Obtém os UTXOs DOG do indexador (`ord balances`). Retorna None em caso de erro"""
     ord_cmd = [ORD_BINARY, '--data-dir', ORD_DATA_DIR, 'balances']
     # Executar do diretório ord (3 níveis acima: scripts -> DogData-v1 -> bitcoin-fullstack -> ord)
     ord_dir = Path(__file__).parent.parent.parent / 'ord'
     if not ord_dir.exists():
         print(f"❌ Diretório ord não encontrado: {ord_dir}")
-        return False
+        return None
     result = subprocess.run(ord_cmd, capture_output=True, text=True, cwd=str(ord_dir))
     
     if result.returncode != 0:
         print(f"❌ Erro ao obter dados: {result.stderr}")
-        return False
+        return None
     
     balances = json.loads(result.stdout)
-    dog_runes = balances.get('runes', {}).get('DOG•GO•TO•THE•MOON', {})
-    
-    if not dog_runes:
-        print("⚠️ Nenhum UTXO com DOG encontrado")
-        return False
+    return balances.get('runes', {}).get('DOG•GO•TO•THE•MOON', {})
+
+def build_holders(dog_runes, address_cache=None):
+    """Agrupa UTXOs DOG por endereço e calcula o ranking
     
-    print(f"📊 Encontrados {len(dog_runes)} UTXOs com DOG")
+    `address_cache` ("txid:vout" -> endereço) evita resolver de novo UTXOs já
+    conhecidos; é atualizado no lugar e perde as entradas de UTXOs gastos.
+    """
+    if address_cache is None:
+        address_cache = {}
     
     # Agrupar por endereço
     address_balances = defaultdict(lambda: {'total_amount': 0, 'utxo_count': 0})
     processed = 0
+    resolved = 0
     errors = 0
     
     for utxo_key, rune_data in dog_runes.items():
         if rune_data.get('amount', 0) > 0:
             try:
-                txid, output = utxo_key.split(':')
-                address = get_address_from_utxo(txid, int(output))
+                address = address_cache.get(utxo_key)
+                if address is None:
+                    txid, output = utxo_key.split(':')
+                    address = get_address_from_utxo(txid, int(output))
+                    resolved += 1
+                    if address:
+                        address_cache[utxo_key] = address
                 
                 if address:
                     address_balances[address]['total_amount'] += rune_data['amount']
@@ -135,8 +123,13 @@ def update_holders():
             if processed % 1000 == 0:
                 print(f"⏳ Processados {processed}/{len(dog_runes)} UTXOs...")
     
+    # UTXOs gastos não voltam: remover do cache
+    for utxo_key in [key for key in address_cache if key not in dog_runes]:
+        del address_cache[utxo_key]
+    
     if errors > 0:
         print(f"⚠️ {errors} erros durante processamento")
+    print(f"🔎 Endereços resolvidos via RPC: {resolved} (restante do cache)")
     
     # Converter para lista e ordenar
     holders = []
@@ -155,81 +148,77 @@ def update_holders():
     for rank, holder in enumerate(holders, start=1):
         holder['rank'] = rank
     
-    print(f"✅ Encontrados {len(holders)} holders únicos")
-    print("🏆 Top 10 holders:")
-    for i, holder in enumerate(holders[:10]):
-        print(f"  {i+1}. {holder['address']}: {holder['total_dog']:.5f} DOG ({holder['utxo_count']} UTXOs)")
-    
+    return holders
+
+def save_holders(holders, total_utxos):
+    """Grava os arquivos de holders (data/ e public/data/)"""
     # Criar estrutura de dados
     output_data = {
         'timestamp': datetime.now().isoformat(),
         'total_holders': len(holders),
-        'total_utxos': len(dog_runes),
+        'total_utxos': total_utxos,
         'holders': holders
     }
     
-    # Garantir que os diretórios existam
-    DATA_DIR.mkdir(parents=True, exist_ok=True)
-    PUBLIC_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    # dog_holders_by_address.json, dog_holders.json (formato para API) e
+    # cópias em public/data/ (para Vercel servir). Arquivos cujo conteúdo
+    # não mudou (fora o timestamp) não são regravados.
+    digest = content_digest(output_data)
+    written = 0
+    for directory in (DATA_DIR, PUBLIC_DATA_DIR):
+        for filename in ('dog_holders_by_address.json', 'dog_holders.json'):
+            if MANIFEST.write_json(directory / filename, output_data, digest=digest, indent=2):
+                written += 1
+
+    if written:
+        print(f"💾 Holders salvos em data/ e public/data/ ({written} arquivos gravados)")
+    else:
+        print("⏭️ Holders inalterados, arquivos não regravados")
+    return written > 0
+
+def update_holders():
+    """Atualiza a lista de holders de DOG"""
+    print("\n" + "="*80)
+    print("📊 ATUALIZANDO LISTA DE HOLDERS")
+    print("="*80)
     
-    # Salvar dog_holders_by_address.json
-    output_path_by_address = DATA_DIR / 'dog_holders_by_address.json'
-    with open(output_path_by_address, 'w') as f:
-        json.dump(output_data, f, indent=2)
+    print("🔍 Extraindo dados de DOG do indexador...")
     
-    print(f"💾 Dados salvos em {output_path_by_address}")
+    # Obter dados de balance
+    print("📊 Carregando dados de balance...")
+    dog_runes = get_dog_runes()
+    if dog_runes is None:
+        return False
     
-    # Salvar também dog_holders.json (formato para API)
-    output_path_holders = DATA_DIR / 'dog_holders.json'
-    with open(output_path_holders, 'w') as f:
-        json.dump(output_data, f, indent=2)
+    if not dog_runes:
+        print("⚠️ Nenhum UTXO com DOG encontrado")
+        return False
     
-    print(f"💾 Dados salvos em {output_path_holders}")
+    print(f"📊 Encontrados {len(dog_runes)} UTXOs com DOG")
     
-    # Copiar para public/data/ (para Vercel servir)
-    import shutil
-    public_path_by_address = PUBLIC_DATA_DIR / 'dog_holders_by_address.json'
-    public_path_holders = PUBLIC_DATA_DIR / 'dog_holders.json'
+    holders = build_holders(dog_runes)
     
-    shutil.copy(output_path_by_address, public_path_by_address)
-    shutil.copy(output_path_holders, public_path_holders)
+    print(f"✅ Encontrados {len(holders)} holders únicos")
+    print("🏆 Top 10 holders:")
+    for i, holder in enumerate(holders[:10]):
+        print(f"  {i+1}. {holder['address']}: {holder['total_dog']:.5f} DOG ({holder['utxo_count']} UTXOs)")
     
-    print(f"💾 Copiado para public/data/ (Vercel)")
-    print(f"✅ Total de arquivos salvos: 4")
+    save_holders(holders, len(dog_runes))
     
     return True
 
 def run_bitcoin_cli(*args):
-    """Executa comando bitcoin-cli com timeout reduzido"""
-    try:
-        result = subprocess.run(
-            [BITCOIN_CLI] + list(args),
-            capture_output=True,
-            text=True,
-            timeout=15  # Timeout reduzido
-        )
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-        return None
-    except subprocess.TimeoutExpired:
-        return None
-    except Exception:
-        return None
+    """Executa comando RPC com timeout reduzido (conexão compartilhada)"""
+    return RPC.call(*args, timeout=15)
 
 def get_tx_cached(txid: str) -> Optional[Dict]:
     """Busca transação com cache para evitar chamadas duplicadas"""
-    if txid in TX_CACHE:
-        return TX_CACHE[txid]
-    
-    tx_data = run_bitcoin_cli('getrawtransaction', txid, 'true')
-    if tx_data:
-        TX_CACHE[txid] = tx_data
-    return tx_data
+    return TX_CACHE.get_or_fetch(txid, lambda: run_bitcoin_cli('getrawtransaction', txid, True))
 
 def get_txout(txid: str, vout: int) -> Optional[float]:
     """Busca output específico diretamente (mais rápido)"""
     try:
-        result = run_bitcoin_cli('gettxout', txid, str(vout))
+        result = run_bitcoin_cli('gettxout', txid, vout)
         if result and 'value' in result:
             return float(result['value'])
         return None
@@ -297,180 +286,44 @@ def calculate_transaction_fee(txid: str) -> Optional[int]:
         return None
 
 def get_cache_from_upstash() -> Optional[Dict[str, Any]]:
-    """Busca cache de transações do Upstash"""
-    if not UPSTASH_KV_REST_API_URL or not UPSTASH_KV_REST_API_TOKEN:
+    """Busca cache de transações do Upstash (índice por txid, ver upstash_store.py)"""
+    store = DogTxStore()
+    if not store.available:
         print("⚠️ Variáveis de ambiente Upstash não configuradas")
         print("   Configure UPSTASH_KV_REST_API_URL e UPSTASH_KV_REST_API_TOKEN")
         return None
     
     try:
-        url = f"{UPSTASH_KV_REST_API_URL}/get/{CACHE_KEY}"
-        headers = {
-            'Authorization': f'Bearer {UPSTASH_KV_REST_API_TOKEN}',
-            'Content-Type': 'application/json'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            result = data.get('result')
-            if result:
-                if isinstance(result, str):
-                    return json.loads(result)
-                return result
-        else:
-            print(f"⚠️ Erro HTTP ao buscar cache: {response.status_code}")
-        return None
+        return store.load()
     except Exception as e:
         print(f"❌ Erro ao buscar cache do Upstash: {e}")
         return None
 
 def update_cache_in_upstash(data: Dict[str, Any]) -> bool:
-    """Atualiza cache de transações no Upstash"""
-    if not UPSTASH_KV_REST_API_URL or not UPSTASH_KV_REST_API_TOKEN:
+    """Atualiza no Upstash apenas as transações alteradas"""
+    store = DogTxStore()
+    if not store.available:
         return False
     
     try:
-        url = f"{UPSTASH_KV_REST_API_URL}/set/{CACHE_KEY}"
-        headers = {
-            'Authorization': f'Bearer {UPSTASH_KV_REST_API_TOKEN}',
-            'Content-Type': 'application/json'
-        }
-        payload = json.dumps(data, ensure_ascii=False)
-        response = requests.post(url, headers=headers, data=payload, timeout=30)
-        
-        if response.status_code == 200:
-            return True
-        else:
-            print(f"⚠️ Erro HTTP ao atualizar cache: {response.status_code}")
-            print(f"   Resposta: {response.text[:200]}")
-            return False
+        store.sync(data.get('transactions', []), meta={
+            'last_block': data.get('last_block'),
+            'last_updated': data.get('last_update') or data.get('last_updated'),
+        })
+        return True
     except Exception as e:
         print(f"❌ Erro ao atualizar cache no Upstash: {e}")
         return False
 
 def update_fees():
-    """Atualiza fees de transações (versão otimizada)"""
+    """Atualiza fees de transações (fila persistente com workers paralelos)"""
     print("\n" + "="*80)
-    print("💰 ATUALIZANDO FEES DE TRANSAÇÕES (OTIMIZADO)")
+    print("💰 ATUALIZANDO FEES DE TRANSAÇÕES (FILA PERSISTENTE)")
     print("="*80)
     
-    # Limpar cache de transações
-    TX_CACHE.clear()
-    
-    # Buscar cache
-    print("📥 Buscando cache de transações DOG...")
-    cache_data = get_cache_from_upstash()
-    if not cache_data:
-        print("❌ Não foi possível buscar cache do Upstash")
-        return False
-    
-    transactions = cache_data.get('transactions', [])
-    if not transactions:
-        print("⚠️ Nenhuma transação encontrada no cache")
-        return False
-    
-    print(f"✅ Encontradas {len(transactions)} transações DOG no cache")
-    
-    # Filtrar transações sem fees (prioridade para últimas 24h)
-    # Usar UTC para comparação (transações estão em UTC)
-    from datetime import timezone
-    now = datetime.now(timezone.utc)
-    threshold_24h = now - timedelta(hours=24)
-    
-    recent_needing_fees = []
-    older_needing_fees = []
-    
-    for tx in transactions:
-        try:
-            tx_time_str = tx.get('timestamp', '')
-            if 'Z' in tx_time_str:
-                tx_time = datetime.fromisoformat(tx_time_str.replace('Z', '+00:00'))
-            else:
-                tx_time = datetime.fromisoformat(tx_time_str)
-            
-            if not tx.get('fee_sats') or tx.get('fee_sats') == 0:
-                if tx_time >= threshold_24h:
-                    recent_needing_fees.append(tx)
-                else:
-                    older_needing_fees.append(tx)
-        except:
-            continue
-    
-    # Priorizar últimas 24h
-    to_process = recent_needing_fees[:MAX_FEES_TO_PROCESS]
-    if len(to_process) < MAX_FEES_TO_PROCESS:
-        remaining = MAX_FEES_TO_PROCESS - len(to_process)
-        to_process.extend(older_needing_fees[:remaining])
-    
-    if not to_process:
-        print("✅ Todas as transações já têm fees calculadas")
-        return True
-    
-    print(f"\n📊 Transações para processar:")
-    print(f"   - Últimas 24h sem fees: {len(recent_needing_fees)}")
-    print(f"   - Mais antigas sem fees: {len(older_needing_fees)}")
-    print(f"   - Processando: {len(to_process)} transações")
-    
-    # Processar em lotes
-    fees_calculated = 0
-    fees_failed = 0
-    import time
-    start_time = time.time()
-    
-    for batch_start in range(0, len(to_process), BATCH_SIZE):
-        batch = to_process[batch_start:batch_start + BATCH_SIZE]
-        batch_num = (batch_start // BATCH_SIZE) + 1
-        total_batches = (len(to_process) + BATCH_SIZE - 1) // BATCH_SIZE
-        
-        print(f"\n📦 Lote {batch_num}/{total_batches} ({len(batch)} transações)...")
-        
-        for i, tx in enumerate(batch, 1):
-            txid = tx['txid']
-            global_idx = batch_start + i
-            
-            print(f"  [{global_idx}/{len(to_process)}] {txid[:8]}...", end=' ', flush=True)
-            
-            fee = calculate_transaction_fee(txid)
-            if fee:
-                tx['fee_sats'] = fee
-                fees_calculated += 1
-                print(f"✅ {fee:,} sats")
-            else:
-                fees_failed += 1
-                print("❌")
-            
-            # Delay mínimo apenas a cada 10 transações
-            if i % 10 == 0 and i < len(batch):
-                time.sleep(0.05)
-        
-        # Atualizar cache após cada lote
-        if fees_calculated > 0:
-            print(f"  💾 Salvando progresso...", end=' ', flush=True)
-            cache_data['transactions'] = transactions
-            cache_data['last_update'] = datetime.now().isoformat()
-            
-            if update_cache_in_upstash(cache_data):
-                print("✅")
-            else:
-                print("❌")
-    
-    elapsed = time.time() - start_time
-    
-    # Resumo
-    print(f"\n📊 Resumo: {fees_calculated} calculadas, {fees_failed} falhas")
-    print(f"⏱️  Tempo: {elapsed:.1f}s ({elapsed/60:.1f}min)")
-    if fees_calculated > 0:
-        print(f"⚡ Velocidade: {fees_calculated/elapsed:.2f} fees/segundo")
-    print(f"💾 Cache: {len(TX_CACHE)} transações em memória")
-    
-    remaining_recent = max(0, len(recent_needing_fees) - MAX_FEES_TO_PROCESS)
-    remaining_older = max(0, len(older_needing_fees) - max(0, MAX_FEES_TO_PROCESS - len(recent_needing_fees)))
-    
-    if remaining_recent > 0 or remaining_older > 0:
-        print(f"⏳ Restantes: {remaining_recent + remaining_older} transações")
-    
-    return fees_calculated > 0
+    # Import tardio: fee_backfill_queue importa este módulo
+    from fee_backfill_queue import run_backfill
+    return run_backfill(once=True)
 
 def main():
     print("\n" + "="*80)
@@ -490,6 +343,7 @@ def main():
     print("="*80)
     print(f"✅ Holders: {'Sucesso' if holders_success else 'Falhou'}")
     print(f"✅ Fees: {'Sucesso' if fees_success else 'Falhou'}")
+    print(f"💾 Cache de TXs: {TX_CACHE.summary()}")
     print(f"⏰ Finalizado em: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*80)
 
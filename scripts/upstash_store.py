@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Store de transações DOG no Upstash (Redis) com escrita incremental
+
+MODELO:
+    dog:tx          hash    txid -> JSON da transação
+    dog:tx:index    zset    txid com score = block_height
+    dog:tx:meta     hash    last_block, last_updated, source, total_transactions
+    dog:tx:digest   hash    txid -> sha1 do registro compacto gravado
+
+- Só registros novos ou alterados são enviados: os digests ficam no próprio
+  servidor (um HMGET antes do POST /pipeline de escrita), então gravações
+  de outros writers (lib/dog-transactions-store.ts) e remoções são vistas
+- Todo writer grava o digest junto com o registro e o apaga junto com ele
+- Corte para MAX_TRANSACTIONS: ZREMRANGEBYRANK + HDEL dos removidos
+- `bytes_sent` mede o tráfego de cada sync
+- Registros gravados no formato compacto (dog_record.to_compact) e
+  expandidos de volta ao formato da API em `load()`
+- LocalRedis é um substituto em memória com a mesma interface de pipeline
+  (DOG_REDIS_BACKEND=local), para testes e desenvolvimento sem Upstash
+
+O blob legado `dog:transactions` continua sendo lido como fallback enquanto
+o índice novo estiver vazio.
+"""
+
+import fnmatch
+import hashlib
+import json
+import math
+import os
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from dog_record import TransactionLike, compact_transaction, expand_payload
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+TX_HASH_KEY = 'dog:tx'
+TX_INDEX_KEY = 'dog:tx:index'
+TX_META_KEY = 'dog:tx:meta'
+TX_DIGEST_KEY = 'dog:tx:digest'
+LEGACY_CACHE_KEY = 'dog:transactions'
+MAX_TRANSACTIONS = int(os.environ.get('DOG_MAX_TRANSACTIONS', '500'))
+
+
+def _encode(command: List[Any]) -> List[str]:
+    return [item if isinstance(item, str) else json.dumps(item) if isinstance(item, (dict, list)) else str(item) for item in command]
+
+
+# === Clientes ================================================================
+
+class UpstashRestClient:
+    """Cliente REST do Upstash com suporte a pipeline"""
+
+    def __init__(self, url: str, token: str, timeout: float = 30):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+        })
+        self.bytes_sent = 0
+
+    def pipeline(self, commands: List[List[Any]]) -> List[Any]:
+        if not commands:
+            return []
+        body = json.dumps([_encode(c) for c in commands], ensure_ascii=False).encode('utf-8')
+        self.bytes_sent += len(body)
+        response = self.session.post(f"{self.url}/pipeline", data=body, timeout=self.timeout)
+        response.raise_for_status()
+        results = []
+        for reply in response.json():
+            if 'error' in reply:
+                raise RuntimeError(f"Erro Upstash: {reply['error']}")
+            results.append(reply.get('result'))
+        return results
+
+
+class LocalRedis:
+    """Substituto em memória do Upstash (subconjunto de comandos usado aqui)"""
+
+    def __init__(self):
+        self.strings: Dict[str, str] = {}
+        self.hashes: Dict[str, Dict[str, str]] = {}
+        self.zsets: Dict[str, Dict[str, float]] = {}
+        self.bytes_sent = 0
+
+    def _ranked(self, key: str) -> List[str]:
+        zset = self.zsets.get(key, {})
+        return sorted(zset, key=lambda member: (zset[member], member))
+
+    @staticmethod
+    def _slice(items: List[str], start: int, stop: int) -> List[str]:
+        size = len(items)
+        start = max(start + size if start < 0 else start, 0)
+        stop = stop + size if stop < 0 else stop
+        return items[start:stop + 1]
+
+    def execute(self, command: List[str]) -> Any:
+        name, key, args = command[0].upper(), command[1] if len(command) > 1 else None, command[2:]
+        if name == 'GET':
+            return self.strings.get(key)
+        if name == 'SET':
+            self.strings[key] = args[0]
+            return 'OK'
+        if name == 'DEL':
+            removed = 0
+            for k in command[1:]:
+                removed += sum(1 for store in (self.strings, self.hashes, self.zsets) if store.pop(k, None) is not None)
+            return removed
+        if name == 'HSET':
+            hash_ = self.hashes.setdefault(key, {})
+            added = sum(1 for field in args[0::2] if field not in hash_)
+            hash_.update(zip(args[0::2], args[1::2]))
+            return added
+        if name == 'HMGET':
+            hash_ = self.hashes.get(key, {})
+            return [hash_.get(field) for field in args]
+        if name == 'HGETALL':
+            return [item for pair in self.hashes.get(key, {}).items() for item in pair]
+        if name == 'HDEL':
+            hash_ = self.hashes.get(key, {})
+            return sum(1 for field in args if hash_.pop(field, None) is not None)
+        if name == 'ZADD':
+            zset = self.zsets.setdefault(key, {})
+            added = sum(1 for member in args[1::2] if member not in zset)
+            zset.update((member, float(score)) for score, member in zip(args[0::2], args[1::2]))
+            return added
+        if name == 'ZCARD':
+            return len(self.zsets.get(key, {}))
+        if name == 'ZRANGE':
+            items = self._ranked(key)
+            if 'REV' in [a.upper() for a in args[2:]]:
+                items.reverse()
+            return self._slice(items, int(args[0]), int(args[1]))
+        if name == 'ZREMRANGEBYRANK':
+            removed = self._slice(self._ranked(key), int(args[0]), int(args[1]))
+            for member in removed:
+                del self.zsets[key][member]
+            return len(removed)
+        if name == 'KEYS':
+            keys = set(self.strings) | set(self.hashes) | set(self.zsets)
+            return sorted(k for k in keys if fnmatch.fnmatch(k, key))
+        raise ValueError(f"Comando não suportado pelo LocalRedis: {name}")
+
+    def pipeline(self, commands: List[List[Any]]) -> List[Any]:
+        encoded = [_encode(c) for c in commands]
+        self.bytes_sent += len(json.dumps(encoded, ensure_ascii=False).encode('utf-8'))
+        return [self.execute(c) for c in encoded]
+
+
+def default_client():
+    """Upstash se configurado; LocalRedis se DOG_REDIS_BACKEND=local; senão None"""
+    if os.environ.get('DOG_REDIS_BACKEND') == 'local':
+        return LocalRedis()
+    url = os.environ.get('UPSTASH_KV_REST_API_URL')
+    token = os.environ.get('UPSTASH_KV_REST_API_TOKEN')
+    if url and token and requests:
+        return UpstashRestClient(url, token)
+    return None
+
+
+# === Store ===================================================================
+
+def _js_number(value: float) -> str:
+    """Float no formato do JSON.stringify: 3.0 -> '3', 1e-05 -> '0.00001', 1e-07 -> '1e-7'"""
+    if not math.isfinite(value):
+        return 'null'
+    if value.is_integer() and abs(value) < 1e21:
+        return str(int(value))
+    mantissa, _, exponent = repr(value).partition('e')
+    if not exponent:
+        return mantissa
+    exponent = int(exponent)
+    if -7 < exponent < 21:
+        return format(Decimal(repr(value)), 'f')
+    return f"{mantissa}e{'+' if exponent > 0 else '-'}{abs(exponent)}"
+
+
+def canonical_json(value: Any) -> str:
+    """JSON canônico do digest (mesma saída de canonicalJson em lib/dog-record-digest.ts)"""
+    if isinstance(value, dict):
+        items = sorted((key, item) for key, item in value.items())
+        return '{' + ', '.join(f"{json.dumps(key, ensure_ascii=False)}: {canonical_json(item)}" for key, item in items) + '}'
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(canonical_json(item) for item in value) + ']'
+    if isinstance(value, float):
+        return _js_number(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+def record_digest(tx: Dict[str, Any]) -> str:
+    """sha1 do registro compacto (mesmo cálculo de transactionDigest em lib/dog-record-digest.ts)
+
+    Floats saem no formato do JavaScript (3.0 vira 3): os dois writers chegam ao
+    mesmo digest para o mesmo registro.
+    """
+    return hashlib.sha1(canonical_json(tx).encode('utf-8')).hexdigest()
+
+
+class DogTxStore:
+    def __init__(self, client=None, max_transactions: int = MAX_TRANSACTIONS):
+        self.client = client if client is not None else default_client()
+        self.max_transactions = max_transactions
+
+    @property
+    def available(self) -> bool:
+        return self.client is not None
+
+    @property
+    def bytes_sent(self) -> int:
+        return self.client.bytes_sent if self.client is not None else 0
+
+    def stored_digests(self, txids: List[str]) -> Dict[str, str]:
+        """Digests gravados no servidor para os txids (ausentes = precisam ser enviados)"""
+        if not txids:
+            return {}
+        values = self.client.pipeline([['HMGET', TX_DIGEST_KEY] + txids])[0] or []
+        return {txid: value for txid, value in zip(txids, values) if value}
+
+    def sync(self, transactions: Iterable[TransactionLike], meta: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """Envia apenas registros novos/alterados e corta o excedente. Retorna estatísticas"""
+        bytes_before = self.bytes_sent
+        commands: List[List[Any]] = []
+        compacted = (compact_transaction(tx) for tx in transactions)  # DogTransaction ou dict
+        records = {tx['txid']: tx for tx in compacted if tx.get('txid')}
+        total = len(records)
+        stored = self.stored_digests(list(records))
+
+        changed: Dict[str, str] = {}
+        for txid, tx in records.items():
+            digest = record_digest(tx)
+            if stored.get(txid) == digest:
+                continue
+            changed[txid] = digest
+            commands.append(['HSET', TX_HASH_KEY, txid, json.dumps(tx, ensure_ascii=False)])
+            commands.append(['ZADD', TX_INDEX_KEY, tx.get('block_height') or 0, txid])
+        if changed:
+            commands.append(['HSET', TX_DIGEST_KEY] + [item for pair in changed.items() for item in pair])
+
+        if meta:
+            fields = [item for key, value in meta.items() if value is not None for item in (key, value)]
+            if fields:
+                commands.append(['HSET', TX_META_KEY] + fields)
+        commands.append(['ZCARD', TX_INDEX_KEY])
+
+        results = self.client.pipeline(commands)
+        removed = self.trim(int(results[-1] or 0))
+
+        stats = {
+            'total': total,
+            'written': len(changed),
+            'skipped': total - len(changed),
+            'removed': removed,
+            'bytes_sent': self.bytes_sent - bytes_before,
+        }
+        print(f"📡 Upstash sync: {stats['written']} gravadas, {stats['skipped']} inalteradas, {removed} removidas | {stats['bytes_sent']:,} bytes enviados")
+        return stats
+
+    def trim(self, card: int) -> int:
+        """Mantém só as MAX_TRANSACTIONS de maior altura"""
+        excess = card - self.max_transactions
+        if excess <= 0:
+            return 0
+        victims = self.client.pipeline([['ZRANGE', TX_INDEX_KEY, 0, excess - 1]])[0] or []
+        if victims:
+            self.client.pipeline([
+                ['HDEL', TX_HASH_KEY] + victims,
+                ['HDEL', TX_DIGEST_KEY] + victims,
+                ['ZREMRANGEBYRANK', TX_INDEX_KEY, 0, excess - 1],
+            ])
+        return len(victims)
+
+    def patch(self, updates: Dict[str, Dict[str, Any]]) -> int:
+        """Aplica campos parciais (ex: fees) a registros existentes (registro e digest juntos)"""
+        txids = list(updates)
+        if not txids:
+            return 0
+        current = self.client.pipeline([['HMGET', TX_HASH_KEY] + txids])[0] or []
+        commands = []
+        for txid, raw in zip(txids, current):
+            if raw is None:
+                continue
+            tx = compact_transaction(json.loads(raw))
+            tx.update(updates[txid])
+            commands.append(['HSET', TX_HASH_KEY, txid, json.dumps(tx, ensure_ascii=False)])
+            commands.append(['HSET', TX_DIGEST_KEY, txid, record_digest(tx)])
+        self.client.pipeline(commands)
+        return len(commands) // 2
+
+    def load(self, limit: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Lê o cache no formato antigo ({..., 'transactions': [...]}), mais recentes primeiro.
+
+        Registros compactos (dog_record, schema_version 3) são expandidos para o formato da API.
+        """
+        stop = (limit or self.max_transactions) - 1
+        txids = self.client.pipeline([['ZRANGE', TX_INDEX_KEY, 0, stop, 'REV']])[0] or []
+        if not txids:
+            legacy = self.client.pipeline([['GET', LEGACY_CACHE_KEY]])[0]
+            return expand_payload(json.loads(legacy)) if legacy else None
+
+        raw_records, raw_meta = self.client.pipeline([
+            ['HMGET', TX_HASH_KEY] + txids,
+            ['HGETALL', TX_META_KEY],
+        ])
+        meta = dict(zip(raw_meta[0::2], raw_meta[1::2])) if raw_meta else {}
+        transactions = [json.loads(raw) for raw in raw_records if raw]
+        return expand_payload({
+            'total_transactions': len(transactions),
+            'last_block': int(meta.get('last_block') or (transactions[0]['block_height'] if transactions else 0)),
+            'last_updated': meta.get('last_updated'),
+            'source': meta.get('source'),
+            'transactions': transactions,
+        })
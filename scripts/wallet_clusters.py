@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Clusterização de carteiras DOG por common-input ownership
+
+- Todos os endereços que assinam inputs da mesma TX (senders) pertencem à
+  mesma entidade: union-find incremental, alimentado pelas TXs DOG de cada
+  bloco (custo praticamente constante por TX)
+- Heurística de troco opcional (CLUSTER_CHANGE_HEURISTIC=1): numa TX com
+  dois receivers que não são senders, se só um deles é endereço nunca
+  visto, ele é o troco e entra na entidade dos senders
+- Entity ID estável: cada endereço ganha um número na primeira vez que
+  aparece; a entidade fica com o menor número dos endereços unidos
+- Tabelas por entidade (saldo, nº de endereços, ranking) ao lado das de
+  endereço: dog_entities.json em data/ e public/data/
+
+Limitação: TXs de marketplace (PSBT com inputs de comprador e vendedor)
+juntam entidades diferentes; a heurística não tenta detectá-las.
+
+Estado em SQLite (data/wallet_clusters.db), carregado em memória e
+gravado só nas linhas alteradas. O daemon mantém a instância residente e
+alimenta com as TXs de cada bloco; reprocessar um bloco não muda nada.
+
+Uso:
+    python3 wallet_clusters.py --backfill     # TXs de dog_transactions.json + tabela de entidades
+    python3 wallet_clusters.py bc1q...        # entidade do endereço
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from dog_record import DOG_FACTOR, TransactionLike, as_record
+from publish_manifest import MANIFEST, content_digest
+
+BASE_DIR = Path(__file__).parent.parent
+WALLET_CLUSTERS_DB = Path(os.environ.get('WALLET_CLUSTERS_DB', str(BASE_DIR / 'data' / 'wallet_clusters.db')))
+CLUSTER_CHANGE_HEURISTIC = os.environ.get('CLUSTER_CHANGE_HEURISTIC', '0') == '1'
+TRANSACTIONS_FILE = BASE_DIR / 'backend' / 'data' / 'dog_transactions.json'
+HOLDERS_FILE = BASE_DIR / 'data' / 'dog_holders_by_address.json'
+ENTITY_FILES = [
+    BASE_DIR / 'data' / 'dog_entities.json',
+    BASE_DIR / 'public' / 'data' / 'dog_entities.json',
+]
+IGNORED_ADDRESSES = {'', 'UNKNOWN', 'unknown'}
+
+
+def entity_id(label: int) -> str:
+    return f"E{label}"
+
+
+class WalletClusters:
+    def __init__(self, db_path: Path = WALLET_CLUSTERS_DB, change_heuristic: bool = CLUSTER_CHANGE_HEURISTIC):
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(db_path))
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''
+            CREATE TABLE IF NOT EXISTS addresses (
+                address TEXT PRIMARY KEY,
+                parent TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                label INTEGER NOT NULL
+            ) WITHOUT ROWID
+        ''')
+        self.db.commit()
+        self.change_heuristic = change_heuristic
+
+        # Union-find em memória; `label` e `size` só valem na raiz
+        self.parent: Dict[str, str] = {}
+        self.size: Dict[str, int] = {}
+        self.label: Dict[str, int] = {}
+        for address, parent, size, label in self.db.execute('SELECT address, parent, size, label FROM addresses'):
+            self.parent[address] = parent
+            self.size[address] = size
+            self.label[address] = label
+        self.next_label = max(self.label.values(), default=0) + 1
+        self.dirty: Set[str] = set()
+
+    # === Union-find =========================================================
+
+    def _add(self, address: str) -> None:
+        if address not in self.parent:
+            self.parent[address] = address
+            self.size[address] = 1
+            self.label[address] = self.next_label
+            self.next_label += 1
+            self.dirty.add(address)
+
+    def find(self, address: str) -> str:
+        root = address
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[address] != root:  # Compressão de caminho
+            self.parent[address], address = root, self.parent[address]
+            self.dirty.add(address)
+        return root
+
+    def union(self, a: str, b: str) -> str:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:  # União por tamanho
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        self.label[root_a] = min(self.label[root_a], self.label[root_b])
+        self.dirty.update((root_a, root_b))
+        return root_a
+
+    def entity_of(self, address: str) -> Optional[str]:
+        if address not in self.parent:
+            return None
+        return entity_id(self.label[self.find(address)])
+
+    # === Alimentação ========================================================
+
+    def add_transactions(self, transactions: Iterable[TransactionLike]) -> int:
+        """Une os senders de cada TX confirmada (e o troco, com a heurística). Retorna quantas uniões mudaram algo"""
+        merges = 0
+        for tx in transactions:
+            record = as_record(tx)
+            if not record.block_height or record.source == 'mempool':
+                continue
+            senders = list(dict.fromkeys(p.address for p in record.senders if p.address not in IGNORED_ADDRESSES))
+            receivers = list(dict.fromkeys(p.address for p in record.receivers if p.address not in IGNORED_ADDRESSES))
+
+            # Troco: avaliado antes de registrar os endereços desta TX
+            change = None
+            if self.change_heuristic and senders:
+                outgoing = [address for address in receivers if address not in senders]
+                fresh = [address for address in outgoing if address not in self.parent]
+                if len(outgoing) == 2 and len(fresh) == 1:
+                    change = fresh[0]
+
+            for address in senders + receivers:
+                self._add(address)
+            members = senders + ([change] if change else [])
+            for address in members[1:]:
+                if self.find(address) != self.find(members[0]):
+                    self.union(members[0], address)
+                    merges += 1
+        return merges
+
+    def save(self) -> int:
+        """Grava só as linhas alteradas desde o último save"""
+        rows = [(address, self.parent[address], self.size[address], self.label[address]) for address in self.dirty]
+        self.db.executemany('INSERT OR REPLACE INTO addresses VALUES (?, ?, ?, ?)', rows)
+        self.db.commit()
+        self.dirty.clear()
+        return len(rows)
+
+    # === Tabelas por entidade ===============================================
+
+    def entity_table(self, holders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Agrupa os holders (build_holders) por entidade e calcula o ranking"""
+        entities: Dict[str, Dict[str, Any]] = {}
+        for holder in holders:
+            address = holder['address']
+            key = self.entity_of(address) or f"A:{address}"  # Endereço sem TX vista: entidade própria
+            entity = entities.get(key)
+            if entity is None:
+                entity = entities[key] = {
+                    'entity_id': key if not key.startswith('A:') else None,
+                    'total_amount': 0,
+                    'address_count': 0,
+                    'addresses': [],
+                }
+            entity['total_amount'] += holder['total_amount']
+            entity['address_count'] += 1
+            entity['addresses'].append(address)
+
+        table = sorted(entities.values(), key=lambda entity: entity['total_amount'], reverse=True)
+        for rank, entity in enumerate(table, start=1):
+            entity['rank'] = rank
+            entity['total_dog'] = entity['total_amount'] / DOG_FACTOR
+            if entity['entity_id'] is None:
+                entity['entity_id'] = f"A:{entity['addresses'][0]}"
+        return table
+
+    def save_entities(self, holders: List[Dict[str, Any]]) -> bool:
+        """Grava dog_entities.json (data/ e public/data/) se o conteúdo mudou"""
+        table = self.entity_table(holders)
+        output_data = {
+            'timestamp': datetime.now().isoformat(),
+            'total_entities': len(table),
+            'total_holders': len(holders),
+            'multi_address_entities': sum(1 for entity in table if entity['address_count'] > 1),
+            'entities': table,
+        }
+        digest = content_digest(output_data)
+        written = sum(1 for path in ENTITY_FILES if MANIFEST.write_json(path, output_data, digest=digest, indent=2))
+        return written > 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Clusterização de carteiras DOG (common-input ownership)')
+    parser.add_argument('address', nargs='?')
+    parser.add_argument('--backfill', action='store_true', help='une os senders de dog_transactions.json e grava as entidades')
+    parser.add_argument('--change', action='store_true', help='liga a heurística de troco')
+    args = parser.parse_args()
+
+    clusters = WalletClusters(change_heuristic=args.change or CLUSTER_CHANGE_HEURISTIC)
+    if args.backfill:
+        if TRANSACTIONS_FILE.exists():
+            with open(TRANSACTIONS_FILE, 'r') as f:
+                transactions = json.load(f).get('transactions', [])
+            # Mais antigas primeiro: os entity IDs seguem a ordem de aparição
+            transactions.sort(key=lambda tx: tx.get('block_height') or 0)
+            merges = clusters.add_transactions(transactions)
+            clusters.save()
+            print(f"🔗 {len(transactions):,} TXs processadas, {merges:,} uniões")
+        else:
+            print(f"⚠️ {TRANSACTIONS_FILE} não encontrado")
+        if HOLDERS_FILE.exists():
+            with open(HOLDERS_FILE, 'r') as f:
+                holders = json.load(f).get('holders', [])
+            clusters.save_entities(holders)
+            print(f"👥 Entidades gravadas para {len(holders):,} holders")
+
+    if args.address:
+        entity = clusters.entity_of(args.address)
+        if not entity:
+            print(f"   {args.address}: sem TX vista")
+            return
+        root = clusters.find(args.address)
+        members = [address for address in clusters.parent if clusters.find(address) == root]
+        print(f"   {args.address} -> {entity} ({len(members):,} endereços)")
+        for address in members[:50]:
+            print(f"      {address}")
+
+
+if __name__ == '__main__':
+    main()